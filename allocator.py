@@ -0,0 +1,73 @@
+"""
+Bell-Curve Allocator
+The projector's "Strategy Simulator" allocation as a plain function: every
+selected bucket first gets enough shares to return the full capital if it
+wins (the safety layer), then the remaining capital is spread by a Gaussian
+curve centred on the projected median. All curve widths the slider offers
+are computed in one broadcasted pass, so moving the slider is a lookup.
+"""
+import numpy as np
+from scipy.stats import norm
+
+from buckets import BucketScheme
+
+CURVE_WIDTHS = np.arange(10.0, 100.0 + 5.0, 5.0)  # slider range (min, max, step)
+
+
+def bucket_midpoints(labels):
+    """Numeric midpoint of each bucket label for Gaussian smoothing (0 if unparseable)"""
+    scheme = BucketScheme(labels)
+    ids = scheme.ids_of(labels)
+    return np.where(ids >= 0, scheme.midpoints()[ids], 0.0)
+
+
+def allocate(prices, midpoints, capital, median, widths=CURVE_WIDTHS):
+    """
+    Allocation for every curve width at once.
+
+    prices / midpoints: one entry per selected bucket. Returns a dict with the
+    safety totals and (len(widths), len(prices)) arrays: weight, growth_cash,
+    growth_shares, total_shares, total_cost, net_profit, roi. 'valid' is False
+    when the safety layer alone costs more than the capital.
+    """
+    prices = np.asarray(prices, dtype=float)
+    midpoints = np.asarray(midpoints, dtype=float)
+    widths = np.asarray(widths, dtype=float)
+
+    # 1. Base Layer: Safety Net - `capital` shares of every bucket
+    safety_shares = np.full(len(prices), float(capital))
+    safety_cost = safety_shares * prices
+    total_safety_cost = safety_cost.sum()
+    remaining_capital = capital - total_safety_cost
+
+    # 2. Gaussian weights for all widths: (n_widths, n_buckets)
+    scores = norm.pdf(midpoints[None, :], median, widths[:, None])
+    totals = scores.sum(axis=1, keepdims=True)
+    weight = np.where(totals > 0, scores / np.where(totals > 0, totals, 1), 1.0 / max(len(prices), 1))
+
+    growth_cash = max(remaining_capital, 0) * weight
+    growth_shares = growth_cash / prices
+    total_shares = safety_shares + growth_shares
+    total_cost = safety_cost + growth_cash
+    net_profit = total_shares * 1.0 - capital
+
+    return {
+        'widths': widths,
+        'valid': remaining_capital >= 0,
+        'safety_shares': safety_shares,
+        'safety_cost': safety_cost,
+        'total_safety_cost': total_safety_cost,
+        'remaining_capital': remaining_capital,
+        'weight': weight,
+        'growth_cash': growth_cash,
+        'growth_shares': growth_shares,
+        'total_shares': total_shares,
+        'total_cost': total_cost,
+        'net_profit': net_profit,
+        'roi': net_profit / capital * 100
+    }
+
+
+def width_index(allocation, curve_width):
+    """Row of the sweep for a slider value (nearest precomputed width)"""
+    return int(np.abs(allocation['widths'] - curve_width).argmin())
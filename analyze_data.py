@@ -7,6 +7,8 @@ import numpy as np
 from datetime import datetime
 from collections import Counter, defaultdict
 
+from buckets import find_bucket, parse_bucket
+
 print("="*70)
 print("🦋 ELON MUSK WEEKLY TWEET HISTORICAL ANALYSIS")
 print("="*70)
@@ -50,17 +52,16 @@ for event_id, event_markets in sorted(events_dict.items(), key=lambda x: x[1][0]
         print(f"{start_date} to {end_date}: {event_title[:50]:50} → Winner: {winner}")
         
         # Parse bucket to get midpoint
-        import re
-        match = re.search(r'(\d+)-(\d+)', winner)
-        if match:
-            low, high = int(match.group(1)), int(match.group(2))
+        bounds = parse_bucket(winner)
+        if bounds and bounds[1] != float('inf'):
+            low, high = bounds[0], bounds[1] - 1
             midpoint = (low + high) // 2
             
             historical_data.append({
                 'start_date': start_date,
                 'end_date': end_date,
                 'title': event_title,
-                'bucket': winner,
+                'bucket': find_bucket(winner),
                 'actual': midpoint
             })
 
@@ -4,6 +4,8 @@ import matplotlib.dates as mdates
 import pandas as pd
 import numpy as np
 
+from buckets import bucket_sort_key
+
 # --- 1. Load and Prep Data ---
 try:
     with open('elon.json', 'r') as f:
@@ -23,13 +25,7 @@ df['value'] = pd.to_numeric(df['value'])
 # Sort by time (Critical for timeline analysis)
 df = df.sort_values('trade_dttm')
 
-# Helper to sort buckets numerically (e.g. "460-479" -> 460)
-def get_sort_key(s):
-    if '500+' in s: return 500
-    try: return int(s.split('-')[0])
-    except: return 0
-
-df['bucket_sort'] = df['market_subtitle'].apply(get_sort_key)
+df['bucket_sort'] = df['market_subtitle'].apply(bucket_sort_key)
 
 # Define Action Types for Color Coding
 # We want to distinguish: Buy Yes (Green), Sell Yes (Red), Buy No (Purple)
@@ -81,7 +77,7 @@ ax1.legend(loc='upper left', frameon=True)
 ax1.grid(True, linestyle='--', alpha=0.3)
 
 # Sort Y-axis by bucket number
-sorted_buckets = sorted(df['market_subtitle'].unique(), key=get_sort_key)
+sorted_buckets = sorted(df['market_subtitle'].unique(), key=bucket_sort_key)
 ax1.set_yticks(range(len(sorted_buckets)))
 ax1.set_yticklabels(sorted_buckets)
 
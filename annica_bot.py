@@ -2,6 +2,9 @@ import time
 import random
 import json
 
+from buckets import grid_labels
+from hedge import min_cost_hedge
+
 class AnnicaBot:
     def __init__(self):
         self.balance = 10000.00  # Starting Bankroll
@@ -12,6 +15,8 @@ class AnnicaBot:
         self.low_buckets = ["20-39", "40-59", "60-79", "80-99", "100-119"]
         self.high_buckets = ["460-479", "480-499", "500+"]
         self.target_zone = ["200-219", "140-159"] # The "Sniper" targets
+        self.all_buckets = grid_labels(20, 20, 500)  # every outcome: <20, 20-39, ..., 500+
+        self.max_loss = 3000  # Phase 4 caps the loss in any outcome at this
         
         print(f"Bot Initialized. Balance: ${self.balance:,.2f}")
 
@@ -98,13 +103,28 @@ class AnnicaBot:
     def execute_phase_4(self):
         """
         Phase 4: The Hedge
-        Buy 'No' on the target zone to protect against total loss.
+        Buy the cheapest mix of 'Yes' / 'No' across all buckets that caps the
+        loss in every outcome at max_loss (min-cost LP, see hedge.py).
         """
         print("\n--- EXECUTING PHASE 4: HEDGE ---")
-        for bucket in self.target_zone:
-            # Smaller hedge bets ($500 each)
-            invest_amount = 500
-            self.place_order(bucket, "No", invest_amount)
+        buckets = self.all_buckets
+        yes_prices = [self.get_market_price(b, "Yes") for b in buckets]
+        no_prices = [self.get_market_price(b, "No") for b in buckets]
+        yes_shares = [self.positions.get(f"{b}_Yes", {}).get('shares', 0) for b in buckets]
+        no_shares = [self.positions.get(f"{b}_No", {}).get('shares', 0) for b in buckets]
+        cost_basis = sum(pos['cost_basis'] for pos in self.positions.values())
+        
+        hedge = min_cost_hedge(yes_prices, no_prices, yes_shares, no_shares, cost_basis,
+                               self.max_loss, budget=self.balance)
+        if not hedge['success']:
+            print(f"❌ No hedge caps the loss at ${self.max_loss:,.2f}: {hedge['status']}")
+        else:
+            for outcome, prices, shares in (("Yes", yes_prices, hedge['yes']), ("No", no_prices, hedge['no'])):
+                for bucket, price, n in zip(buckets, prices, shares):
+                    if n * price >= 0.01:
+                        self.place_order(bucket, outcome, n * price)
+            print(f"Worst case: ${hedge['worst_before']:,.2f} -> ${hedge['worst_after']:,.2f} "
+                  f"(hedge cost ${hedge['cost']:,.2f})")
             
         self.phase = "COMPLETE"
 
@@ -0,0 +1,73 @@
+"""
+Body Construction Planner
+Every contiguous window of buckets is a candidate butterfly body: equal YES
+shares in each bucket of the window pay $1 per share set if the final count
+lands anywhere inside it. With prefix sums of prices and probabilities, the
+cost and the win probability of all n(n+1)/2 windows come out of one
+broadcasted subtraction. The frontier keeps the windows no other window
+beats on both cost and probability.
+"""
+import numpy as np
+
+
+def window_stats(probabilities, prices, max_width=None):
+    """
+    (first, last, cost, probability) of every contiguous window, as flat
+    arrays. cost is the price of one share in each bucket, i.e. of a $1 payout
+    in the body. Windows with an unpriced (NaN) bucket are left out.
+    """
+    probs = np.asarray(probabilities, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    n = len(probs)
+    cum_prob = np.concatenate([[0.0], np.cumsum(probs)])
+    # Unpriced buckets are summed as 0; counting them tells which windows hold one
+    cum_price = np.concatenate([[0.0], np.cumsum(np.nan_to_num(prices))])
+    cum_missing = np.concatenate([[0], np.cumsum(np.isnan(prices))])
+
+    first, last = np.triu_indices(n)
+    if max_width is not None:
+        keep = last - first < max_width
+        first, last = first[keep], last[keep]
+    priced = cum_missing[last + 1] == cum_missing[first]
+    first, last = first[priced], last[priced]
+    cost = cum_price[last + 1] - cum_price[first]
+    probability = cum_prob[last + 1] - cum_prob[first]
+    return first, last, cost, probability
+
+
+def pareto_frontier(cost, probability):
+    """Indices of windows not dominated (cheaper and at least as likely), cheapest first"""
+    order = np.lexsort((-probability, cost))
+    best = np.maximum.accumulate(probability[order])
+    improves = np.concatenate([[True], best[1:] > best[:-1]])
+    return order[improves]
+
+
+def plan_bodies(labels, probabilities, prices, capital=None, max_width=None):
+    """
+    Frontier of bodies over buckets in count order. Each entry has the window,
+    its cost per $1 payout, probability of finishing in it, payoff multiple
+    and expected return; with capital, also the shares per bucket and the
+    payout if the count lands in the body.
+    """
+    first, last, cost, probability = window_stats(probabilities, prices, max_width)
+    valid = cost > 0
+    first, last, cost, probability = first[valid], last[valid], cost[valid], probability[valid]
+
+    frontier = []
+    for i in pareto_frontier(cost, probability):
+        body = {
+            'first': labels[first[i]],
+            'last': labels[last[i]],
+            'buckets': list(labels[first[i]:last[i] + 1]),
+            'width': int(last[i] - first[i] + 1),
+            'cost': float(cost[i]),
+            'probability': float(probability[i]),
+            'payoff_multiple': float(1 / cost[i]),
+            'expected_return': float(probability[i] / cost[i] - 1)
+        }
+        if capital is not None:
+            body['shares'] = int(capital / cost[i])
+            body['payout'] = body['shares'] * 1.0
+        frontier.append(body)
+    return {'frontier': frontier, 'windows': len(cost)}
@@ -0,0 +1,83 @@
+"""
+Bucket Probability Kernel
+Normal final-count model -> bucket probabilities, shared by the live strategy
+tools. Probabilities are differences of the normal CDF at a BucketScheme's
+edges (with a half-count continuity correction), so open-ended tails like
+<40 and 500+ get their real mass and nothing needs renormalising. Any number
+of (predicted, std) pairs are evaluated in one broadcasted call, and results
+are memoised on the scheme and quantised inputs. Large one-off scenario grids
+go through bucket_probability_grid instead, which takes any broadcastable
+shapes and skips the cache.
+"""
+from functools import lru_cache
+
+import numpy as np
+from scipy.special import ndtr
+from scipy.stats import norm
+
+from buckets import BucketScheme
+
+# Bucket grid of the live strategy tools: <40, 40-59, ..., 480-499, 500+
+BUCKET_WIDTH = 20
+BUCKET_FLOOR = 40
+BUCKET_CAP = 500
+
+LIVE_SCHEME = BucketScheme.from_grid(BUCKET_WIDTH, BUCKET_FLOOR, BUCKET_CAP)
+LABELS = LIVE_SCHEME.labels
+
+COUNT_RESOLUTION = 0.25   # predicted counts closer than this share a cache entry
+STD_RESOLUTION = 0.25
+CACHE_SIZE = 4096
+
+
+def _quantize(values, resolution):
+    return tuple(float(v) for v in np.round(np.asarray(values, dtype=float).ravel() / resolution) * resolution)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _matrix(scheme, predicted, stds):
+    lower, upper = scheme.cdf_edges()
+    loc = np.asarray(predicted)[:, None]
+    scale = np.maximum(np.asarray(stds), 1e-9)[:, None]
+    matrix = norm.cdf(upper[None, :], loc, scale) - norm.cdf(lower[None, :], loc, scale)
+    matrix.setflags(write=False)
+    return matrix
+
+
+def bucket_probability_matrix(predicted_counts, stds, scheme=LIVE_SCHEME):
+    """
+    (n, len(scheme)) bucket probabilities for n predicted counts; stds is a
+    scalar or one per prediction. Rows sum to 1 when the scheme covers every
+    count. The array is shared with the cache, so it is read-only.
+    """
+    predicted = np.atleast_1d(np.asarray(predicted_counts, dtype=float))
+    stds = np.broadcast_to(np.asarray(stds, dtype=float), predicted.shape)
+    return _matrix(scheme, _quantize(predicted, COUNT_RESOLUTION), _quantize(stds, STD_RESOLUTION))
+
+
+def bucket_probabilities(predicted_count, std, scheme=LIVE_SCHEME):
+    """{bucket label: probability} for one predicted count"""
+    return dict(zip(scheme.labels, bucket_probability_matrix(predicted_count, std, scheme)[0]))
+
+
+def bucket_probability_grid(predicted_counts, stds, scheme=LIVE_SCHEME):
+    """
+    Bucket probabilities for predicted counts and stds of any broadcastable
+    shapes, as an array of shape (*broadcast shape, len(scheme)). The CDF is
+    evaluated once per distinct bucket edge, in place.
+    """
+    predicted, stds = np.broadcast_arrays(np.asarray(predicted_counts, dtype=float),
+                                          np.maximum(np.asarray(stds, dtype=float), 1e-9))
+    lower, upper = scheme.cdf_edges()
+    edges, inverse = np.unique(np.concatenate([lower, upper]), return_inverse=True)
+    z = edges - predicted[..., None]
+    z /= stds[..., None]
+    cdf = ndtr(z, out=z)
+    lo, up = inverse[:len(scheme)], inverse[len(scheme):]
+    if lo[0] == 0 and np.array_equal(up, np.arange(1, len(edges))):
+        return np.diff(cdf, axis=-1)  # contiguous buckets: each upper edge is the next lower
+    return cdf[..., up] - cdf[..., lo]
+
+
+def cache_info():
+    return _matrix.cache_info()
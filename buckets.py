@@ -0,0 +1,170 @@
+"""
+Bucket Algebra
+One place for tweet-count bucket labels. Market questions, position titles
+and pasted labels ('200-219', '500+', '<40', '40-49 ', 'Will Elon tweet
+225-249 times ...') are parsed once through a cached parser into half-open
+count ranges [lower, upper). A BucketScheme is the ordered set of buckets of
+one event - mixed widths allowed - and maps counts to bucket ids with
+np.searchsorted, so hot paths never touch strings.
+"""
+import math
+import re
+from functools import lru_cache
+
+import numpy as np
+
+_RANGE = re.compile(r'(\d+)\s*[-–]\s*(\d+)')
+_OPEN_TOP = re.compile(r'(\d+)\s*(?:\+|or\s+more)')
+_ABOVE = re.compile(r'>\s*(\d+)')
+_BELOW = re.compile(r'(?:<|(?:less|fewer)\s+than)\s*(\d+)')
+
+
+@lru_cache(maxsize=8192)
+def parse_bucket(text):
+    """(lower, upper) count range of a label or title, upper exclusive (inf if open); None if none"""
+    match = _RANGE.search(text)
+    if match:
+        return int(match.group(1)), int(match.group(2)) + 1
+    match = _OPEN_TOP.search(text)
+    if match:
+        return int(match.group(1)), math.inf
+    match = _ABOVE.search(text)
+    if match:
+        return int(match.group(1)) + 1, math.inf
+    match = _BELOW.search(text)
+    if match:
+        return 0, int(match.group(1))
+    return None
+
+
+def bucket_label(lower, upper):
+    """Canonical label of a count range"""
+    if upper == math.inf:
+        return f"{lower}+"
+    if lower == 0:
+        return f"<{upper}"
+    return f"{lower}-{upper - 1}"
+
+
+@lru_cache(maxsize=8192)
+def find_bucket(text):
+    """Canonical bucket label found in a label / question / title, or None"""
+    bounds = parse_bucket(text)
+    return bucket_label(*bounds) if bounds else None
+
+
+def bucket_sort_key(text):
+    """Numeric sort key (lower bound; unparseable text sorts last)"""
+    bounds = parse_bucket(text)
+    return bounds[0] if bounds else math.inf
+
+
+def sort_buckets(labels):
+    return sorted(labels, key=bucket_sort_key)
+
+
+def grid_labels(width, floor, cap):
+    """Labels of a fixed-width grid: <floor, floor-(floor+width-1), ..., cap+"""
+    labels = [f"<{floor}"]
+    labels += [f"{lower}-{lower + width - 1}" for lower in range(floor, cap, width)]
+    labels.append(f"{cap}+")
+    return labels
+
+
+class BucketScheme:
+    def __init__(self, labels):
+        """Buckets from any labels / questions (unparseable ones are skipped, duplicates merged)"""
+        bounds = sorted({b for b in map(parse_bucket, labels) if b})
+        self.labels = tuple(bucket_label(*b) for b in bounds)
+        self.lowers = np.array([b[0] for b in bounds], dtype=float)
+        self.uppers = np.array([b[1] for b in bounds], dtype=float)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+
+    @classmethod
+    def from_grid(cls, width, floor, cap):
+        return cls(grid_labels(width, floor, cap))
+
+    @classmethod
+    def from_markets(cls, markets, field='question'):
+        """Scheme of an event from its gamma market list"""
+        return cls(m.get(field, '') for m in markets)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __eq__(self, other):
+        return isinstance(other, BucketScheme) and self.labels == other.labels
+
+    def __hash__(self):
+        return hash(self.labels)
+
+    def __repr__(self):
+        return f"BucketScheme({', '.join(self.labels)})"
+
+    # --- Counts -> buckets ---
+
+    def ids(self, counts):
+        """Bucket index of each count (-1 where no bucket covers it)"""
+        counts = np.asarray(counts, dtype=float)
+        ids = np.searchsorted(self.lowers, counts, side='right') - 1
+        inside = (ids >= 0) & (counts < self.uppers[np.maximum(ids, 0)])
+        return np.where(inside, ids, -1)
+
+    def label_for(self, count):
+        i = int(self.ids(count))
+        return self.labels[i] if i >= 0 else None
+
+    def id_of(self, text):
+        """Index of the bucket a label / title names, or None"""
+        return self.index.get(find_bucket(text))
+
+    def ids_of(self, texts):
+        """Bucket index of each label / title (-1 if it names no bucket of this scheme)"""
+        return np.array([self.index.get(find_bucket(t), -1) for t in texts], dtype=np.int64)
+
+    # --- Geometry ---
+
+    def typical_width(self):
+        finite = self.uppers - self.lowers
+        finite = finite[np.isfinite(finite) & (self.lowers > 0)]
+        return float(np.median(finite)) if len(finite) else 20.0
+
+    def bounded_uppers(self):
+        """Upper edges with an open top bucket closed at one typical width"""
+        return np.where(np.isfinite(self.uppers), self.uppers, self.lowers + self.typical_width())
+
+    def midpoints(self):
+        """Count at the centre of each bucket ('<40' -> 20, '500+' -> 500 + width / 2)"""
+        return (self.lowers + self.bounded_uppers()) / 2
+
+    def cdf_edges(self):
+        """
+        (lower, upper) edges for integer counts under a continuous model:
+        shifted half a count, with the bottom bucket open below when it
+        starts at 0 and the top one open above.
+        """
+        lower = np.where(self.lowers > 0, self.lowers - 0.5, -np.inf)
+        upper = np.where(np.isfinite(self.uppers), self.uppers - 0.5, np.inf)
+        return lower, upper
+
+    # --- Between schemes ---
+
+    def rebin(self, probabilities, source):
+        """
+        Probabilities over `source` buckets (array in source order) moved onto
+        this scheme, assuming each source bucket's mass is spread evenly
+        """
+        if source == self:
+            return np.asarray(probabilities, dtype=float)
+        return np.asarray(probabilities, dtype=float) @ _overlap(source, self)
+
+
+@lru_cache(maxsize=64)
+def _overlap(source, target):
+    """Share of each source bucket that falls in each target bucket, (len(source), len(target))"""
+    a, b = source.lowers[:, None], source.bounded_uppers()[:, None]
+    c, d = target.lowers[None, :], target.uppers[None, :]
+    return np.clip(np.minimum(b, d) - np.maximum(a, c), 0, None) / (b - a)
@@ -6,7 +6,7 @@ Step 2: Extract winning outcomes for each
 import json
 import requests
 from datetime import datetime
-import re
+from buckets import find_bucket, parse_bucket
 
 print("="*70)
 print("🔍 ELON MUSK WEEKLY TWEET HISTORICAL DATA BUILDER")
@@ -117,9 +117,9 @@ for event in sorted(elon_events, key=lambda x: x.get('endDate', '')):
                 print(f"  ✅ Winner: {winner}")
                 
                 # Parse bucket
-                match = re.search(r'(\d+)-(\d+)', winner)
-                if match:
-                    low, high = int(match.group(1)), int(match.group(2))
+                bounds = parse_bucket(winner)
+                if bounds and bounds[1] != float('inf'):
+                    low, high = bounds[0], bounds[1] - 1
                     midpoint = (low + high) // 2
                     
                     # Format date nicely
@@ -133,7 +133,7 @@ for event in sorted(elon_events, key=lambda x: x.get('endDate', '')):
                         'title': title,
                         'slug': slug,
                         'end_date': date_str,
-                        'bucket': winner,
+                        'bucket': find_bucket(winner),
                         'actual': midpoint,
                         'verified': True
                     })
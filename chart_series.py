@@ -0,0 +1,59 @@
+"""
+Projector Chart Series
+Builds every line of the projector chart in one vectorised pass over the
+sorted post times: the cumulative 'Actual' step line (reduced to at most
+max_vertices points so busy weeks stay light in the browser) and the
+straight historic / model projection lines.
+"""
+import numpy as np
+import pandas as pd
+
+MAX_VERTICES = 600
+
+
+def _to_ns(t):
+    return pd.Timestamp(t).value
+
+
+def cumulative_steps(times, start, now, max_vertices=MAX_VERTICES):
+    """
+    Vertices (x, y) of the cumulative count as an 'hv' step line: 0 at start,
+    +1 at each post, flat to now. times must be sorted and within [start, now].
+    Above max_vertices only the last post of each of max_vertices - 2 equal
+    time bins is kept, so the line is exact at every kept vertex and off by
+    at most one bin's posts in between.
+    """
+    t = np.asarray(pd.DatetimeIndex(times).asi8, dtype=np.int64)
+    counts = np.arange(1, len(t) + 1)
+    start_ns, now_ns = _to_ns(start), _to_ns(now)
+
+    n_bins = max_vertices - 2
+    if len(t) > n_bins:
+        span = max(now_ns - start_ns, 1)
+        bins = np.minimum(((t - start_ns) / span * n_bins).astype(np.int64), n_bins - 1)
+        last = np.flatnonzero(np.diff(bins, append=bins[-1] + 1))
+        t, counts = t[last], counts[last]
+
+    x = np.concatenate([[start_ns], t, [now_ns]])
+    y = np.concatenate([[0], counts, [len(times)]])
+    tz = getattr(pd.Timestamp(start), 'tz', None)
+    return pd.to_datetime(x, utc=True).tz_convert(tz) if tz else pd.to_datetime(x), y
+
+
+def chart_series(times, market_start, market_end, now, hourly_mean, projections, max_vertices=MAX_VERTICES):
+    """
+    All chart lines as {name: (x, y)}: 'actual' (step line), 'historic'
+    (hourly_mean pace over the whole window) and one straight line per entry
+    of projections ({name: projected final count}) from now to market end.
+    """
+    actual_x, actual_y = cumulative_steps(times, market_start, now, max_vertices)
+    current_count = int(actual_y[-1])
+    window_hours = (market_end - market_start).total_seconds() / 3600
+
+    series = {
+        'actual': (actual_x, actual_y),
+        'historic': ([market_start, market_end], [0, hourly_mean * window_hours])
+    }
+    for name, final in projections.items():
+        series[name] = ([now, market_end], [current_count, final])
+    return series
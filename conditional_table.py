@@ -0,0 +1,199 @@
+"""
+Conditional Final-Count Table
+Empirical distribution of a market's final tweet count given (hours elapsed,
+count so far), built from every resolved 168h window in the tweet history.
+Windows start at noon ET every day, so one year of history gives ~360
+(overlapping) weeks. Each window contributes, at every hour, its remaining
+count added to the centre of its count-so-far bin and to the neighbouring
+bins with Gaussian weights - so sparse cells borrow from nearby paces while
+the remaining-count distribution stays the one actually observed.
+
+Lookups are a single cell read. The table is saved as an .npz and updated
+in place as new windows resolve, so a rebuild only processes the new ones.
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from bucket_kernel import BUCKET_CAP, BUCKET_FLOOR, BUCKET_WIDTH
+from buckets import BucketScheme
+from montecarlo import bucket_ids, bucket_labels
+
+TABLE_PATH = 'conditional_table.npz'
+EST = pytz.timezone("US/Eastern")
+
+WEEK_HOURS = 168
+WINDOW_HOUR_ET = 12        # windows open at noon ET, one per day
+COUNT_STEP = 10            # count-so-far bin width
+MAX_COUNT = 1500           # counts above this share the last bin
+COUNT_BANDWIDTH = 1.5      # Gaussian smoothing across count bins (in bins)
+MIN_WEIGHT = 3.0           # effective windows a cell needs before it is trusted
+
+
+def window_starts(first_ts, last_ts):
+    """Noon-ET epoch starts of every 168h window inside [first_ts, last_ts]"""
+    day = datetime.fromtimestamp(first_ts, EST).date()
+    starts = []
+    while True:
+        start = EST.localize(datetime.combine(day, datetime.min.time()).replace(hour=WINDOW_HOUR_ET)).timestamp()
+        if start + WEEK_HOURS * 3600 > last_ts:
+            return starts
+        if start >= first_ts:
+            starts.append(start)
+        day += timedelta(days=1)
+
+
+def window_curves(timestamps, starts):
+    """Cumulative count at each hour 0..168 of each window, (len(starts), 169)"""
+    ts = np.asarray(timestamps, dtype=float)
+    edges = np.asarray(starts, dtype=float)[:, None] + 3600.0 * np.arange(WEEK_HOURS + 1)
+    return np.searchsorted(ts, edges) - np.searchsorted(ts, edges[:, :1])
+
+
+class ConditionalTable:
+    def __init__(self, width=BUCKET_WIDTH, floor=BUCKET_FLOOR, cap=BUCKET_CAP):
+        self.width, self.floor, self.cap = width, floor, cap
+        self.labels = bucket_labels(width, floor, cap)
+        self.scheme = BucketScheme(self.labels)
+        n_bins = MAX_COUNT // COUNT_STEP + 1
+        # weights[h, b, k]: smoothed windows at hour h in count bin b that finished in bucket k
+        self.weights = np.zeros((WEEK_HOURS + 1, n_bins, len(self.labels)))
+        self.final_sum = np.zeros((WEEK_HOURS + 1, n_bins))
+        self.totals = np.zeros((WEEK_HOURS + 1, n_bins))
+        self.last_start = -np.inf   # start of the newest window already added
+        self.n_windows = 0
+
+        radius = int(np.ceil(3 * COUNT_BANDWIDTH))
+        self._offsets = np.arange(-radius, radius + 1)
+        self._kernel = np.exp(-0.5 * (self._offsets / COUNT_BANDWIDTH) ** 2)
+
+    # --- Building ---
+
+    def add_curves(self, curves):
+        """Add resolved windows given as cumulative hourly counts (n, 169)"""
+        curves = np.asarray(curves, dtype=np.int64)
+        if len(curves) == 0:
+            return
+        n_hours, n_bins, n_buckets = self.weights.shape
+        remaining = curves[:, -1:] - curves
+        hours = np.broadcast_to(np.arange(n_hours), curves.shape)
+        source = np.minimum(np.rint(curves / COUNT_STEP).astype(np.int64), n_bins - 1)
+
+        # Every (window, hour) lands in its own bin and its neighbours, each
+        # time with the remaining count added to that bin's centre
+        target = source[..., None] + self._offsets
+        valid = (target >= 0) & (target < n_bins)
+        final = target * COUNT_STEP + remaining[..., None]
+        weight = np.broadcast_to(self._kernel, target.shape)[valid]
+        cell = (np.broadcast_to(hours[..., None], target.shape)[valid] * n_bins + target[valid])
+
+        buckets = bucket_ids(final[valid], self.width, self.floor, self.cap)
+        self.weights += np.bincount(cell * n_buckets + buckets, weight,
+                                    minlength=self.weights.size).reshape(self.weights.shape)
+        self.final_sum += np.bincount(cell, weight * final[valid], minlength=n_hours * n_bins).reshape(n_hours, n_bins)
+        self.totals += np.bincount(cell, weight, minlength=n_hours * n_bins).reshape(n_hours, n_bins)
+        self.n_windows += len(curves)
+
+    def update(self, timestamps, now_ts):
+        """Add every window that resolved since the last update; returns how many"""
+        ts = np.sort(np.asarray(timestamps, dtype=float))
+        if len(ts) == 0:
+            return 0
+        starts = [s for s in window_starts(ts[0], now_ts) if s > self.last_start]
+        if starts:
+            self.add_curves(window_curves(ts, starts))
+            self.last_start = starts[-1]
+        return len(starts)
+
+    # --- Lookups ---
+
+    def _cell(self, hours_elapsed, count):
+        n_hours, n_bins, _ = self.weights.shape
+        h = min(max(int(round(hours_elapsed)), 0), n_hours - 1)
+        b = min(max(int(round(count / COUNT_STEP)), 0), n_bins - 1)
+        return h, b
+
+    def bucket_probabilities(self, hours_elapsed, count, scheme=None):
+        """
+        {bucket: probability} for the final count, or None if the cell is too
+        sparse. A different BucketScheme (e.g. an event's mixed-width
+        buckets) gets the table's grid rebinned onto it.
+        """
+        h, b = self._cell(hours_elapsed, count)
+        total = self.totals[h, b]
+        if total < MIN_WEIGHT:
+            return None
+        # Cells are built around the bin centre; move the mass by the offset
+        # within the bin, splitting each bucket linearly with its neighbour
+        steps = (count - b * COUNT_STEP) / self.width
+        whole, frac = int(np.floor(steps)), steps - np.floor(steps)
+        weights = self.weights[h, b]
+        k = np.arange(len(weights))
+        last = len(weights) - 1
+        moved = (np.bincount(np.clip(k + whole, 0, last), weights * (1 - frac), minlength=len(weights))
+                 + np.bincount(np.clip(k + whole + 1, 0, last), weights * frac, minlength=len(weights)))
+        if scheme is None or scheme == self.scheme:
+            return dict(zip(self.labels, moved / total))
+        return dict(zip(scheme.labels, scheme.rebin(moved / total, self.scheme)))
+
+    def expected_final(self, hours_elapsed, count):
+        """Mean final count for the cell, or None if it is too sparse"""
+        h, b = self._cell(hours_elapsed, count)
+        total = self.totals[h, b]
+        if total < MIN_WEIGHT:
+            return None
+        return self.final_sum[h, b] / total + (count - b * COUNT_STEP)
+
+    # --- Persistence ---
+
+    def _grid(self):
+        return np.array([self.width, self.floor, self.cap, COUNT_STEP, MAX_COUNT, COUNT_BANDWIDTH])
+
+    def save(self, path=TABLE_PATH):
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(tmp, grid=self._grid(), weights=self.weights, final_sum=self.final_sum,
+                            totals=self.totals, last_start=self.last_start, n_windows=self.n_windows)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=TABLE_PATH, **grid):
+        """Saved table, or an empty one if missing or built on a different grid"""
+        table = cls(**grid)
+        try:
+            data = np.load(path)
+        except (OSError, ValueError):
+            return table
+        if not np.array_equal(data['grid'], table._grid()):
+            return table
+        table.weights = data['weights']
+        table.final_sum = data['final_sum']
+        table.totals = data['totals']
+        table.last_start = float(data['last_start'])
+        table.n_windows = int(data['n_windows'])
+        return table
+
+
+def refresh_table(store, path=TABLE_PATH, table=None, now_ts=None):
+    """Load (or reuse) the table, add newly resolved windows from a TweetStore and save"""
+    table = table if table is not None else ConditionalTable.load(path)
+    df = store.load_frame()
+    timestamps = df['createdAt'].dt.as_unit('ns').astype('int64').to_numpy() / 1e9
+    if table.update(timestamps, now_ts if now_ts is not None else time.time()):
+        table.save(path)
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build / update the conditional final-count table')
+    parser.add_argument('--output', default=TABLE_PATH, help='Table file')
+    parser.add_argument('--rebuild', action='store_true', help='Start from an empty table')
+    args = parser.parse_args()
+
+    from tweet_store import TweetStore
+    start = time.time()
+    table = refresh_table(TweetStore(), args.output, ConditionalTable() if args.rebuild else None)
+    print(f"✅ {table.n_windows} windows in {args.output} ({time.time() - start:.2f}s)")
@@ -1,14 +1,21 @@
 import streamlit as st
 import pandas as pd
-import requests
 import plotly.graph_objects as go
-import numpy as np
 import json
-from datetime import datetime, timedelta
+import os
+import time
+from datetime import datetime
 import pytz
-from collections import Counter
-import ast
-import scipy.stats as stats
+from tweet_store import TweetStore
+from market_index import fetch_tweet_events, window_from_event
+from allocator import CURVE_WIDTHS, allocate, bucket_midpoints, width_index
+from buckets import find_bucket
+from montecarlo import DEFAULT_SIMS, METHODS as MC_METHODS, ProjectionCache
+from projector_pipeline import (
+    DEFAULT_LOOKBACK_A, DEFAULT_LOOKBACK_B, MODELS, default_market_window, load_history, load_pace, params_key,
+    run_joint_projection, run_pipeline
+)
+from projector_worker import PUBLISH_PATH, STALE_AFTER, load_published
 
 # --- Configuration & Constants ---
 st.set_page_config(page_title="Elon Advanced Projector & Allocator", layout="wide")
@@ -17,43 +24,62 @@ UTC = pytz.utc
 
 # --- Helper Functions ---
 
-def fetch_tweets(start_dt_utc, end_dt_utc):
-    """
-    Fetches tweets from the Polymarket xTracker API.
-    """
-    url = "https://xtracker.polymarket.com/api/users/elonmusk/posts"
-    params = {
-        "startDate": start_dt_utc.isoformat(),
-        "endDate": end_dt_utc.isoformat(),
-        "limit": 10000 
-    }
-    
+@st.cache_resource
+def get_tweet_store():
+    """One local tweet store per server process, shared by every session."""
+    return TweetStore()
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_market_windows():
+    """Open tweet-count market windows from the gamma API, refreshed every 10 minutes."""
+    return [w for w in map(window_from_event, fetch_tweet_events()) if w]
+
+@st.cache_data(ttl=60, max_entries=16, show_spinner="Projecting open markets...")
+def joint_projection(now_minute, markets, lookback_a, lookback_b, n_sims, mc_method, seasonal):
+    """Every open market from one shared simulation, shared by sessions for a minute."""
+    pace = load_pace(get_tweet_store(), now_minute, lookback_a, lookback_b)
+    rows = [{'id': i, 'title': t, 'count': c, 'end_ts': e} for i, t, c, e in markets]
+    return run_joint_projection(pace, rows, now_minute, lookback_a, lookback_b, n_sims, mc_method, seasonal)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_allocation(prices, midpoints, capital, median):
+    """Allocator sweep over every curve width for one bucket selection."""
+    return allocate(prices, midpoints, capital, median)
+
+@st.cache_resource
+def get_projection_cache():
+    """Simulated futures shared by every session, keyed on model parameters."""
+    return ProjectionCache()
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def read_published(mtime):
+    """Unpickle the worker's file once per version (mtime), not once per rerun."""
+    return load_published(max_age=float('inf'))
+
+def get_published():
+    """The background worker's latest result, or None if it is not running."""
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if data.get("success") and "data" in data:
-            return data["data"]
-        return []
-    except Exception as e:
-        st.error(f"Error fetching data: {e}")
-        return []
-
-def get_bucket_label(count):
-    if count < 20: return "<20"
-    if count >= 500: return "500+"
-    lower = int((count // 20) * 20)
-    return f"{lower}-{lower + 19}"
-
-def parse_bucket_midpoint(bucket_str):
-    """Extracts a numerical midpoint from a bucket string for Gaussian smoothing."""
-    if "<" in bucket_str: return 10.0 # Midpoint of 0-20
-    if "+" in bucket_str: return 510.0 # Midpoint of 500+
-    try:
-        parts = bucket_str.split('-')
-        return (float(parts[0]) + float(parts[1])) / 2
-    except:
-        return 0.0
+        mtime = os.path.getmtime(PUBLISH_PATH)
+    except OSError:
+        return None
+    payload = read_published(mtime)
+    if payload is None or time.time() - payload['published_at'] > STALE_AFTER:
+        return None
+    return payload
+
+@st.cache_data(ttl=60, max_entries=32, show_spinner="Running projection...")
+def compute_projection(now_minute, market_start_et, market_end_et, lookback_a, lookback_b,
+                       n_sims, mc_method, mc_workers, mc_tol, seasonal, model):
+    """Full pipeline for a non-default configuration, shared by sessions for a minute."""
+    store = get_tweet_store()
+    df = load_history(store, now_minute)
+    if df.empty:
+        return None
+    return run_pipeline(
+        df, now_minute, market_start_et, market_end_et, lookback_a, lookback_b,
+        n_sims=n_sims, mc_method=mc_method, mc_workers=mc_workers, mc_tol=mc_tol, seasonal=seasonal, model=model,
+        projection_cache=get_projection_cache(), pace=load_pace(store, now_minute, lookback_a, lookback_b)
+    )
 
 def get_time_options():
     times = []
@@ -63,6 +89,8 @@ def get_time_options():
             times.append(t.strftime("%I:%M %p"))
     return times
 
+MODEL_LABELS = {'normal': "Normal (i.i.d. hours)", 'hawkes': "Hawkes (bursts)"}
+
 # --- Sidebar Controls ---
 st.sidebar.header("Prediction Settings (ET)")
 
@@ -70,9 +98,7 @@ TIME_OPTIONS = get_time_options()
 DEFAULT_TIME_IDX = TIME_OPTIONS.index("12:00 PM")
 
 now_et = datetime.now(EST)
-default_start = now_et.replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=now_et.weekday())
-if default_start > now_et: default_start -= timedelta(days=7)
-default_end = default_start + timedelta(days=7)
+default_start, default_end = default_market_window(now_et)
 
 start_date = st.sidebar.date_input("Market Start Date", value=default_start.date())
 start_time_str = st.sidebar.selectbox("Market Start Time", options=TIME_OPTIONS, index=DEFAULT_TIME_IDX, key="start_time")
@@ -90,86 +116,83 @@ st.sidebar.header("Advanced Models")
 
 col_a, col_b = st.sidebar.columns(2)
 with col_a:
-    lookback_a = st.number_input("Model A (Hours)", min_value=1, max_value=720, value=24)
+    lookback_a = st.number_input("Model A (Hours)", min_value=1, max_value=720, value=DEFAULT_LOOKBACK_A)
 with col_b:
-    lookback_b = st.number_input("Model B (Hours)", min_value=1, max_value=720, value=72)
-
-# --- Data Fetching ---
-
-start_historic_utc = (now_et - timedelta(days=365)).astimezone(UTC)
-end_fetch_utc = now_et.astimezone(UTC)
-
-if 'raw_data' not in st.session_state:
-    with st.spinner('Crunching numbers (Fetching history + Simulating)...'):
-        st.session_state.raw_data = fetch_tweets(start_historic_utc, end_fetch_utc)
+    lookback_b = st.number_input("Model B (Hours)", min_value=1, max_value=720, value=DEFAULT_LOOKBACK_B)
+
+projection_engine = st.sidebar.radio(
+    "Projection Engine", options=["Monte Carlo", "Exact (Normal)", "Exact (Empirical)"],
+    help="Exact modes convolve the per-hour count distribution instead of sampling: "
+         "Normal uses the same hourly model as the Monte Carlo, Empirical the observed 365d hourly counts."
+)
+mc_model = st.sidebar.selectbox(
+    "Simulation Model", options=list(MODELS), index=0, format_func=MODEL_LABELS.get,
+    help="Hawkes fits a self-exciting process to the last 60 days, so bursts fatten the upper tail"
+)
+n_sims = st.sidebar.number_input("Max Simulations", min_value=5000, max_value=5_000_000, value=DEFAULT_SIMS, step=10000)
+mc_method = st.sidebar.selectbox("Variance Reduction", options=list(MC_METHODS), index=0)
+mc_workers = st.sidebar.number_input(
+    "Worker Processes", min_value=1, max_value=os.cpu_count() or 1, value=1,
+    help="Split large simulation counts (1M+) across CPU cores"
+)
+mc_tol = st.sidebar.number_input("Stop at Std. Error (0 = run all sims)", min_value=0.0, max_value=0.05, value=0.0, step=0.001, format="%.3f")
+seasonal = st.sidebar.checkbox(
+    "Hour-of-Week Seasonality", value=True,
+    help="Draw each future hour from its ET hour-of-week profile instead of one flat rate"
+)
+
+# --- Projection Pipeline ---
+# The untouched sidebar matches what projector_worker.py precomputes, so the
+# common case just reads its published result; any other configuration is
+# computed here once per minute and shared through st.cache_data.
+
+params = {
+    'market_start_et': market_start_et,
+    'market_end_et': market_end_et,
+    'lookback_a': lookback_a,
+    'lookback_b': lookback_b,
+    'n_sims': n_sims,
+    'mc_method': mc_method,
+    'mc_workers': mc_workers,
+    'mc_tol': mc_tol,
+    'seasonal': seasonal,
+    'model': mc_model
+}
+
+published = get_published()
+if published is not None and published['key'] == params_key(params):
+    result = published['result']
+    result_source = f"background worker, updated {time.time() - published['published_at']:.0f}s ago"
+else:
+    tweet_store = get_tweet_store()
+    try:
+        # Only posts newer than the latest stored one are downloaded
+        with st.spinner('Syncing tweet history...'):
+            tweet_store.sync(now_utc=now_et.astimezone(UTC))
+    except Exception as e:
+        st.warning(f"Error fetching new tweets, using local history: {e}")
+    result = compute_projection(now_et.replace(second=0, microsecond=0), **params)
+    result_source = "computed for this configuration"
 
-if not st.session_state.raw_data:
+if result is None:
     st.error("Could not fetch data.")
     st.stop()
 
-df = pd.DataFrame(st.session_state.raw_data)
-df['createdAt'] = pd.to_datetime(df['createdAt'])
-df['createdAt_et'] = df['createdAt'].dt.tz_convert(EST)
-df = df.sort_values('createdAt_et')
-
-# --- Statistical Processing ---
-df_hourly = df.set_index('createdAt_et').resample('h').count()
-df_hourly.rename(columns={'createdAt': 'count'}, inplace=True)
-
-hourly_mean = df_hourly['count'].mean()
-hourly_std = df_hourly['count'].std()
-weekly_avg_historic = hourly_mean * 24 * 7
-
-def get_recent_rate(hours):
-    cutoff = now_et - timedelta(hours=hours)
-    count = len(df[df['createdAt_et'] >= cutoff])
-    passed = (now_et - cutoff).total_seconds() / 3600
-    return count / passed if passed > 0 else 0
-
-rate_a = get_recent_rate(lookback_a)
-rate_b = get_recent_rate(lookback_b)
-rate_avg = (rate_a + rate_b) / 2
-
-market_tweets = df[
-    (df['createdAt_et'] >= market_start_et) & 
-    (df['createdAt_et'] <= now_et)
-].copy()
-current_count = len(market_tweets)
-
-hours_remaining = int((market_end_et - now_et).total_seconds() / 3600)
-if hours_remaining < 0: hours_remaining = 0
-
-# --- Monte Carlo Simulation ---
-# We calculate these regardless of whether hours_remaining > 0
-# to avoid NameErrors.
-sim_results = []
-if hours_remaining > 0:
-    n_sims = 10000
-    sims_momentum = np.random.normal(loc=rate_avg, scale=hourly_std, size=(n_sims // 2, hours_remaining))
-    hybrid_rate = (rate_avg + hourly_mean) / 2
-    sims_hybrid = np.random.normal(loc=hybrid_rate, scale=hourly_std, size=(n_sims // 2, hours_remaining))
-    all_sims = np.vstack([sims_momentum, sims_hybrid])
-    all_sims = np.maximum(all_sims, 0)
-    sim_results = np.sum(all_sims, axis=1) + current_count
-else:
-    # If market ended or 0 time left, the result is just current count
-    sim_results = [current_count]
-
-# Calculate Percentiles (Always Defined)
-p10 = np.percentile(sim_results, 10)
-p50 = np.percentile(sim_results, 50)
-p90 = np.percentile(sim_results, 90)
+now_et = result['now_et']
+hourly_mean, hourly_std = result['hourly_mean'], result['hourly_std']
+rate_a, rate_b = result['rate_a'], result['rate_b']
+current_count, hours_remaining = result['current_count'], result['hours_remaining']
+proj_a, proj_b, proj_avg = result['proj_a'], result['proj_b'], result['proj_avg']
 
-proj_avg = current_count + (rate_avg * hours_remaining)
-proj_a = current_count + (rate_a * hours_remaining)
-proj_b = current_count + (rate_b * hours_remaining)
+mc = result['mc']
+exact = result['exact_empirical'] if projection_engine == "Exact (Empirical)" else result['exact_normal']
+projection = mc if projection_engine == "Monte Carlo" else exact
+p10, p50, p90 = projection['p10'], projection['p50'], projection['p90']
 
 # --- Bucket Probability Engine ---
-sim_buckets = [get_bucket_label(val) for val in sim_results]
-bucket_counts = Counter(sim_buckets)
-total_sims = len(sim_results)
-sim_probs = {k: v / total_sims for k, v in bucket_counts.items()}
-top_3_buckets = [b for b, c in bucket_counts.most_common(3)]
+sim_probs = {k: p for k, p in projection['probabilities'].items() if p > 0}
+ranked_buckets = sorted(sim_probs.items(), key=lambda x: x[1], reverse=True)
+top_3_buckets = [b for b, p in ranked_buckets[:3]]
 
 # --- UI Layout: Graph Section ---
 
@@ -179,37 +202,32 @@ c1.metric("Current", current_count)
 c2.metric("Mean (365d)", f"{hourly_mean:.2f}/hr", help=f"Std Dev: {hourly_std:.2f}")
 c3.metric(f"Model A ({lookback_a}h)", f"{int(proj_a)}", delta=f"{rate_a:.2f}/hr")
 c4.metric(f"Model B ({lookback_b}h)", f"{int(proj_b)}", delta=f"{rate_b:.2f}/hr")
-c5.metric("Monte Carlo P50", f"{int(p50)}", help="Median outcome of 10k sims")
+if projection_engine == "Monte Carlo":
+    c5.metric("Monte Carlo P50", f"{int(p50)}", help=f"Median outcome of {mc['n_sims']:,} sims")
+else:
+    c5.metric("Exact P50", f"{int(p50)}", help=f"Median of the exact {projection_engine[7:-1].lower()} distribution")
+st.caption(
+    f"Monte Carlo: {mc['n_sims']:,} sims ({mc['model'] if 'model' in mc else mc_method}, {mc_workers} process{'es' if mc_workers > 1 else ''}) in {mc['runtime'] * 1000:.1f} ms · "
+    f"max bucket std. error {mc['max_stderr'] * 100:.2f}%"
+    + (" · converged early" if mc['converged'] and mc_tol else "")
+    + (f" · reused cached paths (built in {mc['build_time'] * 1000:.0f} ms)" if mc.get('reused')
+       else f" · simulated in {mc['build_time'] * 1000:.0f} ms" if 'build_time' in mc else "")
+    + f" | Exact: {exact['runtime'] * 1000:.2f} ms | Results {result_source}"
+)
 
 st.markdown("---")
 st.markdown("### 🏆 Probabilistic Bucket Ranking")
 rank_cols = st.columns(3)
-for i, (bucket, count) in enumerate(bucket_counts.most_common(3)):
-    prob = (count / total_sims) * 100
+for i, (bucket, prob) in enumerate(ranked_buckets[:3]):
     with rank_cols[i]:
-        st.info(f"#{i+1}: **{bucket}** ({prob:.1f}%)")
-
-# Plot Data Setup
-cumulative_data = [{'time': market_start_et, 'count': 0}]
-r = 0
-for _, row in market_tweets.iterrows():
-    r += 1
-    cumulative_data.append({'time': row['createdAt_et'], 'count': r})
-cumulative_data.append({'time': now_et, 'count': r})
-df_cum = pd.DataFrame(cumulative_data)
-
-hist_expected_total_in_window = (weekly_avg_historic / 7 / 24) * ((market_end_et - market_start_et).total_seconds() / 3600)
-df_hist = pd.DataFrame([
-    {'time': market_start_et, 'count': 0}, 
-    {'time': market_end_et, 'count': hist_expected_total_in_window}
-])
-
-def make_line(val):
-    return pd.DataFrame([{'time': now_et, 'count': current_count}, {'time': market_end_et, 'count': val}])
-
-df_pA = make_line(proj_a)
-df_pB = make_line(proj_b)
-df_pAvg = make_line(proj_avg)
+        if projection_engine == "Monte Carlo":
+            st.info(f"#{i+1}: **{bucket}** ({prob * 100:.1f}% ± {mc['stderr'][bucket] * 100:.1f})")
+        else:
+            st.info(f"#{i+1}: **{bucket}** ({prob * 100:.1f}%)")
+
+# Plot Data Setup (built by the pipeline; 'actual' is already vertex-reduced)
+chart = result['chart']
+hist_expected_total_in_window = chart['historic'][1][1]
 
 # Plot
 fig = go.Figure()
@@ -217,146 +235,157 @@ y_max = max(p90, proj_a, proj_b, hist_expected_total_in_window, current_count) *
 for i in range(100, int(y_max), 100):
     fig.add_hline(y=i, line_width=1, line_color="rgba(255,255,255,0.1)")
 
-fig.add_trace(go.Scatter(x=df_hist['time'], y=df_hist['count'], mode='lines', name=f'Historic Pace', line=dict(color='white', width=2, dash='dot'), opacity=0.3))
-fig.add_trace(go.Scatter(x=df_pA['time'], y=df_pA['count'], mode='lines', name=f'A ({lookback_a}h)', line=dict(color='#FFD700', width=2, dash='dashdot')))
-fig.add_trace(go.Scatter(x=df_pB['time'], y=df_pB['count'], mode='lines', name=f'B ({lookback_b}h)', line=dict(color='#FFA500', width=2, dash='dashdot')))
-fig.add_trace(go.Scatter(x=df_pAvg['time'], y=df_pAvg['count'], mode='lines', name=f'AVG Projection', line=dict(color='#FF0055', width=4, dash='dash')))
-fig.add_trace(go.Scatter(x=df_cum['time'], y=df_cum['count'], mode='lines', name='Actual', line=dict(color='#00F0FF', width=4)))
+fig.add_trace(go.Scatter(x=chart['historic'][0], y=chart['historic'][1], mode='lines', name=f'Historic Pace', line=dict(color='white', width=2, dash='dot'), opacity=0.3))
+fig.add_trace(go.Scatter(x=chart['proj_a'][0], y=chart['proj_a'][1], mode='lines', name=f'A ({lookback_a}h)', line=dict(color='#FFD700', width=2, dash='dashdot')))
+fig.add_trace(go.Scatter(x=chart['proj_b'][0], y=chart['proj_b'][1], mode='lines', name=f'B ({lookback_b}h)', line=dict(color='#FFA500', width=2, dash='dashdot')))
+fig.add_trace(go.Scatter(x=chart['proj_avg'][0], y=chart['proj_avg'][1], mode='lines', name=f'AVG Projection', line=dict(color='#FF0055', width=4, dash='dash')))
+fig.add_trace(go.Scatter(x=chart['actual'][0], y=chart['actual'][1], mode='lines', line_shape='hv', name='Actual', line=dict(color='#00F0FF', width=4)))
 # Fix: Ensure variables are defined before plotting (Sim Range)
 fig.add_trace(go.Scatter(x=[market_end_et]*3, y=[p10, p50, p90], mode='markers', name='Sim Range', marker=dict(color=['red', 'white', 'green'], size=8, symbol='x')))
 fig.update_layout(title="Statistical Projection", xaxis_title="Time (ET)", yaxis_title="Tweets", template="plotly_dark", height=500, xaxis=dict(tickformat="%b %d<br>%I:%M %p"))
 
 st.plotly_chart(fig, use_container_width=True)
 
+# --- Open Markets: live counts for every overlapping market window ---
+tweet_store = get_tweet_store()
+try:
+    tweet_store.register_markets(fetch_market_windows())
+except Exception as e:
+    st.caption(f"Open markets unavailable ({type(e).__name__})")
+
+open_markets = tweet_store.market_counts(now_et.astimezone(UTC))
+if open_markets:
+    # All open markets come from one shared simulation, so they agree with each other
+    joint, corr = joint_projection(
+        now_et.replace(second=0, microsecond=0), tuple((m['id'], m['title'], m['count'], m['end_ts']) for m in open_markets),
+        lookback_a, lookback_b, n_sims, mc_method, seasonal
+    )
+    st.markdown("### 📈 Open Markets")
+    rows = []
+    for m in joint:
+        proj = m['projection']
+        top_bucket, top_prob = max(proj['probabilities'].items(), key=lambda x: x[1])
+        rows.append({
+            'market': m['title'],
+            'end (ET)': datetime.fromtimestamp(m['end_ts'], EST).strftime("%b %d %I:%M %p"),
+            'hours left': m['hours_remaining'],
+            'count': m['count'],
+            'P10': int(proj['p10']), 'P50': int(proj['p50']), 'P90': int(proj['p90']),
+            'top bucket': f"{top_bucket} ({top_prob * 100:.0f}%)"
+        })
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    if len(joint) > 1:
+        with st.expander("Correlation of final counts"):
+            titles = [m['title'] for m in joint]
+            st.dataframe(pd.DataFrame(corr, index=titles, columns=titles).style.format("{:.2f}"), use_container_width=True)
+
 # --- STRATEGY SIMULATOR SECTION ---
 st.markdown("---")
 st.markdown("## 💰 Strategy Simulator (Smooth Bell Curve)")
 st.caption("This allocator guarantees principal recovery (Break Even) on ALL selected buckets. The surplus is then distributed using a **Gaussian Bell Curve** centered on the simulation median. This creates a smooth 'Hill of Profit' where adjacent buckets also win big.")
 
-c_strat_1, c_strat_2 = st.columns([1, 2])
-
-with c_strat_1:
-    capital = st.number_input("Total Capital ($)", value=250.0, step=50.0)
-    json_input = st.text_area("Paste 'markets' JSON here", height=300)
-
-parsed_markets = []
-if json_input:
-    try:
-        data = json.loads(json_input)
-        market_list = data.get("markets", data) if isinstance(data, dict) else data
-        for m in market_list:
-            if "outcomePrices" in m:
-                prices = json.loads(m["outcomePrices"])
-                yes_price = float(prices[0])
-                title = m.get("groupItemTitle", m.get("slug", "Unknown"))
-                parsed_markets.append({"bucket": title, "price": yes_price})
-    except Exception as e:
-        st.error(f"Error parsing JSON: {e}")
-
-with c_strat_2:
-    if parsed_markets:
-        df_markets = pd.DataFrame(parsed_markets)
-        # Default sort by numeric midpoint for logical display
-        df_markets['midpoint'] = df_markets['bucket'].apply(parse_bucket_midpoint)
-        df_markets = df_markets.sort_values('midpoint')
+# Widgets below only rerun this fragment - moving the curve slider never
+# touches the projection above
+@st.fragment
+def strategy_simulator(p50, top_3_buckets):
+    c_strat_1, c_strat_2 = st.columns([1, 2])
+
+    with c_strat_1:
+        capital = st.number_input("Total Capital ($)", value=250.0, step=50.0)
+        json_input = st.text_area("Paste 'markets' JSON here", height=300)
+
+    parsed_markets = []
+    if json_input:
+        try:
+            data = json.loads(json_input)
+            market_list = data.get("markets", data) if isinstance(data, dict) else data
+            for m in market_list:
+                if "outcomePrices" in m:
+                    prices = json.loads(m["outcomePrices"])
+                    yes_price = float(prices[0])
+                    title = m.get("groupItemTitle", m.get("slug", "Unknown"))
+                    parsed_markets.append({"bucket": title, "price": yes_price})
+        except Exception as e:
+            st.error(f"Error parsing JSON: {e}")
+
+    with c_strat_2:
+        if parsed_markets:
+            df_markets = pd.DataFrame(parsed_markets)
+            # Default sort by numeric midpoint for logical display
+            df_markets['midpoint'] = bucket_midpoints(df_markets['bucket'].tolist())
+            df_markets = df_markets.sort_values('midpoint')
         
-        default_selections = [m["bucket"] for m in parsed_markets if m["bucket"] in top_3_buckets]
-        if not default_selections and not df_markets.empty:
-             default_selections = df_markets['bucket'].iloc[0:3].tolist() # Fallback
-
-        selected_buckets = st.multiselect(
-            "Select Buckets to Trade", 
-            options=df_markets["bucket"].tolist(),
-            default=default_selections
-        )
+            default_selections = [m["bucket"] for m in parsed_markets if find_bucket(m["bucket"]) in top_3_buckets]
+            if not default_selections and not df_markets.empty:
+                 default_selections = df_markets['bucket'].iloc[0:3].tolist() # Fallback
+
+            selected_buckets = st.multiselect(
+                "Select Buckets to Trade", 
+                options=df_markets["bucket"].tolist(),
+                default=default_selections
+            )
         
-        # SKEW Slider (Standard Deviation of the curve)
-        curve_width = st.slider("Curve Smoothness (Higher = Wider Spread, Lower = Spikier Profit)", 
-                                min_value=10.0, max_value=100.0, value=40.0, step=5.0)
+            # SKEW Slider (Standard Deviation of the curve)
+            curve_width = st.slider("Curve Smoothness (Higher = Wider Spread, Lower = Spikier Profit)", 
+                                    min_value=float(CURVE_WIDTHS[0]), max_value=float(CURVE_WIDTHS[-1]), value=40.0,
+                                    step=float(CURVE_WIDTHS[1] - CURVE_WIDTHS[0]))
         
-        if selected_buckets:
-            trade_df = df_markets[df_markets['bucket'].isin(selected_buckets)].copy()
-            
-            # 1. Base Layer: Safety Net
-            trade_df['safety_shares'] = capital
-            trade_df['safety_cost'] = trade_df['safety_shares'] * trade_df['price']
-            total_safety_cost = trade_df['safety_cost'].sum()
+            if selected_buckets:
+                trade_df = df_markets[df_markets['bucket'].isin(selected_buckets)].copy()
             
-            remaining_capital = capital - total_safety_cost
+                # Every slider position is computed once per selection; moving
+                # the slider only picks a row of the sweep
+                allocation = get_allocation(tuple(trade_df['price']), tuple(trade_df['midpoint']), capital, p50)
+                total_safety_cost = allocation['total_safety_cost']
+                remaining_capital = allocation['remaining_capital']
             
-            if remaining_capital < 0:
-                st.error(f"⚠️ Strategy Impossible: Safety costs ${total_safety_cost:.2f}, exceeding capital.")
-            else:
-                st.success(f"✅ Strategy Valid! Safety Cost: ${total_safety_cost:.2f}. Growth Capital: ${remaining_capital:.2f}")
-                
-                # 2. Gaussian Distribution of Surplus
-                # Instead of using sim_prob directly (which is jagged), we generate a PDF
-                # centered on the Monte Carlo Median (p50).
-                
-                median_outcome = p50
-                
-                def get_gaussian_weight(row):
-                    mid = parse_bucket_midpoint(row['bucket'])
-                    # Calculate PDF height at this midpoint based on normal dist(loc=median, scale=curve_width)
-                    weight = stats.norm.pdf(mid, median_outcome, curve_width)
-                    return weight
-
-                trade_df['curve_score'] = trade_df.apply(get_gaussian_weight, axis=1)
-                total_score = trade_df['curve_score'].sum()
-                
-                # Normalize weights
-                if total_score == 0:
-                     trade_df['weight'] = 1.0 / len(trade_df)
+                if not allocation['valid']:
+                    st.error(f"⚠️ Strategy Impossible: Safety costs ${total_safety_cost:.2f}, exceeding capital.")
                 else:
-                    trade_df['weight'] = trade_df['curve_score'] / total_score
-                
-                # Distribute Capital
-                trade_df['growth_cash'] = remaining_capital * trade_df['weight']
-                trade_df['growth_shares'] = trade_df['growth_cash'] / trade_df['price']
+                    st.success(f"✅ Strategy Valid! Safety Cost: ${total_safety_cost:.2f}. Growth Capital: ${remaining_capital:.2f}")
                 
-                # Totals
-                trade_df['total_shares'] = trade_df['safety_shares'] + trade_df['growth_shares']
-                trade_df['total_cost'] = trade_df['safety_cost'] + trade_df['growth_cash']
+                    # Gaussian Distribution of Surplus: a PDF centered on the
+                    # projection median (p50) rather than the jagged sim_probs
+                    i = width_index(allocation, curve_width)
+                    for col in ('total_shares', 'total_cost', 'net_profit', 'roi'):
+                        trade_df[col] = allocation[col][i]
                 
-                # PnL Calc
-                trade_df['win_payout'] = trade_df['total_shares'] * 1.0
-                trade_df['net_profit'] = trade_df['win_payout'] - capital
-                trade_df['roi'] = (trade_df['net_profit'] / capital) * 100
+                    # Display Data
+                    display_cols = trade_df[['bucket', 'price', 'total_shares', 'total_cost', 'net_profit', 'roi']]
+                    st.dataframe(display_cols.style.format({'price': '${:.3f}', 'total_shares': '{:.0f}', 'total_cost': '${:.2f}', 'net_profit': '${:.2f}', 'roi': '{:.1f}%'}), use_container_width=True)
                 
-                # Display Data
-                display_cols = trade_df[['bucket', 'price', 'total_shares', 'total_cost', 'net_profit', 'roi']]
-                st.dataframe(display_cols.style.format({'price': '${:.3f}', 'total_shares': '{:.0f}', 'total_cost': '${:.2f}', 'net_profit': '${:.2f}', 'roi': '{:.1f}%'}), use_container_width=True)
+                    # --- Visualizations ---
                 
-                # --- Visualizations ---
+                    # 1. Profit
+                    fig_profit = go.Figure(go.Bar(
+                        x=trade_df['bucket'], y=trade_df['net_profit'],
+                        marker_color=['#00F0FF' if x > 0 else '#FF0055' for x in trade_df['net_profit']],
+                        text=[f"${x:.0f}" for x in trade_df['net_profit']], textposition='auto', name='Net Profit'
+                    ))
+                    fig_profit.update_layout(title="Scenario: Net Profit if Winning", template="plotly_dark", height=250, margin=dict(l=20, r=20, t=30, b=20))
+                    st.plotly_chart(fig_profit, use_container_width=True)
                 
-                # 1. Profit
-                fig_profit = go.Figure(go.Bar(
-                    x=trade_df['bucket'], y=trade_df['net_profit'],
-                    marker_color=['#00F0FF' if x > 0 else '#FF0055' for x in trade_df['net_profit']],
-                    text=[f"${x:.0f}" for x in trade_df['net_profit']], textposition='auto', name='Net Profit'
-                ))
-                fig_profit.update_layout(title="Scenario: Net Profit if Winning", template="plotly_dark", height=250, margin=dict(l=20, r=20, t=30, b=20))
-                st.plotly_chart(fig_profit, use_container_width=True)
+                    c_g1, c_g2 = st.columns(2)
                 
-                c_g1, c_g2 = st.columns(2)
+                    # 2. Total Shares
+                    with c_g1:
+                        fig_shares = go.Figure(go.Bar(
+                            x=trade_df['bucket'], y=trade_df['total_shares'],
+                            marker_color='#FFD700', text=[f"{x:.0f}" for x in trade_df['total_shares']], textposition='auto'
+                        ))
+                        fig_shares.update_layout(title="Total Shares Owned", template="plotly_dark", height=250, margin=dict(l=20, r=20, t=30, b=20))
+                        st.plotly_chart(fig_shares, use_container_width=True)
                 
-                # 2. Total Shares
-                with c_g1:
-                    fig_shares = go.Figure(go.Bar(
-                        x=trade_df['bucket'], y=trade_df['total_shares'],
-                        marker_color='#FFD700', text=[f"{x:.0f}" for x in trade_df['total_shares']], textposition='auto'
-                    ))
-                    fig_shares.update_layout(title="Total Shares Owned", template="plotly_dark", height=250, margin=dict(l=20, r=20, t=30, b=20))
-                    st.plotly_chart(fig_shares, use_container_width=True)
-                
-                # 3. Total Investment
-                with c_g2:
-                    fig_invest = go.Figure(go.Bar(
-                        x=trade_df['bucket'], y=trade_df['total_cost'],
-                        marker_color='#00FF00', text=[f"${x:.0f}" for x in trade_df['total_cost']], textposition='auto'
-                    ))
-                    fig_invest.update_layout(title="Capital Invested ($)", template="plotly_dark", height=250, margin=dict(l=20, r=20, t=30, b=20))
-                    st.plotly_chart(fig_invest, use_container_width=True)
-
-    else:
-        st.info("Waiting for JSON input...")
\ No newline at end of file
+                    # 3. Total Investment
+                    with c_g2:
+                        fig_invest = go.Figure(go.Bar(
+                            x=trade_df['bucket'], y=trade_df['total_cost'],
+                            marker_color='#00FF00', text=[f"${x:.0f}" for x in trade_df['total_cost']], textposition='auto'
+                        ))
+                        fig_invest.update_layout(title="Capital Invested ($)", template="plotly_dark", height=250, margin=dict(l=20, r=20, t=30, b=20))
+                        st.plotly_chart(fig_invest, use_container_width=True)
+
+        else:
+            st.info("Waiting for JSON input...")
+
+strategy_simulator(p50, top_3_buckets)
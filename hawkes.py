@@ -0,0 +1,181 @@
+"""
+Hawkes Burst Model
+Self-exciting point process for the tweet stream. Intensity (posts/hr):
+    lambda(t) = mu * shape(t) + sum_i alpha * beta * exp(-beta * (t - t_i))
+where shape(t) is the hour-of-week profile (1.0 without seasonality), alpha
+the branching ratio (expected direct follow-ups per post) and 1/beta the
+burst decay time. Fitted by maximum likelihood on recent local history.
+
+Simulation uses the branching construction vectorised over every path at
+once: baseline "immigrant" posts per path-hour, children of posts already
+made (the current excitation), then generations of Poisson(alpha) children
+at Exp(beta) lags until no child lands inside the window. Times are hours.
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+from scipy.optimize import minimize
+
+from montecarlo import CHUNK_SIZE, DEFAULT_SIMS, MIN_CHUNKS, accumulate, batch_stderr, bucket_labels, new_accumulator, summarise
+
+FIT_DAYS = 60                 # history used for the fit
+MAX_BRANCHING = 0.95          # keeps the process stationary
+BETA_BOUNDS = (0.05, 60.0)    # decay rate per hour: ~1 min to 20 h bursts
+
+
+def _excitation_sums(times, beta):
+    """
+    A_i = sum_{j<i} exp(-beta (t_i - t_j)) for sorted times, vectorised as
+    exp(logsumexp_{j<i}(beta t_j) - beta t_i) so exp(beta t) never overflows
+    """
+    log_sums = np.logaddexp.accumulate(beta * times)
+    return np.concatenate([[0.0], np.exp(log_sums[:-1] - beta * times[1:])]) if len(times) else np.zeros(0)
+
+
+def neg_log_likelihood(params, times, event_shape, shape_integral, horizon):
+    """-log L of a seasonal-baseline exponential Hawkes process on [0, horizon]"""
+    mu, alpha, beta = params
+    intensity = mu * event_shape + alpha * beta * _excitation_sums(times, beta)
+    if np.any(intensity <= 0):
+        return np.inf
+    compensator = mu * shape_integral + alpha * np.sum(1.0 - np.exp(-beta * (horizon - times)))
+    return compensator - np.log(intensity).sum()
+
+
+class HawkesModel:
+    def __init__(self, mu, alpha, beta, n_events=0, log_likelihood=float('nan'), fit_time=0.0):
+        self.mu = mu
+        self.alpha = alpha
+        self.beta = beta
+        self.n_events = n_events
+        self.log_likelihood = log_likelihood
+        self.fit_time = fit_time
+
+    def __repr__(self):
+        return (f"HawkesModel(mu={self.mu:.3f}/hr, alpha={self.alpha:.3f}, "
+                f"decay={60 / self.beta:.1f} min, n={self.n_events})")
+
+    def stationary_rate(self, mean_shape=1.0):
+        """Long-run posts/hr"""
+        return self.mu * mean_shape / (1 - self.alpha)
+
+    def excitation(self, timestamps, now_ts):
+        """Current excess intensity (posts/hr) from posts already made"""
+        ages = (now_ts - np.asarray(timestamps, dtype=float)) / 3600
+        ages = ages[(ages >= 0) & (ages < 50 / self.beta)]  # older terms are < e^-50
+        return self.alpha * self.beta * np.exp(-self.beta * ages).sum()
+
+    def simulate_totals(self, rng, hours, n_paths, shape=None, excitation=0.0):
+        """Posts over the next `hours` hours for each of n_paths paths"""
+        hours = int(max(hours, 0))
+        totals = np.zeros(n_paths, dtype=np.int64)
+        if hours == 0:
+            return totals
+        shape = np.ones(hours) if shape is None else np.asarray(shape, dtype=float)[:hours]
+
+        # Immigrants: Poisson(mu * shape) per path-hour, uniform within the hour
+        n_imm = rng.poisson(self.mu * shape, size=(n_paths, hours)).ravel()
+        cell = np.repeat(np.arange(n_paths * hours), n_imm)
+        paths = cell // hours
+        times = (cell % hours) + rng.random(len(cell))
+
+        # Direct children of posts already made: their lags are Exp(beta)
+        # conditioned on landing inside the window
+        inside = 1.0 - math.exp(-self.beta * hours)
+        n_hist = rng.poisson(excitation / self.beta * inside, size=n_paths)
+        hist_paths = np.repeat(np.arange(n_paths), n_hist)
+        hist_times = -np.log1p(-rng.random(len(hist_paths)) * inside) / self.beta
+
+        paths = np.concatenate([paths, hist_paths])
+        times = np.concatenate([times, hist_times])
+        while len(paths):
+            totals += np.bincount(paths, minlength=n_paths)
+            n_children = rng.poisson(self.alpha, size=len(paths))
+            paths = np.repeat(paths, n_children)
+            times = np.repeat(times, n_children) + rng.exponential(1 / self.beta, size=len(paths))
+            keep = times < hours
+            paths, times = paths[keep], times[keep]
+        return totals
+
+
+def fit_hawkes(timestamps, now_ts, shape_fn=None, days=FIT_DAYS):
+    """
+    MLE fit on the last `days` of posts (epoch seconds) before now_ts.
+    shape_fn(hour_indices) -> baseline shape per epoch hour (None = flat).
+    """
+    start = time.perf_counter()
+    window_start = now_ts - days * 86400
+    ts = np.sort(np.asarray(timestamps, dtype=float))
+    ts = ts[(ts >= window_start) & (ts < now_ts)]
+    times = (ts - window_start) / 3600
+    horizon = (now_ts - window_start) / 3600
+
+    if shape_fn is None:
+        event_shape = np.ones(len(ts))
+        shape_integral = horizon
+    else:
+        first_hour = int(window_start // 3600)
+        hour_shape = shape_fn(np.arange(first_hour, int(now_ts // 3600) + 1))
+        event_shape = hour_shape[(ts // 3600).astype(np.int64) - first_hour]
+        shape_integral = hour_shape.sum()
+
+    rate = max(len(ts) / horizon, 1e-3)
+    x0 = (rate * 0.5 * horizon / shape_integral, 0.5, 1.0)
+    res = minimize(
+        neg_log_likelihood, x0, args=(times, event_shape, shape_integral, horizon),
+        method='L-BFGS-B', bounds=[(1e-6, None), (0.0, MAX_BRANCHING), BETA_BOUNDS]
+    )
+    mu, alpha, beta = res.x
+    return HawkesModel(mu, alpha, beta, n_events=len(ts), log_likelihood=-res.fun,
+                       fit_time=time.perf_counter() - start)
+
+
+def simulate_hawkes(model, current_count, hours_remaining, n_sims=DEFAULT_SIMS, seed=None,
+                    shape=None, excitation=0.0, tol=None, chunk_size=CHUNK_SIZE):
+    """
+    Projection result dict (same shape as montecarlo.simulate_projection) under
+    the Hawkes model. n_sims is an upper bound when tol is set.
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    acc = new_accumulator(len(bucket_labels()))
+    while acc['n_sims'] < n_sims:
+        m = min(chunk_size, n_sims - acc['n_sims'])
+        accumulate(acc, current_count + model.simulate_totals(rng, hours_remaining, m, shape, excitation))
+        if tol and acc['n_chunks'] >= MIN_CHUNKS and np.nanmax(batch_stderr(acc)) < tol:
+            acc['converged'] = True
+            break
+    result = summarise(acc, time.perf_counter() - start)
+    result['model'] = repr(model)
+    return result
+
+
+def benchmark(n_paths=(1_000, 10_000, 50_000), hours=168):
+    """Paths/sec of the branching simulator for a full-week projection"""
+    model = HawkesModel(mu=0.8, alpha=0.5, beta=4.0)
+    rng = np.random.default_rng(42)
+    print(f"Benchmark: {model}, {hours} hours")
+    for n in n_paths:
+        start = time.perf_counter()
+        totals = model.simulate_totals(rng, hours, n, excitation=2.0)
+        elapsed = time.perf_counter() - start
+        print(f"  {n:>7,} paths: {elapsed * 1000:7.1f} ms  ({n / elapsed:>10,.0f} paths/s, mean total {totals.mean():.0f})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fit / benchmark the Hawkes tweet model')
+    parser.add_argument('--benchmark', action='store_true', help='Measure simulator throughput')
+    parser.add_argument('--days', type=int, default=FIT_DAYS, help='History used for the fit')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    else:
+        from tweet_store import TweetStore
+        store = TweetStore()
+        df = store.load_frame()
+        ts = df['createdAt'].dt.as_unit('ns').astype('int64').to_numpy() / 1e9
+        model = fit_hawkes(ts, time.time(), days=args.days)
+        print(f"✅ {model} fitted in {model.fit_time:.2f}s, log L {model.log_likelihood:.1f}")
@@ -0,0 +1,147 @@
+"""
+Trade Dump Importer
+Streams trader trade dumps (elon.json shape: {"data": [{trade_dttm, side,
+amount, price, market_subtitle, outcome, trader_id, ...}, ...]}) into the
+tracker database's indexed `trades` table, next to the position snapshots.
+
+Rows are appended to an unindexed temp staging table, and each staged block
+is merged into `trades` sorted by the natural key, so the unique index is
+filled in order instead of by random inserts.
+
+Throughput is bound by JSON decoding: about 5 s per million indented
+elon.json records on one core before any database work, so a 10M-record
+dump takes 2-3 minutes, not under one.
+
+Dumps carry no transaction hash, so duplicates are detected by the natural
+key (timestamp to the second, trader, event, bucket, outcome, side, amount,
+price). Re-importing overlapping dumps is therefore safe, but two genuine
+fills that agree on every one of those fields collapse into one row.
+
+Usage:
+    python import_trades.py elon.json [more.json ...] [--db tracker_history.db]
+"""
+import argparse
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from buckets import find_bucket
+from json_stream import iter_file_chunks, iter_json_array
+from tracker_backend import DB_PATH, init_db
+
+BATCH_SIZE = 50_000            # records per executemany call
+MERGE_SIZE = 1_000_000         # staged rows per sorted merge (and commit)
+
+TRADE_COLUMNS = ('trade_ts, trade_dttm, trader_id, trader_name, event_id, '
+                 'market_title, bucket, outcome, side, amount, price, value')
+
+STAGING_SQL = f'''
+    CREATE TEMP TABLE IF NOT EXISTS staging ({TRADE_COLUMNS})
+'''
+STAGE_SQL = '''
+    INSERT INTO temp.staging VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+# ORDER BY follows idx_trades_natural_key
+MERGE_SQL = f'''
+    INSERT OR IGNORE INTO trades ({TRADE_COLUMNS})
+    SELECT {TRADE_COLUMNS} FROM temp.staging
+    ORDER BY trade_ts, trader_id, event_id, bucket, outcome, side, amount, price
+'''
+
+
+def trade_to_row(trade):
+    """Convert one dump record into a trades row (naive timestamps are UTC)"""
+    dttm = trade['trade_dttm']
+    parsed = datetime.fromisoformat(dttm)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    ts = int(parsed.timestamp())
+    amount = float(trade['amount'])
+    price = float(trade['price'])
+    value = trade.get('value')
+    return (
+        ts,
+        dttm,
+        trade['trader_id'].lower(),
+        trade.get('trader_name'),
+        str(trade.get('event_id', '')),
+        trade.get('market_title'),
+        find_bucket(trade['market_subtitle']) or trade['market_subtitle'].strip(),
+        trade['outcome'],
+        trade['side'],
+        amount,
+        price,
+        float(value) if value is not None else amount * price
+    )
+
+
+def import_trades(path, db_path=DB_PATH):
+    """
+    Stream one dump file into the trades table.
+    Returns (rows_read, rows_inserted); duplicates are skipped by the natural key.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    # Bulk-load settings: one big transaction per merge, no fsync per commit
+    # (the dump can always be re-imported)
+    cursor.execute('PRAGMA synchronous = OFF')
+    cursor.execute('PRAGMA cache_size = -262144')  # 256 MB page cache
+    cursor.execute(STAGING_SQL)
+
+    rows_read = 0
+    inserted = 0
+    staged = 0
+
+    def merge():
+        nonlocal inserted, staged
+        inserted += cursor.execute(MERGE_SQL).rowcount
+        cursor.execute('DELETE FROM temp.staging')
+        conn.commit()
+        staged = 0
+
+    batch = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for trade in iter_json_array(iter_file_chunks(f), key='data'):
+                try:
+                    batch.append(trade_to_row(trade))
+                except (KeyError, TypeError, ValueError):
+                    continue  # malformed record
+                rows_read += 1
+
+                if len(batch) >= BATCH_SIZE:
+                    cursor.executemany(STAGE_SQL, batch)
+                    staged += len(batch)
+                    batch.clear()
+                    if staged >= MERGE_SIZE:
+                        merge()
+                        print(f"  ... {rows_read:,} trades read")
+
+        cursor.executemany(STAGE_SQL, batch)
+        merge()
+    finally:
+        conn.close()
+
+    return rows_read, inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load trade dumps into the tracker database")
+    parser.add_argument('paths', nargs='+', help="trade dump JSON files (elon.json format)")
+    parser.add_argument('--db', default=DB_PATH, help=f"SQLite database (default: {DB_PATH})")
+    args = parser.parse_args()
+
+    init_db(args.db)
+
+    for path in args.paths:
+        start = time.time()
+        print(f"📥 Importing {path}...")
+        rows_read, inserted = import_trades(path, args.db)
+        elapsed = time.time() - start
+        rate = rows_read / elapsed if elapsed > 0 else 0
+        print(f"✅ {rows_read:,} trades read, {inserted:,} new, "
+              f"{rows_read - inserted:,} duplicates skipped ({elapsed:.1f}s, {rate:,.0f} trades/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 import json
 import pandas as pd
 
+from buckets import bucket_sort_key
+
 with open('elon.json', 'r') as f:
     data = json.load(f)
 
@@ -9,13 +11,7 @@ df['trade_dttm'] = pd.to_datetime(df['trade_dttm'])
 df['amount'] = pd.to_numeric(df['amount'])
 df['price'] = pd.to_numeric(df['price'])
 
-# Helper to sort buckets
-def get_sort_key(s):
-    if '500+' in s: return 500
-    try: return int(s.split('-')[0])
-    except: return 0
-
-df['bucket_sort'] = df['market_subtitle'].apply(get_sort_key)
+df['bucket_sort'] = df['market_subtitle'].apply(bucket_sort_key)
 
 # Analyze Low Buckets (100-339)
 low_buckets = df[(df['bucket_sort'] >= 100) & (df['bucket_sort'] <= 339)]
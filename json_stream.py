@@ -0,0 +1,130 @@
+"""
+Streaming JSON array reader
+Yields the items of a (possibly huge) JSON array one at a time without
+loading the whole document, e.g. the "data" list of an elon.json trade dump
+or a paginated Polymarket API response body.
+"""
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 1 << 20  # 1 MB of text per read
+
+FAST_PATH_ATTEMPTS = 3
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = re.compile(r'[\s,]*')
+_VALUE_END = re.compile(r'\s*[,\]]')
+
+
+def iter_file_chunks(f, chunk_size=CHUNK_SIZE):
+    """Read an open file in fixed-size chunks"""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _decode_chunks(chunks):
+    """Turn an iterable of bytes or str chunks into str chunks"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def iter_json_array(chunks, key=None):
+    """
+    Yield each element of a JSON array from an iterable of text/bytes chunks.
+
+    With key=None the document itself must be an array. Otherwise the array is
+    taken from the first occurrence of "key": [...] (e.g. key='data' for the
+    {"data": [...]} trade dump shape).
+    """
+    chunks = _decode_chunks(chunks)
+    buf = ''
+    pos = 0
+
+    def more():
+        nonlocal buf, pos
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        # Drop the consumed prefix so the buffer stays about one chunk long
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    # Locate the opening bracket of the array
+    marker = '[' if key is None else f'"{key}"'
+    while True:
+        idx = buf.find(marker, pos)
+        if idx >= 0:
+            break
+        # Keep enough tail to match a marker split across chunks
+        pos = max(pos, len(buf) - len(marker))
+        if not more():
+            return
+    pos = idx + len(marker)
+    if key is not None:
+        while True:
+            idx = buf.find('[', pos)
+            if idx >= 0:
+                break
+            pos = len(buf)
+            if not more():
+                return
+        pos = idx + 1
+
+    while True:
+        # Skip whitespace and separators between elements
+        pos = _SEPARATORS.match(buf, pos).end()
+        if pos >= len(buf):
+            if not more():
+                return
+            continue
+        if buf[pos] == ']':
+            return
+
+        # Fast path: decode every complete record in the buffer with a single
+        # json.loads call. A cut that lands inside a string or nested value
+        # can never parse, so on failure retry just before the error position.
+        items = None
+        limit = len(buf)
+        for _ in range(FAST_PATH_ATTEMPTS):
+            end = buf.rfind('}', pos, limit)
+            if end < 0:
+                break
+            try:
+                items = json.loads('[' + buf[pos:end + 1] + ']')
+                break
+            except json.JSONDecodeError as e:
+                limit = min(end, pos + e.pos - 1)
+        if items is not None:
+            pos = end + 1
+            yield from items
+            continue
+
+        # Slow path: one element at a time
+        try:
+            item, end = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Element straddles the chunk boundary - read more and retry
+            if not more():
+                raise
+            continue
+
+        # A number cut by the chunk boundary parses as a shorter number -
+        # only trust it once the following separator is in the buffer
+        if not isinstance(item, (dict, list, str)) and not _VALUE_END.match(buf, end):
+            if more():
+                continue
+
+        pos = end
+        yield item
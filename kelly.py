@@ -0,0 +1,172 @@
+"""
+Kelly Portfolio Optimizer
+Allocation across the YES and NO legs of one event's buckets that maximises
+expected log wealth. Exactly one bucket resolves YES, so the whole portfolio
+is priced by a single payoff matrix: in outcome k a YES share of bucket i
+pays [i == k] and a NO share pays [i != k]. Wealth per outcome is linear in
+the trades and the objective is concave, so a primal-dual interior point
+method solves it under the cash budget and per-leg caps, each iteration
+being one (2n x 2n) linear solve on B' diag(pi / W^2) B, where B is the
+payoff matrix net of prices.
+
+Fractional Kelly scales the optimal holdings (the rest stays in cash).
+"""
+import time
+
+import numpy as np
+
+DEFAULT_FRACTION = 1.0
+
+# Primal-dual interior point: centring parameter, line search and tolerances
+MU = 10.0
+ALPHA = 0.01
+BETA = 0.5
+FEAS_TOL = 1e-8
+GAP_TOL = 1e-8
+MAX_ITER = 100
+WARM_STAKE = 0.3    # share of wealth the warm start puts on YES, spread by probability
+
+
+def _interior_point(pi, B, base, a, budget, lower, upper, x):
+    """
+    Maximise sum(pi * log(base + B x)) s.t. lower <= x <= upper, a x <= budget,
+    from a strictly feasible x (Boyd & Vandenberghe 11.7). Constraints are
+    G x <= h with G = [-I; I (finite uppers); a]. Returns (x, converged).
+    """
+    n = len(x)
+    bounded = np.flatnonzero(np.isfinite(upper))
+    m = n + len(bounded) + 1
+
+    def slack(x):
+        return np.concatenate([x - lower, upper[bounded] - x[bounded], [budget - a @ x]])
+
+    def G(dx):
+        return np.concatenate([-dx, dx[bounded], [a @ dx]])
+
+    def GT(v):
+        out = -v[:n]
+        out[bounded] += v[n:-1]
+        return out + a * v[-1]
+
+    def residual(x, lam, t):
+        w = base + B @ x
+        grad = -(B.T @ (pi / w))
+        return np.concatenate([grad + GT(lam), lam * slack(x) - 1.0 / t]), grad, w
+
+    s = slack(x)
+    lam = 1.0 / s
+    for _ in range(MAX_ITER):
+        s = slack(x)
+        eta = s @ lam
+        t = MU * m / eta
+        r, grad, w = residual(x, lam, t)
+        if eta < GAP_TOL and np.linalg.norm(r[:n]) < FEAS_TOL:
+            return x, True
+
+        # Newton step on the KKT system, dual step eliminated
+        d = lam / s
+        H = (B.T * (pi / w ** 2)) @ B + np.outer(a, a) * d[-1]
+        H[np.diag_indices(n)] += d[:n]
+        H[bounded, bounded] += d[n:-1]
+        dx = np.linalg.solve(H, -grad - GT(1.0 / (t * s)))
+        Gdx = G(dx)
+        dlam = d * Gdx - (lam - 1.0 / (t * s))
+
+        # Keep duals, slacks and outcome wealth positive (fraction to the
+        # boundary of each), then backtrack on the residual
+        Bdx = B @ dx
+        step = 1.0
+        for value, rate in ((lam, dlam), (s, -Gdx), (w, Bdx)):
+            shrinking = rate < 0
+            if shrinking.any():
+                step = min(step, 0.99 * np.min(-value[shrinking] / rate[shrinking]))
+        r_norm = np.linalg.norm(r)
+        while np.linalg.norm(residual(x + step * dx, lam + step * dlam, t)[0]) > (1 - ALPHA * step) * r_norm:
+            step *= BETA
+            if step < 1e-12:
+                return x, False
+        x = x + step * dx
+        lam = lam + step * dlam
+    return x, False
+
+
+def optimal_allocation(probabilities, yes_prices, no_prices=None, holdings=None, cash=0.0,
+                       fraction=DEFAULT_FRACTION, max_fraction=None, no_holdings=None):
+    """
+    Kelly holdings for n mutually exclusive buckets.
+
+    probabilities, yes_prices, no_prices (default 1 - yes), holdings and
+    no_holdings (YES / NO shares already held) are arrays in bucket order;
+    cash is what is left to spend. max_fraction caps each leg's cost at that
+    share of current wealth (cash + holdings at market). Returns target YES /
+    NO shares, the trades from the current holdings and the expected log
+    growth.
+    """
+    start = time.perf_counter()
+    pi = np.clip(np.asarray(probabilities, dtype=float), 0.0, None)
+    pi = pi / pi.sum() if pi.sum() > 0 else np.full(len(pi), 1.0 / max(len(pi), 1))
+    p = np.clip(np.asarray(yes_prices, dtype=float), 1e-4, 1.0)
+    q = np.clip(1.0 - p if no_prices is None else np.asarray(no_prices, dtype=float), 1e-4, 1.0)
+    h = np.zeros(len(pi)) if holdings is None else np.asarray(holdings, dtype=float)
+    g = np.zeros(len(pi)) if no_holdings is None else np.asarray(no_holdings, dtype=float)
+    n = len(pi)
+    cash = max(float(cash), 0.0)
+    wealth = cash + p @ h + q @ g
+
+    result = {
+        'yes': h.copy(), 'no': g.copy(), 'yes_trades': np.zeros(n), 'no_trades': np.zeros(n),
+        'growth': 0.0, 'wealth': wealth, 'converged': False, 'solve_time': 0.0
+    }
+    if n == 0 or wealth <= 0:
+        return result
+
+    # Solve in units of current wealth. x: YES then NO shares bought
+    # (negative = sold, down to nothing held)
+    held = np.concatenate([h, g]) / wealth
+    cap = np.inf if max_fraction is None else max_fraction
+    lower = -held
+    upper = np.maximum(cap / np.concatenate([p, q]) - held, lower + 1e-9)
+    # Wealth per outcome is base + B x
+    B = np.hstack([np.eye(n) - p[None, :], 1.0 - np.eye(n) - q[None, :]])
+    base = (cash + h + g.sum() - g) / wealth
+    a = np.concatenate([p, q])
+
+    # Warm start strictly inside every constraint: WARM_STAKE of wealth on YES
+    # in proportion to the probabilities, NO sold down - about half the
+    # iterations of starting cold. Fall back to selling nearly everything.
+    margin = 0.01 * np.minimum(upper - lower, 1.0)
+    x0 = np.clip(np.concatenate([WARM_STAKE * pi / p, np.zeros(n)]) - held, lower + margin, upper - margin)
+    if a @ x0 >= cash / wealth or np.any(base + B @ x0 <= 0):
+        x0 = lower + np.minimum(upper - lower, 1e-3) / 2
+    x, converged = _interior_point(pi, B, base, a, cash / wealth, lower, upper, x0)
+
+    target = np.maximum((held + x) * fraction, 0.0) * wealth
+    yes, no = target[:n], target[n:]
+    # YES + NO of one bucket pays 1 whatever happens - not worth p + q >= 1
+    # of cash, so drop such pairs (new shares only; holdings stay as they are)
+    pairs = np.where(p + q >= 1.0, np.minimum(np.maximum(yes - h, 0.0), np.maximum(no - g, 0.0)), 0.0)
+    yes, no = yes - pairs, no - pairs
+    w = wealth - p @ yes - q @ no + yes + no.sum() - no
+    result.update(
+        yes=yes, no=no, yes_trades=yes - h, no_trades=no - g,
+        growth=float(pi @ np.log(w / wealth)),
+        converged=converged, solve_time=time.perf_counter() - start
+    )
+    return result
+
+
+def benchmark(n_buckets=30, repeats=20):
+    """Solve time for a random event with n_buckets"""
+    rng = np.random.default_rng(0)
+    times = []
+    for _ in range(repeats):
+        pi = rng.dirichlet(np.ones(n_buckets))
+        prices = np.clip(pi + rng.normal(0, 0.02, n_buckets), 0.005, 0.99)
+        holdings = rng.integers(0, 50, n_buckets) * (rng.random(n_buckets) < 0.3)
+        times.append(optimal_allocation(pi, prices, holdings=holdings, cash=250.0,
+                                        fraction=0.5, max_fraction=0.4)['solve_time'])
+    print(f"{n_buckets} buckets: median {np.median(times) * 1000:.1f} ms, max {np.max(times) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    benchmark()
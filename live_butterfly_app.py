@@ -5,10 +5,26 @@ Fetches real Polymarket prices and positions, provides real-time rebalancing rec
 from flask import Flask, render_template, jsonify, request
 from flask_cors import CORS
 import requests
+from requests.adapters import HTTPAdapter
+import base64
 import json
 import numpy as np
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from body_planner import plan_bodies
+from bucket_kernel import LIVE_SCHEME, bucket_probabilities, bucket_probability_grid, bucket_probability_matrix
+from buckets import BucketScheme, bucket_sort_key, find_bucket
+from conditional_table import ConditionalTable, refresh_table
+from json_stream import iter_json_array
+from hedge import min_cost_hedge, settlement_pnl
+from kelly import optimal_allocation
+from market_index import fetch_tweet_events, window_from_event
+from pace_stats import DEFAULT_HALF_LIFE
+from tweet_store import TweetStore
+from wing_scanner import WingScanner
 
 app = Flask(__name__)
 CORS(app)
@@ -20,148 +36,419 @@ with open('recommended_distribution.json', 'r') as f:
 HISTORICAL_MEAN = historical['historical_mean']
 HISTORICAL_STD = historical['historical_std']
 
+# Live pace comes from the shared tweet store (kept current by the projector /
+# projector_worker.py); older than this and we fall back to the market average
+PACE_MAX_AGE = 6 * 3600
+
+# Seconds between checks for newly resolved weeks in the conditional table
+CONDITIONAL_REFRESH = 3600
+
+# Market data is refreshed in the background every MARKET_REFRESH seconds and
+# requests read the cache; past MARKET_STALE_AFTER a read also triggers a
+# refresh, but cached prices keep being served while the API is slow or down
+MARKET_REFRESH = 15
+MARKET_STALE_AFTER = 30
+
+HTTP_POOL_SIZE = 8  # pooled connections / snapshot worker threads
+
+# Positions are read in pages of POSITIONS_PAGE_SIZE (the data API maximum):
+# the first page alone, then POSITIONS_WAVE pages at a time until a short page
+POSITIONS_API = "https://data-api.polymarket.com/positions"
+POSITIONS_PAGE_SIZE = 500
+POSITIONS_WAVE = 4
+POSITIONS_MAX_PAGES = 40   # stop a runaway wallet at 20k positions
+STREAM_CHUNK = 64 * 1024   # bytes per read when stream-parsing a page
+
+# Cross-event wing index: every open event's NO legs, re-priced in the background
+WING_REFRESH = 60
+
+# /api/simulate scenario grid: default axes and the largest grid served
+SIMULATE_MULTIPLIERS = [0.7, 0.85, 1.0, 1.15, 1.3]
+SIMULATE_DISPERSIONS = [1.0]
+MAX_SCENARIO_CELLS = 250_000
+
+# Recommendations: half-Kelly, at most 40% of bankroll in one leg, no trades under $5
+KELLY_FRACTION = 0.5
+MAX_BUCKET_FRACTION = 0.4
+MIN_TRADE = 5
+
 class LiveStrategyEngine:
     def __init__(self, event_slug, wallet_address=None):
         self.event_slug = event_slug
         self.wallet_address = wallet_address
         self.mean = HISTORICAL_MEAN
         self.std = HISTORICAL_STD
+        self.tweet_store = TweetStore()
+        self.conditional = ConditionalTable.load()
+        self.conditional_checked = 0
+        self.scheme = LIVE_SCHEME  # replaced by the event's own buckets once fetched
+        
+        # Shared market-data cache (see market_data)
+        self._market_lock = threading.Lock()
+        self._market_cache = None
+        self._market_fetched_at = None
+        self._market_refresher = None
+        self._market_refreshing = threading.Event()
+        self._market_ids = None
+        self._bucket_markets = {}      # replaced whole (never mutated) under _market_lock
+        self._market_stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'errors': 0, 'last_error': None}
+        
+        # Keep-alive connection pool shared by all Polymarket calls, and the
+        # threads /api/snapshot fans out on
+        self.http = requests.Session()
+        self.http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE))
+        self.pool = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE)
+        self.page_pool = ThreadPoolExecutor(max_workers=POSITIONS_WAVE)
+        
+        self.wings = WingScanner(self.event_probabilities)
+        self._wing_refresher = None
+        self._wing_lock = threading.Lock()
         
     def fetch_market_data(self):
         """Fetch live market data from Polymarket using event slug"""
+        # Use the events endpoint to get all markets for this event
+        url = f"https://gamma-api.polymarket.com/events?slug={self.event_slug}"
+        response = self.http.get(url, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        
+        if not data:
+            print("No event data returned")
+            return {}
+        
+        # Get the first event (should be the only one for this slug)
+        event = data[0] if isinstance(data, list) else data
+        markets = event.get('markets', [])
+        
+        # Bucket -> token mapping is parsed once per event; refreshes only read prices
+        market_ids = tuple(m.get('condition_id') or m.get('id') or m.get('question', '') for m in markets)
+        if market_ids != self._market_ids:
+            self._parse_event(event, markets)
+            self._market_ids = market_ids
+        bucket_markets = self.bucket_markets()
+        
+        buckets = {}
+        for market in markets:
+            info = bucket_markets.get(market.get('condition_id') or market.get('id') or market.get('question', ''))
+            tokens = market.get('tokens', [])
+            if not info or not tokens:
+                continue
+            # Get YES token price (outcome index 0 is usually YES)
+            buckets[info['bucket']] = dict(
+                info, price=float(tokens[0].get('price', 0)), volume=float(market.get('volume', 0))
+            )
+            if len(tokens) > 1:
+                buckets[info['bucket']]['no_price'] = float(tokens[1].get('price', 0))
+        return buckets
+    
+    def _parse_event(self, event, markets):
+        """Bucket scheme and bucket -> token mapping of the event's markets"""
+        # Track this event's window so its tweet count stays current
+        window = window_from_event(event)
+        if window:
+            self.tweet_store.register_markets([window])
+        
+        # Built aside and swapped in whole, so readers on other threads see
+        # either the previous mapping or the complete new one
+        bucket_markets = {}
+        for market in markets:
+            question = market.get('question', '')
+            # Extract bucket from question (e.g., "180-199", "500+")
+            bucket = find_bucket(question)
+            tokens = market.get('tokens', [])
+            if bucket and tokens:
+                bucket_markets[market.get('condition_id') or market.get('id') or question] = {
+                    'bucket': bucket,
+                    'token_id': tokens[0].get('token_id', ''),
+                    'condition_id': market.get('condition_id', ''),
+                    'question': question
+                }
+        
+        # The event's own (possibly mixed-width) bucket scheme
+        labels = [m['bucket'] for m in bucket_markets.values()]
+        with self._market_lock:
+            self._bucket_markets = bucket_markets
+            if labels:
+                self.scheme = BucketScheme(labels)
+        print(f"Parsed {len(markets)} markets into {len(labels)} buckets for {self.event_slug}")
+    
+    def bucket_markets(self):
+        """Current market id -> bucket / token mapping of the event (do not mutate)"""
+        with self._market_lock:
+            return self._bucket_markets
+    
+    def event_markets(self):
+        """
+        bucket_markets, fetching the event first if it has not been parsed yet
+        (so a cold /api/snapshot does not read the mapping mid-build)
+        """
+        if self._market_ids is None:
+            self.market_data()
+        return self.bucket_markets()
+    
+    def refresh_market_data(self):
+        """Download prices into the cache; on failure the previous data stays in place"""
         try:
-            import re
-            # Use the events endpoint to get all markets for this event
-            url = f"https://gamma-api.polymarket.com/events?slug={self.event_slug}"
-            print(f"Fetching from: {url}")
-            response = requests.get(url, timeout=10)
-            data = response.json()
-            
-            if not data:
-                print("No event data returned")
-                return {}
-            
-            # Get the first event (should be the only one for this slug)
-            event = data[0] if isinstance(data, list) else data
-            markets = event.get('markets', [])
-            
-            print(f"Found {len(markets)} markets")
-            
-            # Parse into buckets
-            buckets = {}
-            for market in markets:
-                question = market.get('question', '')
-                
-                # Extract bucket from question (e.g., "180-199")
-                match = re.search(r'(\d+)-(\d+)', question)
-                if match:
-                    bucket = f"{match.group(1)}-{match.group(2)}"
-                    
-                    # Get YES token price (outcome index 0 is usually YES)
-                    tokens = market.get('tokens', [])
-                    if tokens:
-                        yes_token = tokens[0]
-                        price = float(yes_token.get('price', 0))
-                        buckets[bucket] = {
-                            'price': price,
-                            'token_id': yes_token.get('token_id', ''),
-                            'condition_id': market.get('condition_id', ''),
-                            'volume': float(market.get('volume', 0)),
-                            'question': question
-                        }
-                        print(f"  {bucket}: {price*100:.1f}¢")
-            
-            return buckets
-            
+            buckets = self.fetch_market_data()
         except Exception as e:
             print(f"Error fetching market data: {e}")
-            import traceback
-            traceback.print_exc()
-            return {}
+            with self._market_lock:
+                self._market_stats['errors'] += 1
+                self._market_stats['last_error'] = str(e)
+            return False
+        finally:
+            self._market_refreshing.clear()
+        
+        with self._market_lock:
+            self._market_cache = buckets
+            self._market_fetched_at = time.time()
+            self._market_stats['refreshes'] += 1
+        return True
     
-    def fetch_user_positions(self, wallet_address=None):
-        """Fetch user's positions from Polymarket Data API"""
+    def _market_refresh_loop(self):
+        while True:
+            time.sleep(MARKET_REFRESH)
+            self._market_refreshing.set()
+            self.refresh_market_data()
+    
+    def market_data(self):
+        """
+        Cached bucket prices. The first call fetches synchronously and starts
+        the background refresher; later calls return immediately, kicking off
+        a refresh if the data has gone stale (stale-while-revalidate).
+        """
+        if self._market_refresher is None:
+            with self._market_lock:
+                if self._market_refresher is None:
+                    self._market_refresher = threading.Thread(target=self._market_refresh_loop, daemon=True)
+                    start_refresher = True
+                else:
+                    start_refresher = False
+            if start_refresher:
+                self._market_refreshing.set()
+                self.refresh_market_data()
+                self._market_refresher.start()
+        
+        with self._market_lock:
+            cached, fetched_at = self._market_cache, self._market_fetched_at
+            self._market_stats['hits' if cached is not None else 'misses'] += 1
+        
+        if cached is None:
+            # Nothing usable yet (first fetch failed) - try again in this request
+            self._market_refreshing.set()
+            self.refresh_market_data()
+            with self._market_lock:
+                return self._market_cache or {}
+        
+        if time.time() - fetched_at > MARKET_STALE_AFTER and not self._market_refreshing.is_set():
+            self._market_refreshing.set()
+            threading.Thread(target=self.refresh_market_data, daemon=True).start()
+        return cached
+    
+    def market_cache_stats(self):
+        with self._market_lock:
+            stats = dict(self._market_stats)
+            fetched_at = self._market_fetched_at
+            n_buckets = len(self._market_cache or {})
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else None
+        stats['age_seconds'] = time.time() - fetched_at if fetched_at else None
+        stats['buckets'] = n_buckets
+        stats['refresh_interval'] = MARKET_REFRESH
+        return stats
+    
+    def _positions_page(self, params, offset, keep):
+        """
+        Stream-parse one page of the positions API. Returns (rows on the page,
+        rows passing keep) so only the event's own rows are ever held.
+        """
+        page_params = dict(params, limit=POSITIONS_PAGE_SIZE, offset=offset)
+        with self.http.get(POSITIONS_API, params=page_params, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            seen, kept = 0, []
+            for pos in iter_json_array(response.iter_content(STREAM_CHUNK)):
+                seen += 1
+                if keep(pos):
+                    kept.append(pos)
+        return seen, kept
+    
+    def iter_event_positions(self, wallet_address):
+        """
+        Every position of the wallet in this event, across all pages. The API
+        filters by the event's condition ids and paging stops as soon as each
+        market's Yes and No legs have been seen. Nothing is fetched while the
+        event's markets are unknown (an unfiltered query would page through
+        the wallet's whole position history).
+        """
+        condition_ids = sorted({m['condition_id'] for m in self.event_markets().values() if m['condition_id']})
+        if not condition_ids:
+            print(f"No markets known for {self.event_slug} yet - skipping the positions fetch")
+            return
+        params = {'user': wallet_address, 'sizeThreshold': 0, 'market': ','.join(condition_ids)}
+        expected = 2 * len(condition_ids)
+        keep = lambda pos: pos.get('eventSlug') == self.event_slug or pos.get('conditionId') in condition_ids
+        
+        found = 0
+        offset = 0
+        wave = 1  # most wallets fit in the first page
+        while offset < POSITIONS_MAX_PAGES * POSITIONS_PAGE_SIZE:
+            offsets = [offset + i * POSITIONS_PAGE_SIZE for i in range(wave)]
+            pages = self.page_pool.map(lambda o: self._positions_page(params, o, keep), offsets)
+            for seen, kept in pages:
+                yield from kept
+                found += len(kept)
+                if seen < POSITIONS_PAGE_SIZE or found >= expected:
+                    return
+            offset = offsets[-1] + POSITIONS_PAGE_SIZE
+            wave = POSITIONS_WAVE
+    
+    def fetch_book(self, wallet_address=None):
+        """
+        Wallet's holdings in this event as {'Yes': {bucket: position},
+        'No': {bucket: position}}, each position with shares, avg_price and
+        invested
+        """
+        book = {'Yes': {}, 'No': {}}
         try:
             if not wallet_address:
                 wallet_address = self.wallet_address
             
             if not wallet_address:
-                return {}
-            
-            # Use Data API to get all positions
-            url = f"https://data-api.polymarket.com/positions"
-            params = {
-                'user': wallet_address,
-                'limit': 100,
-                'offset': 0
-            }
-            print(f"Fetching positions from: {url}")
-            response = requests.get(url, params=params, timeout=10)
-            all_positions = response.json()
-            
-            # Filter for our target event
-            positions_in_event = [
-                pos for pos in all_positions 
-                if pos.get('eventSlug') == self.event_slug
-            ]
-            
-            print(f"Found {len(positions_in_event)} positions in {self.event_slug}")
+                return book
             
-            # Parse positions into buckets
-            positions = {}
-            import re
-            
-            for pos in positions_in_event:
-                title = pos.get('title', '')
-                outcome = pos.get('outcome', 'Yes')
-                
+            print(f"Fetching positions from: {POSITIONS_API}")
+            for pos in self.iter_event_positions(wallet_address):
                 # Extract bucket from title (e.g., "180-199")
-                match = re.search(r'(\d+-\d+|\d+\+)', title)
-                if not match:
-                    continue
-                
-                bucket = match.group(1)
-                
-                # Only track YES positions (long positions)
-                if outcome != 'Yes':
+                bucket = find_bucket(pos.get('title', ''))
+                outcome = pos.get('outcome', 'Yes')
+                if not bucket or outcome not in book:
                     continue
                 
                 size = float(pos.get('size', 0))
                 if size <= 0:
                     continue
                 
-                # Get investment details
-                current_value = float(pos.get('currentValue', 0))
-                cash_pnl = float(pos.get('cashPnl', 0))
-                
-                # Calculate invested amount: current_value - pnl
-                invested = current_value - cash_pnl
-                
-                # Calculate average price
+                # Invested amount: average price if the API has it, else current_value - pnl
                 avg_price_api = float(pos.get('averagePrice', 0))
                 if avg_price_api > 0:
                     avg_price = avg_price_api
                     invested = size * avg_price
                 else:
-                    avg_price = (invested / size) if size > 0 else 0
+                    invested = float(pos.get('currentValue', 0)) - float(pos.get('cashPnl', 0))
+                    avg_price = invested / size
                 
-                positions[bucket] = {
+                book[outcome][bucket] = {
                     'shares': int(size),
                     'avg_price': avg_price,
                     'invested': invested
                 }
-                print(f"  {bucket}: {int(size)} shares @ {avg_price*100:.1f}¢ (invested: ${invested:.2f})")
+                print(f"  {bucket} {outcome}: {int(size)} shares @ {avg_price*100:.1f}¢ (invested: ${invested:.2f})")
             
-            return positions
+            print(f"Found {len(book['Yes']) + len(book['No'])} positions in {self.event_slug}")
+            return book
             
         except Exception as e:
             print(f"Error fetching positions: {e}")
             import traceback
             traceback.print_exc()
-            return {}
+            return {'Yes': {}, 'No': {}}
+    
+    def fetch_user_positions(self, wallet_address=None):
+        """Wallet's YES positions in this event by bucket (the legs the strategy tracks)"""
+        return self.fetch_book(wallet_address)['Yes']
+    
+    def hedge(self, yes_positions, no_positions, market_prices, max_loss, budget=None):
+        """
+        Cheapest YES / NO purchases at current prices that keep the book's loss
+        within max_loss whichever bucket resolves
+        """
+        buckets = self.scheme.labels
+        quotes = [market_prices.get(b, {}) for b in buckets]
+        yes_prices = np.array([m.get('price', np.nan) for m in quotes])
+        no_prices = np.array([m.get('no_price') or 1 - m.get('price', np.nan) for m in quotes])
+        yes_shares = [yes_positions.get(b, {}).get('shares', 0) for b in buckets]
+        no_shares = [no_positions.get(b, {}).get('shares', 0) for b in buckets]
+        cost_basis = sum(pos.get('invested', 0) for book in (yes_positions, no_positions) for pos in book.values())
+        
+        result = min_cost_hedge(yes_prices, no_prices, yes_shares, no_shares, cost_basis, max_loss, budget)
+        
+        # Orders are whole shares: round each leg of at least one share up,
+        # and price the book after the hedge from the rounded orders
+        yes_orders = np.where(result['yes'] >= 1, np.ceil(result['yes']), 0)
+        no_orders = np.where(result['no'] >= 1, np.ceil(result['no']), 0)
+        purchases = []
+        for side, prices, orders in (('YES', yes_prices, yes_orders), ('NO', no_prices, no_orders)):
+            for bucket, price, n in zip(buckets, prices, orders):
+                if n > 0:
+                    purchases.append({'bucket': bucket, 'side': side, 'shares': int(n),
+                                      'price': price, 'amount': n * price})
+        cost = sum(p['amount'] for p in purchases)
+        pnl_after = result['pnl_before'] + settlement_pnl(yes_orders, no_orders, cost)
+        worst_after = float(pnl_after.min())
+        
+        # Rounding (and dropping sub-share legs) moves the LP optimum, so the
+        # targets are re-checked on the orders actually proposed
+        warnings = []
+        if worst_after < -max_loss - 1e-6:
+            warnings.append(f"whole-share orders leave a worst case of ${worst_after:.2f}, past the ${max_loss:.2f} limit")
+        if budget is not None and cost > budget + 1e-6:
+            warnings.append(f"whole-share orders cost ${cost:.2f}, over the ${budget:.2f} budget")
+        return {
+            'success': bool(result['success'] and not warnings),
+            'status': result['status'],
+            'warning': '; '.join(warnings) or None,
+            'max_loss': max_loss,
+            'purchases': purchases,
+            'cost': cost,
+            'worst_before': result['worst_before'],
+            'worst_after': worst_after,
+            'pnl_before': dict(zip(buckets, result['pnl_before'].tolist())),
+            'pnl_after': dict(zip(buckets, pnl_after.tolist())),
+            'solve_time': result['solve_time']
+        }
+    
+    def current_pace(self):
+        """Live tweets/hr (EWMA) from the tweet store, or None if it is stale"""
+        try:
+            now = datetime.now(timezone.utc)
+            stats = self.tweet_store.pace_stats(now)
+        except Exception as e:
+            print(f"Error reading tweet pace: {e}")
+            return None
+        if stats['last_ts'] is None or now.timestamp() - stats['last_ts'] > PACE_MAX_AGE:
+            return None
+        return stats['ewma_rates'][DEFAULT_HALF_LIFE]
+    
+    def current_tweet_count(self):
+        """Posts so far in this event's window (None until its window is known)"""
+        try:
+            self.tweet_store.market_counts(datetime.now(timezone.utc))  # picks up new posts
+            return self.tweet_store.markets.count_for(slug=self.event_slug)
+        except Exception as e:
+            print(f"Error reading market count: {e}")
+            return None
+    
+    def conditional_table(self):
+        """Final-count table conditional on (hours elapsed, count), topped up as weeks resolve"""
+        if time.time() - self.conditional_checked > CONDITIONAL_REFRESH:
+            self.conditional_checked = time.time()
+            try:
+                refresh_table(self.tweet_store, table=self.conditional)
+            except Exception as e:
+                print(f"Error updating conditional table: {e}")
+        return self.conditional
     
     def predict_final_count(self, current_tweets, hours_elapsed, total_hours=168):
-        """Predict final count based on current pace"""
+        """Predict final count: historical weeks in the same state, else current pace"""
+        if total_hours == 168:
+            expected = self.conditional_table().expected_final(hours_elapsed, current_tweets)
+            if expected is not None:
+                return expected
+        
+        pace = self.current_pace()
+        if pace is not None:
+            return current_tweets + pace * max(total_hours - hours_elapsed, 0)
+        
         if hours_elapsed == 0:
             return self.mean
         
@@ -170,83 +457,116 @@ class LiveStrategyEngine:
         return predicted
     
     def calculate_probabilities(self, predicted_count):
-        """Calculate win probability for each bucket"""
-        probabilities = {}
-        
-        for bucket_start in range(40, 500, 20):
-            bucket_end = bucket_start + 19
-            bucket_name = f"{bucket_start}-{bucket_end}"
-            bucket_mid = (bucket_start + bucket_end) / 2
-            
-            # Gaussian probability based on distance from prediction
-            z_score = (bucket_mid - predicted_count) / self.std
-            prob = np.exp(-0.5 * z_score**2)
-            probabilities[bucket_name] = prob
-        
-        # Normalize
-        total = sum(probabilities.values())
-        for bucket in probabilities:
-            probabilities[bucket] /= total
-        
+        """Calculate win probability for each of the event's buckets (normal around the prediction)"""
+        return bucket_probabilities(predicted_count, self.std, self.scheme)
+    
+    def bucket_probabilities(self, current_tweets, hours_elapsed, predicted_count):
+        """
+        Empirical final-bucket distribution of historical weeks in the same
+        (hours elapsed, count) state; the Gaussian around predicted_count
+        where history has no such weeks.
+        """
+        probabilities = self.conditional_table().bucket_probabilities(hours_elapsed, current_tweets, self.scheme)
+        if probabilities is None:
+            return self.calculate_probabilities(predicted_count)
         return probabilities
     
+    def event_probabilities(self, window, count, scheme, now_ts):
+        """
+        Final-bucket probabilities (array in scheme order) of any event window
+        with `count` posts so far - the conditional table for weekly windows,
+        else a normal around the projection, its spread shrunk to the time left
+        """
+        hours_elapsed = (now_ts - window['start_ts']) / 3600
+        total_hours = round((window['end_ts'] - window['start_ts']) / 3600)
+        if total_hours == 168:
+            probabilities = self.conditional_table().bucket_probabilities(hours_elapsed, count, scheme)
+            if probabilities is not None:
+                return np.array([probabilities[b] for b in scheme.labels])
+        predicted = self.predict_final_count(count, hours_elapsed, total_hours)
+        std = self.std * np.sqrt(max(total_hours - hours_elapsed, 1) / 168)
+        return bucket_probability_matrix(predicted, std, scheme)[0]
+    
+    def refresh_wings(self):
+        """Re-price every open event's NO legs into the wing index (one events call)"""
+        try:
+            events = fetch_tweet_events()
+            self.tweet_store.register_markets([w for w in map(window_from_event, events) if w])
+            counts = {m['id']: m['count'] for m in self.tweet_store.market_counts(datetime.now(timezone.utc))}
+            changed = self.wings.update(events, counts)
+            print(f"Wing index: {len(self.wings.legs)} legs, {changed} re-indexed")
+        except Exception as e:
+            print(f"Error refreshing wings: {e}")
+    
+    def _wing_refresh_loop(self):
+        while True:
+            time.sleep(WING_REFRESH)
+            self.refresh_wings()
+    
+    def wing_index(self):
+        """The wing index; the first call fills it and starts the background refresher"""
+        with self._wing_lock:
+            if self._wing_refresher is None:
+                self.refresh_wings()
+                self._wing_refresher = threading.Thread(target=self._wing_refresh_loop, daemon=True)
+                self._wing_refresher.start()
+        return self.wings
+    
     def calculate_expected_value(self, bucket, price, probability):
         """Calculate expected value of a position"""
         # EV = (Win probability * $1.00) + (Lose probability * $0) - Cost
         ev = (probability * 1.00) - price
         return ev
     
-    def generate_recommendations(self, current_positions, market_prices, predicted_count, total_capital):
-        """Generate buy/sell recommendations"""
-        probabilities = self.calculate_probabilities(predicted_count)
+    def generate_recommendations(self, current_positions, market_prices, predicted_count, total_capital,
+                                 probabilities=None, no_positions=None):
+        """
+        Trades towards the expected-log-wealth (Kelly) portfolio over every
+        bucket's YES and NO legs, given current YES / NO holdings and
+        uninvested capital
+        """
+        if probabilities is None:
+            probabilities = self.calculate_probabilities(predicted_count)
+        no_positions = no_positions or {}
         
-        recommendations = []
+        buckets = list(probabilities)
+        probs = np.array([probabilities[b] for b in buckets])
+        yes_prices = np.array([market_prices.get(b, {}).get('price', 0.5) for b in buckets])
+        no_prices = np.array([market_prices.get(b, {}).get('no_price') or 1 - price
+                              for b, price in zip(buckets, yes_prices)])
+        holdings = np.array([current_positions.get(b, {}).get('shares', 0) for b in buckets], dtype=float)
+        no_holdings = np.array([no_positions.get(b, {}).get('shares', 0) for b in buckets], dtype=float)
+        current_invested = sum(pos.get('invested', 0) for book in (current_positions, no_positions)
+                               for pos in book.values())
         
-        # Calculate current allocation
-        current_invested = sum(pos.get('invested', 0) for pos in current_positions.values())
-        remaining_capital = total_capital - current_invested
+        portfolio = optimal_allocation(
+            probs, yes_prices, no_prices, holdings, cash=total_capital - current_invested,
+            fraction=KELLY_FRACTION, max_fraction=MAX_BUCKET_FRACTION, no_holdings=no_holdings
+        )
         
-        # Calculate optimal allocation for each bucket
-        for bucket, prob in sorted(probabilities.items(), key=lambda x: x[1], reverse=True):
-            if prob < 0.01:  # Skip very unlikely buckets
-                continue
-            
-            current_pos = current_positions.get(bucket, {})
-            current_shares = current_pos.get('shares', 0)
-            current_invested = current_pos.get('invested', 0)
-            
-            price = market_prices.get(bucket, {}).get('price', 0.5)
-            
-            # Calculate optimal investment (weighted by probability)
-            optimal_invested = total_capital * prob * 2  # 2x weight on high probability
-            
-            # Cap at reasonable max (don't put everything in one bucket)
-            max_per_bucket = total_capital * 0.4
-            optimal_invested = min(optimal_invested, max_per_bucket)
-            
-            # Calculate difference
-            diff = optimal_invested - current_invested
-            
-            # Expected value
-            ev = self.calculate_expected_value(bucket, price, prob)
-            
-            if abs(diff) > 5:  # $5 threshold
-                action = "BUY" if diff > 0 else "SELL"
-                shares = int(abs(diff) / price) if price > 0 else 0
-                
+        recommendations = []
+        legs = [('YES', yes_prices, probs, holdings, portfolio['yes'], current_positions),
+                ('NO', no_prices, 1 - probs, no_holdings, portfolio['no'], no_positions)]
+        for side, prices, win_probs, current, target, book in legs:
+            for i, bucket in enumerate(buckets):
+                price = prices[i]
+                diff = (target[i] - current[i]) * price
+                if abs(diff) <= MIN_TRADE:
+                    continue
                 recommendations.append({
                     'bucket': bucket,
-                    'action': action,
-                    'shares': shares,
+                    'side': side,
+                    'action': "BUY" if diff > 0 else "SELL",
+                    'shares': int(abs(target[i] - current[i])),
                     'amount': abs(diff),
                     'price': price,
                     'price_cents': price * 100,
-                    'probability': prob * 100,
-                    'ev': ev,
-                    'current_shares': current_shares,
-                    'optimal_shares': int(optimal_invested / price) if price > 0 else 0,
-                    'current_invested': current_invested,
-                    'optimal_invested': optimal_invested
+                    'probability': win_probs[i] * 100,
+                    'ev': self.calculate_expected_value(bucket, price, win_probs[i]),
+                    'current_shares': int(current[i]),
+                    'optimal_shares': int(target[i]),
+                    'current_invested': book.get(bucket, {}).get('invested', 0),
+                    'optimal_invested': target[i] * price
                 })
         
         # Sort by priority (highest EV and probability)
@@ -254,6 +574,73 @@ class LiveStrategyEngine:
         
         return recommendations
 
+    def plan_body(self, probabilities, market_prices, total_capital=None, max_width=None):
+        """Pareto frontier of contiguous bodies (cost vs probability) at current prices"""
+        buckets = self.scheme.labels
+        probs = [probabilities.get(b, 0) for b in buckets]
+        prices = [market_prices.get(b, {}).get('price', np.nan) for b in buckets]
+        return plan_bodies(buckets, probs, prices, total_capital, max_width)
+    
+    def scenario_grid(self, current_tweets, rate, multipliers, dispersions, hours_remaining, pnl):
+        """
+        Bucket probabilities for every (rate multiplier, dispersion, hours
+        remaining) cell in one broadcasted pass, and the book's expected P&L
+        in each. Dispersion scales the std, which also shrinks with the time left.
+        """
+        m = np.asarray(multipliers, dtype=float)[:, None, None]
+        d = np.asarray(dispersions, dtype=float)[None, :, None]
+        h = np.asarray(hours_remaining, dtype=float)[None, None, :]
+        predicted = current_tweets + rate * m * h
+        stds = self.std * d * np.sqrt(np.maximum(h, 1) / 168)
+        probabilities = bucket_probability_grid(predicted, stds, self.scheme)
+        top = probabilities.argmax(axis=-1)
+        return {
+            'predicted': np.broadcast_to(predicted, top.shape),
+            'probabilities': probabilities,
+            'expected_pnl': probabilities @ pnl,
+            'top_bucket': top,
+            'top_probability': np.take_along_axis(probabilities, top[..., None], axis=-1)[..., 0]
+        }
+    
+    def analyze(self, current_tweets, hours_elapsed, total_capital, positions, market_prices, no_positions=None):
+        """Prediction, bucket probabilities, recommendations and P&L for one state"""
+        # Current state (tweet count defaults to the live count for this market)
+        if current_tweets is None:
+            current_tweets = self.current_tweet_count() or 0
+        current_tweets = int(current_tweets)
+        
+        # Calculate prediction
+        predicted_count = self.predict_final_count(current_tweets, hours_elapsed)
+        pace = self.current_pace()
+        
+        # Calculate probabilities
+        probabilities = self.bucket_probabilities(current_tweets, hours_elapsed, predicted_count)
+        
+        # Generate recommendations
+        recommendations = self.generate_recommendations(
+            positions, market_prices, predicted_count, total_capital, probabilities, no_positions
+        )
+        
+        # Calculate current P&L of both legs at market
+        total_pnl = 0
+        for price_key, book in (('price', positions), ('no_price', no_positions or {})):
+            for bucket, pos in book.items():
+                if pos.get('shares', 0) > 0:
+                    current_price = market_prices.get(bucket, {}).get(price_key, pos.get('avg_price', 0))
+                    current_value = pos['shares'] * current_price
+                    pnl = current_value - pos.get('invested', 0)
+                    total_pnl += pnl
+        
+        return {
+            'current_tweets': current_tweets,
+            'predicted_count': predicted_count,
+            'hourly_rate': pace if pace is not None else (current_tweets / hours_elapsed if hours_elapsed > 0 else 0),
+            'probabilities': probabilities,
+            'bucket_order': [[b, bucket_sort_key(b)] for b in self.scheme.labels],
+            'recommendations': recommendations[:15],  # Top 15
+            'total_pnl': total_pnl
+        }
+
 # Constants - hardcoded for this specific market
 USER_ADDRESS = '0xBE50Ea246B34b58ef36043aa34CAA8b3c1F2D592'
 TARGET_SLUG = 'elon-musk-of-tweets-december-9-december-16'
@@ -282,9 +669,14 @@ def get_market_data():
     if not engine:
         return jsonify({'error': 'Engine not initialized'}), 400
     
-    buckets = engine.fetch_market_data()
+    buckets = engine.market_data()
     return jsonify(buckets)
 
+@app.route('/api/market_cache')
+def get_market_cache():
+    """Market-data cache hit rate and data age"""
+    return jsonify(engine.market_cache_stats())
+
 @app.route('/api/user_positions')
 def get_user_positions():
     """Fetch user's current positions"""
@@ -301,79 +693,228 @@ def analyze():
         return jsonify({'error': 'Engine not initialized'}), 400
     
     data = request.json
+    return jsonify(engine.analyze(
+        data.get('current_tweets'),
+        float(data.get('hours_elapsed', 0)),
+        float(data.get('total_capital', 250)),
+        data.get('positions', {}),
+        data.get('market_prices', {}),
+        data.get('no_positions', {})
+    ))
+
+@app.route('/api/snapshot', methods=['POST'])
+def snapshot():
+    """
+    Market prices, wallet positions and the analysis in one round trip: the
+    two Polymarket calls run concurrently, then the analysis runs here
+    """
+    if not engine:
+        return jsonify({'error': 'Engine not initialized'}), 400
     
-    # Current state
-    current_tweets = int(data.get('current_tweets', 0))
-    hours_elapsed = float(data.get('hours_elapsed', 0))
-    total_capital = float(data.get('total_capital', 250))
+    data = request.get_json(silent=True) or {}
+    start = time.time()
+    market_future = engine.pool.submit(engine.market_data)
+    book_future = engine.pool.submit(engine.fetch_book)
+    market_prices = market_future.result()
+    book = book_future.result()
+    fetched = time.time()
     
-    # User positions
-    positions = data.get('positions', {})
+    analysis = engine.analyze(
+        data.get('current_tweets'),
+        float(data.get('hours_elapsed', 0)),
+        float(data.get('total_capital', 250)),
+        book['Yes'],
+        market_prices,
+        book['No']
+    )
+    return jsonify({
+        'market_prices': market_prices,
+        'positions': book['Yes'],
+        'no_positions': book['No'],
+        'analysis': analysis,
+        'timings': {'fetch': fetched - start, 'analysis': time.time() - fetched}
+    })
+
+@app.route('/api/hedge', methods=['POST'])
+def hedge():
+    """
+    Minimum-cost hedge of the book at live prices. Body: max_loss (dollars),
+    optional budget, and optional positions / no_positions ({bucket:
+    {shares, invested}}) - the wallet's book is fetched when they are omitted.
+    """
+    if not engine:
+        return jsonify({'error': 'Engine not initialized'}), 400
     
-    # Market prices
-    market_prices = data.get('market_prices', {})
+    data = request.get_json(silent=True) or {}
+    if 'max_loss' not in data:
+        return jsonify({'error': 'max_loss is required'}), 400
     
-    # Calculate prediction
-    predicted_count = engine.predict_final_count(current_tweets, hours_elapsed)
+    if 'positions' in data:
+        market_prices = engine.market_data()
+        book = {'Yes': data['positions'], 'No': data.get('no_positions', {})}
+    else:
+        market_future = engine.pool.submit(engine.market_data)
+        book_future = engine.pool.submit(engine.fetch_book)
+        market_prices, book = market_future.result(), book_future.result()
     
-    # Calculate probabilities
-    probabilities = engine.calculate_probabilities(predicted_count)
+    budget = data.get('budget')
+    return jsonify(engine.hedge(
+        book['Yes'], book['No'], market_prices,
+        float(data['max_loss']), float(budget) if budget is not None else None
+    ))
+
+@app.route('/api/body_plan', methods=['POST'])
+def body_plan():
+    """
+    Frontier of butterfly bodies for the current state at live prices. Body:
+    current_tweets, hours_elapsed, total_capital and optional max_width
+    """
+    if not engine:
+        return jsonify({'error': 'Engine not initialized'}), 400
+    
+    data = request.get_json(silent=True) or {}
+    current_tweets = data.get('current_tweets')
+    if current_tweets is None:
+        current_tweets = engine.current_tweet_count() or 0
+    current_tweets = int(current_tweets)
+    hours_elapsed = float(data.get('hours_elapsed', 0))
     
-    # Generate recommendations
-    recommendations = engine.generate_recommendations(
-        positions, market_prices, predicted_count, total_capital
+    predicted_count = engine.predict_final_count(current_tweets, hours_elapsed)
+    probabilities = engine.bucket_probabilities(current_tweets, hours_elapsed, predicted_count)
+    max_width = data.get('max_width')
+    plan = engine.plan_body(
+        probabilities, engine.market_data(), float(data.get('total_capital', 250)),
+        int(max_width) if max_width else None
     )
+    plan['predicted_count'] = predicted_count
+    return jsonify(plan)
+
+@app.route('/api/wings')
+def get_wings():
+    """
+    Best NO legs across all open events by model-adjusted annualised yield,
+    read from the background-refreshed index. Query: limit, slug, min_price
+    """
+    if not engine:
+        return jsonify({'error': 'Engine not initialized'}), 400
     
-    # Calculate current P&L
-    total_pnl = 0
-    for bucket, pos in positions.items():
-        if pos.get('shares', 0) > 0:
-            current_price = market_prices.get(bucket, {}).get('price', pos.get('avg_price', 0))
-            current_value = pos['shares'] * current_price
-            pnl = current_value - pos.get('invested', 0)
-            total_pnl += pnl
+    wings = engine.wing_index()
+    return jsonify({
+        'wings': wings.top(
+            int(request.args.get('limit', 20)),
+            request.args.get('slug'),
+            float(request.args.get('min_price', 0))
+        ),
+        'legs': len(wings.legs),
+        'age_seconds': time.time() - wings.updated_at if wings.updated_at else None,
+        'refresh_interval': WING_REFRESH
+    })
+
+@app.route('/api/market_counts')
+def get_market_counts():
+    """Live tweet counts for every open tweet market"""
+    try:
+        engine.tweet_store.register_markets(
+            [w for w in map(window_from_event, fetch_tweet_events()) if w]
+        )
+    except Exception as e:
+        print(f"Error fetching open events: {e}")
     
+    now = datetime.now(timezone.utc)
     return jsonify({
-        'predicted_count': predicted_count,
-        'hourly_rate': current_tweets / hours_elapsed if hours_elapsed > 0 else 0,
-        'probabilities': probabilities,
-        'recommendations': recommendations[:15],  # Top 15
-        'total_pnl': total_pnl
+        'markets': [
+            {
+                'id': m['id'],
+                'slug': m['slug'],
+                'title': m['title'],
+                'start': datetime.fromtimestamp(m['start_ts'], timezone.utc).isoformat(),
+                'end': datetime.fromtimestamp(m['end_ts'], timezone.utc).isoformat(),
+                'hours_left': (m['end_ts'] - now.timestamp()) / 3600,
+                'count': m['count']
+            }
+            for m in engine.tweet_store.market_counts(now)
+        ]
     })
 
+# Typed-array names of the packed /api/simulate arrays and their wire formats
+PACK_DTYPES = {'float32': '<f4', 'uint16': '<u2'}
+
+
+def _pack(array, dtype):
+    """Array as {dtype, data} with data the base64 of its little-endian bytes (a JS typed array)"""
+    data = np.ascontiguousarray(array, dtype=PACK_DTYPES[dtype]).tobytes()
+    return {'dtype': dtype, 'data': base64.b64encode(data).decode('ascii')}
+
+
+def _grid_axis(spec, default):
+    """Scenario axis from a list of values or {start, stop, num}"""
+    if spec is None:
+        return np.asarray(default, dtype=float)
+    if isinstance(spec, dict):
+        return np.linspace(float(spec['start']), float(spec['stop']), int(spec.get('num', 10)))
+    return np.asarray(spec, dtype=float).ravel()
+
+
 @app.route('/api/simulate', methods=['POST'])
 def simulate():
-    """Simulate different scenarios"""
+    """
+    Scenario grid over rate multiplier x dispersion x hours remaining. Each
+    axis is a list or {start, stop, num}. Per cell: expected P&L of the
+    posted book, most likely bucket and its probability, packed as
+    base64 typed arrays in row-major order (multiplier slowest, hours
+    fastest); include_probabilities adds the full (cells x buckets) tensor.
+    """
     if not engine:
         return jsonify({'error': 'Engine not initialized'}), 400
     
-    data = request.json
-    scenarios = []
-    
-    # Generate scenarios for different tweet rates
-    current_tweets = int(data.get('current_tweets', 0))
+    data = request.get_json(silent=True) or {}
+    start = time.time()
+    current_tweets = data.get('current_tweets')
+    if current_tweets is None:
+        current_tweets = engine.current_tweet_count() or 0
+    current_tweets = int(current_tweets)
     hours_elapsed = float(data.get('hours_elapsed', 1))
     
-    current_rate = current_tweets / hours_elapsed if hours_elapsed > 0 else engine.mean / 168
+    current_rate = engine.current_pace()
+    if current_rate is None:
+        current_rate = current_tweets / hours_elapsed if hours_elapsed > 0 else engine.mean / 168
     
-    # Test different rate scenarios
-    for multiplier in [0.7, 0.85, 1.0, 1.15, 1.3]:
-        rate = current_rate * multiplier
-        predicted = rate * 168  # Full week
-        probabilities = engine.calculate_probabilities(predicted)
-        
-        # Find most likely bucket
-        top_bucket = max(probabilities.items(), key=lambda x: x[1])
-        
-        scenarios.append({
-            'multiplier': multiplier,
-            'rate': rate,
-            'predicted': predicted,
-            'top_bucket': top_bucket[0],
-            'top_probability': top_bucket[1] * 100
-        })
-    
-    return jsonify({'scenarios': scenarios})
+    multipliers = _grid_axis(data.get('multipliers'), SIMULATE_MULTIPLIERS)
+    dispersions = _grid_axis(data.get('dispersions'), SIMULATE_DISPERSIONS)
+    hours = _grid_axis(data.get('hours_remaining'), [max(168 - hours_elapsed, 0)])
+    shape = (len(multipliers), len(dispersions), len(hours))
+    if np.prod(shape) > MAX_SCENARIO_CELLS:
+        return jsonify({'error': f'Grid of {np.prod(shape)} cells exceeds {MAX_SCENARIO_CELLS}'}), 400
+    
+    # Settlement P&L of the book in each bucket
+    buckets = engine.scheme.labels
+    yes_positions, no_positions = data.get('positions', {}), data.get('no_positions', {})
+    pnl = settlement_pnl(
+        [yes_positions.get(b, {}).get('shares', 0) for b in buckets],
+        [no_positions.get(b, {}).get('shares', 0) for b in buckets],
+        sum(pos.get('invested', 0) for book in (yes_positions, no_positions) for pos in book.values())
+    )
+    
+    grid = engine.scenario_grid(current_tweets, current_rate, multipliers, dispersions, hours, pnl)
+    computed = time.time()
+    
+    result = {
+        'shape': shape,
+        'current_tweets': current_tweets,
+        'rate': current_rate,
+        'multipliers': multipliers.round(4).tolist(),
+        'dispersions': dispersions.round(4).tolist(),
+        'hours_remaining': hours.round(2).tolist(),
+        'buckets': list(buckets),
+        'pnl_by_bucket': pnl.round(2).tolist(),
+        'expected_pnl': _pack(grid['expected_pnl'], 'float32'),
+        'top_bucket': _pack(grid['top_bucket'], 'uint16'),
+        'top_probability': _pack(grid['top_probability'], 'float32')
+    }
+    if data.get('include_probabilities'):
+        result['probabilities'] = _pack(grid['probabilities'], 'float32')
+    result['timings'] = {'grid': computed - start, 'encode': time.time() - computed}
+    return jsonify(result)
 
 if __name__ == '__main__':
     print("\n" + "="*70)
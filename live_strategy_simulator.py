@@ -7,6 +7,11 @@ import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime, timedelta
 
+from body_planner import plan_bodies
+from bucket_kernel import bucket_probabilities
+from buckets import bucket_sort_key, sort_buckets
+from conditional_table import ConditionalTable
+
 class StrategySimulator:
     def __init__(self):
         # Load historical statistics
@@ -16,6 +21,10 @@ class StrategySimulator:
         self.mean = self.historical['historical_mean']
         self.std = self.historical['historical_std']
         
+        # Final-count distribution of historical weeks by (hours elapsed, count);
+        # build it with `python conditional_table.py`
+        self.conditional = ConditionalTable.load()
+        
         # Current position tracking
         self.positions = {}  # bucket -> {'shares': X, 'avg_price': Y, 'current_value': Z}
         self.capital_deployed = 0
@@ -54,7 +63,15 @@ class StrategySimulator:
         self.capital_remaining = self.total_capital - self.capital_deployed
         
     def predict_final_count(self, current_tweets, current_day, total_days=7):
-        """Predict final weekly tweet count based on current pace"""
+        """
+        Predict final weekly tweet count: the mean of historical weeks in the
+        same state when the conditional table has them, else current pace.
+        """
+        if total_days == 7:
+            expected = self.conditional.expected_final(current_day * 24, current_tweets)
+            if expected is not None:
+                return expected
+        
         if current_day == 0:
             # Day 0 (before week starts): use historical mean
             return self.mean
@@ -64,32 +81,22 @@ class StrategySimulator:
             predicted_total = daily_rate * total_days
             return predicted_total
     
-    def calculate_probabilities(self, predicted_count):
-        """Calculate probability for each bucket given predicted count"""
-        probabilities = {}
-        
-        for bucket_start in range(40, 500, 20):
-            bucket_end = bucket_start + 19
-            bucket_name = f"{bucket_start}-{bucket_end}"
-            bucket_mid = (bucket_start + bucket_end) / 2
-            
-            # Distance from predicted count
-            z_score = abs(bucket_mid - predicted_count) / self.std
-            
-            # Gaussian probability
-            prob = np.exp(-0.5 * z_score**2)
-            probabilities[bucket_name] = prob
-        
-        # Normalize
-        total_prob = sum(probabilities.values())
-        for bucket in probabilities:
-            probabilities[bucket] /= total_prob
+    def calculate_probabilities(self, predicted_count, state=None):
+        """
+        Calculate probability for each bucket given predicted count. With a
+        state of (hours elapsed, current count), the conditional table's
+        distribution for that state is used instead when it has data.
+        """
+        if state is not None:
+            table_probs = self.conditional.bucket_probabilities(*state)
+            if table_probs is not None:
+                return table_probs
         
-        return probabilities
+        return bucket_probabilities(predicted_count, self.std)
     
-    def calculate_optimal_allocation(self, predicted_count, focus_factor=1.5):
+    def calculate_optimal_allocation(self, predicted_count, focus_factor=1.5, state=None):
         """Calculate optimal capital allocation based on prediction"""
-        probabilities = self.calculate_probabilities(predicted_count)
+        probabilities = self.calculate_probabilities(predicted_count, state)
         
         allocations = {}
         for bucket, prob in probabilities.items():
@@ -104,13 +111,14 @@ class StrategySimulator:
         
         return allocations
     
-    def get_rebalancing_suggestions(self, predicted_count, current_prices):
+    def get_rebalancing_suggestions(self, predicted_count, current_prices, state=None):
         """
         Suggest which positions to increase/decrease
         current_prices: dict of {bucket: current_market_price}
+        state: (hours elapsed, current count), see calculate_probabilities
         """
-        optimal_allocation = self.calculate_optimal_allocation(predicted_count)
-        probabilities = self.calculate_probabilities(predicted_count)
+        optimal_allocation = self.calculate_optimal_allocation(predicted_count, state=state)
+        probabilities = self.calculate_probabilities(predicted_count, state)
         
         suggestions = []
         
@@ -162,10 +170,22 @@ class StrategySimulator:
         
         return suggestions
     
-    def visualize_strategy(self, predicted_count, current_prices):
+    def plan_body(self, predicted_count, current_prices, max_width=None, state=None):
+        """
+        Pareto frontier of contiguous bodies (cost vs probability of finishing
+        inside) for the remaining capital. current_prices: {bucket: price};
+        windows through unpriced buckets are skipped.
+        """
+        probabilities = self.calculate_probabilities(predicted_count, state)
+        buckets = sort_buckets(probabilities)
+        probs = [probabilities[b] for b in buckets]
+        prices = [current_prices.get(b, np.nan) for b in buckets]
+        return plan_bodies(buckets, probs, prices, self.capital_remaining, max_width)
+    
+    def visualize_strategy(self, predicted_count, current_prices, state=None):
         """Create comprehensive visualization"""
-        optimal_allocation = self.calculate_optimal_allocation(predicted_count)
-        probabilities = self.calculate_probabilities(predicted_count)
+        optimal_allocation = self.calculate_optimal_allocation(predicted_count, state=state)
+        probabilities = self.calculate_probabilities(predicted_count, state)
         
         fig = plt.figure(figsize=(16, 10))
         
@@ -175,7 +195,7 @@ class StrategySimulator:
         # Only show buckets with significant optimal allocation OR current position
         buckets = sorted([b for b in optimal_allocation.keys() 
                          if optimal_allocation[b] > 10 or self.positions.get(b, {}).get('invested', 0) > 0],
-                        key=lambda x: int(x.split('-')[0]))
+                        key=bucket_sort_key)
         current_vals = [self.positions.get(b, {}).get('invested', 0) for b in buckets]
         optimal_vals = [optimal_allocation[b] for b in buckets]
         
@@ -200,8 +220,8 @@ class StrategySimulator:
         max_bucket = min(500, int(predicted_count + 3*self.std))
         
         prob_buckets = sorted([b for b in probabilities.keys() 
-                              if min_bucket <= int(b.split('-')[0]) <= max_bucket],
-                             key=lambda x: int(x.split('-')[0]))
+                              if min_bucket <= bucket_sort_key(b) <= max_bucket],
+                             key=bucket_sort_key)
         prob_vals = [probabilities[b] * 100 for b in prob_buckets]
         
         colors = ['#00ff88' if probabilities[b] > 0.03 else '#667eea' for b in prob_buckets]
@@ -340,9 +360,10 @@ def interactive_simulator():
                 # Day 0: Use historical mean
                 current_tweets = 0
                 current_day = 0
-                predicted = sim.mean
+                predicted = sim.predict_final_count(0, 0)
                 print(f"\n🎯 Using historical baseline: {predicted:.0f} tweets")
                 print(f"   (Week hasn't started - optimal pre-positioning)")
+            state = (current_day * 24, current_tweets)
             
             # Get current market prices
             print("\n--- Enter Current Market Prices (in cents) ---")
@@ -359,7 +380,7 @@ def interactive_simulator():
                 all_buckets.add(f"{bucket_start}-{bucket_start+19}")
             
             print("\nEnter prices for buckets (or press Enter to skip):")
-            for bucket_name in sorted(all_buckets, key=lambda x: int(x.split('-')[0])):
+            for bucket_name in sorted(all_buckets, key=bucket_sort_key):
                 try:
                     price_input = input(f"  {bucket_name} current price (¢): ").strip()
                     if price_input:
@@ -373,7 +394,7 @@ def interactive_simulator():
             print("💡 REBALANCING SUGGESTIONS")
             print("="*70)
             
-            suggestions = sim.get_rebalancing_suggestions(predicted, current_prices)
+            suggestions = sim.get_rebalancing_suggestions(predicted, current_prices, state)
             
             print(f"\n{'Bucket':>10} {'Action':>6} {'Shares':>7} {'Amount':>10} {'Price':>8} {'Prob':>8} {'P&L':>10}")
             print("-"*75)
@@ -385,9 +406,22 @@ def interactive_simulator():
                 print(f"{sug['bucket']:>10} {action_color}{sug['action']:>5} {sug['shares']:>7} "
                       f"${sug['amount']:>8.2f} {price_cents:>6.1f}¢ {sug['probability']*100:>6.1f}% {pnl_str:>10}")
             
+            # Body candidates over the priced buckets
+            plan = sim.plan_body(predicted, current_prices, state=state)
+            if plan['frontier']:
+                print("\n" + "="*70)
+                print("🦋 BODY FRONTIER (cheapest first)")
+                print("="*70)
+                print(f"\n{'Body':>16} {'Cost/$1':>8} {'Prob':>7} {'Payoff':>8} {'Shares':>8}")
+                print("-"*55)
+                for body in plan['frontier'][-8:]:
+                    span = f"{body['first']}..{body['last']}" if body['width'] > 1 else body['first']
+                    print(f"{span:>16} {body['cost']*100:>6.1f}¢ {body['probability']*100:>6.1f}% "
+                          f"{body['payoff_multiple']:>7.2f}x {body['shares']:>8}")
+            
             # Visualize
             print("\nGenerating strategy visualization...")
-            sim.visualize_strategy(predicted, current_prices)
+            sim.visualize_strategy(predicted, current_prices, state)
             
             # Continue?
             cont = input("\n\nUpdate again? (y/n): ").strip().lower()
@@ -0,0 +1,102 @@
+"""
+Market Window Index
+Interval index over the windows of every tracked tweet-count market, so each
+incoming post bumps the count of all markets it falls in with one bisect
+(O(log n + k)) instead of re-filtering the tweet table per market.
+
+Windows come from the gamma events API (startDate / endDate) or from scraped
+dumps (event_start_date / event_end_date, which are dates - those markets
+run noon ET to noon ET).
+"""
+import bisect
+from datetime import datetime
+
+import pytz
+import requests
+
+EVENTS_API = "https://gamma-api.polymarket.com/events"
+EST = pytz.timezone("US/Eastern")
+MARKET_HOUR_ET = 12  # date-only windows open and close at noon ET
+
+
+def _parse_time(value):
+    """Epoch seconds from an ISO timestamp or a bare date (noon ET)"""
+    if len(value) == 10:
+        day = datetime.strptime(value, "%Y-%m-%d")
+        return EST.localize(day.replace(hour=MARKET_HOUR_ET)).timestamp()
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def window_from_event(event):
+    """Market window from a gamma event or a scraped dump row"""
+    start = event.get('startDate') or event.get('event_start_date')
+    end = event.get('endDate') or event.get('event_end_date')
+    if not start or not end:
+        return None
+    return {
+        'id': str(event.get('id') or event.get('event_id')),
+        'slug': event.get('slug') or event.get('event_slug', ''),
+        'title': event.get('title') or event.get('event_title', ''),
+        'start_ts': _parse_time(start),
+        'end_ts': _parse_time(end)
+    }
+
+
+def fetch_tweet_events(active=True):
+    """Open Elon tweet-count events from the gamma API (raises on HTTP errors)"""
+    params = {'active': 'true', 'closed': 'false', 'limit': 500} if active else {'limit': 500}
+    response = requests.get(EVENTS_API, params=params, timeout=10)
+    response.raise_for_status()
+    return [
+        e for e in response.json()
+        if 'elon' in e.get('title', '').lower() and 'tweet' in e.get('title', '').lower()
+    ]
+
+
+class MarketIndex:
+    def __init__(self, windows=()):
+        self.starts = []       # sorted window starts
+        self.windows = []      # windows in the same order
+        self.by_id = {}
+        self.counts = {}       # market id -> posts seen in its window
+        self.max_duration = 0.0
+        for window in windows:
+            self.add_market(window)
+
+    def add_market(self, window, initial_count=0):
+        """Register a window (no-op if its id is known). initial_count seeds posts already seen."""
+        if window['id'] in self.by_id:
+            return False
+        i = bisect.bisect_right(self.starts, window['start_ts'])
+        self.starts.insert(i, window['start_ts'])
+        self.windows.insert(i, window)
+        self.by_id[window['id']] = window
+        self.counts[window['id']] = initial_count
+        self.max_duration = max(self.max_duration, window['end_ts'] - window['start_ts'])
+        return True
+
+    def lookup(self, ts):
+        """Windows containing ts (start <= ts < end)"""
+        # Only windows starting in (ts - longest window, ts] can still be open
+        lo = bisect.bisect_left(self.starts, ts - self.max_duration)
+        hi = bisect.bisect_right(self.starts, ts)
+        return [w for w in self.windows[lo:hi] if ts < w['end_ts']]
+
+    def add_tweet(self, ts):
+        for window in self.lookup(ts):
+            self.counts[window['id']] += 1
+
+    def add_tweets(self, timestamps):
+        for ts in timestamps:
+            self.add_tweet(float(ts))
+
+    def open_markets(self, now_ts):
+        """Windows open at now_ts with their current counts, soonest end first"""
+        rows = [dict(w, count=self.counts[w['id']]) for w in self.lookup(now_ts)]
+        return sorted(rows, key=lambda w: w['end_ts'])
+
+    def count_for(self, market_id=None, slug=None):
+        """Current count of one market by id or slug, or None if unknown"""
+        if slug is not None:
+            market_id = next((w['id'] for w in self.windows if w['slug'] == slug), None)
+        return self.counts.get(market_id)
@@ -0,0 +1,446 @@
+"""
+Monte Carlo Projection Engine
+Simulates the remaining-hours tweet total in fixed-size chunks (bounded memory
+for any number of sims) with a seeded NumPy Generator, antithetic or Sobol
+draws for variance reduction, and optional early stopping once every bucket
+probability has converged. Results are binned with floor_divide + bincount.
+For millions of paths, simulate_parallel splits the work across processes
+with independent seeded streams and merges only the small per-worker
+histograms.
+"""
+import argparse
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import norm, qmc
+
+from buckets import grid_labels
+
+DEFAULT_SIMS = 10000
+CHUNK_SIZE = 2048          # sims per chunk (a power of 2 keeps Sobol balanced)
+MIN_CHUNKS = 4             # chunks needed before the stderr estimate is trusted
+MAX_COUNT = 5000           # totals above this share the last histogram bin
+RATE_RESOLUTION = 0.05     # tweets/hr - rate drift below this reuses cached paths
+CACHE_ENTRIES = 8          # rolling projections kept by ProjectionCache
+
+# Projector bucket grid: <20, 20-39, ..., 480-499, 500+
+BUCKET_WIDTH = 20
+BUCKET_FLOOR = 20
+BUCKET_CAP = 500
+
+METHODS = ('antithetic', 'sobol', 'plain')
+
+
+def bucket_labels(width=BUCKET_WIDTH, floor=BUCKET_FLOOR, cap=BUCKET_CAP):
+    """Labels of the fixed-width bucket grid, in order"""
+    return grid_labels(width, floor, cap)
+
+
+def bucket_ids(totals, width=BUCKET_WIDTH, floor=BUCKET_FLOOR, cap=BUCKET_CAP):
+    """Index into bucket_labels() for each total (floor_divide: the grid is fixed-width)"""
+    ids = np.floor_divide(totals - floor, width).astype(np.int64) + 1
+    return np.clip(ids, 0, (cap - floor) // width + 1)
+
+
+def _normal_draws(rng, sampler, method, n, hours):
+    """n x hours standard normal draws for one chunk"""
+    if method == 'sobol':
+        u = sampler.random(n)
+        return norm.ppf(np.clip(u, 1e-12, 1 - 1e-12))
+    if method == 'antithetic':
+        half = rng.standard_normal((n // 2, hours))
+        return np.concatenate([half, -half])
+    return rng.standard_normal((n, hours))
+
+
+def new_accumulator(n_buckets):
+    return {
+        'bucket_counts': np.zeros(n_buckets, dtype=np.int64),
+        'histogram': np.zeros(MAX_COUNT + 1, dtype=np.int64),
+        'chunk_prob_sum': np.zeros(n_buckets),
+        'chunk_prob_sq': np.zeros(n_buckets),
+        'n_chunks': 0,
+        'n_sims': 0,
+        'converged': False
+    }
+
+
+def merge_accumulators(accs):
+    """Combine per-worker accumulators (all arrays just add up)"""
+    total = new_accumulator(len(accs[0]['bucket_counts']))
+    for acc in accs:
+        for key in ('bucket_counts', 'histogram', 'chunk_prob_sum', 'chunk_prob_sq', 'n_chunks', 'n_sims'):
+            total[key] = total[key] + acc[key]
+    total['converged'] = all(acc['converged'] for acc in accs)
+    return total
+
+
+def batch_stderr(acc):
+    """Standard error of each bucket probability from the spread of chunk estimates"""
+    k = acc['n_chunks']
+    if k < 2:
+        return np.full(len(acc['bucket_counts']), np.nan)
+    mean = acc['chunk_prob_sum'] / k
+    var = np.maximum(acc['chunk_prob_sq'] / k - mean ** 2, 0) * k / (k - 1)
+    return np.sqrt(var / k)
+
+
+def _component_means(rates, hours):
+    """Per-hour means of each model component as a (n_components, hours) matrix"""
+    return np.stack([np.broadcast_to(np.asarray(r, dtype=float), (hours,)) for r in rates])
+
+
+def iter_hourly_chunks(rng, hours, rates, hourly_std, n_sims, chunk_size=CHUNK_SIZE, method='antithetic'):
+    """
+    Yield (chunk_sims x hours) matrices of simulated hourly counts until n_sims
+    paths have been produced. Stop iterating early to stop simulating.
+
+    rates: per-hour mean of each model component (scalars or arrays of length
+    hours); sims are split evenly between components. hourly_std is a scalar
+    or a per-hour array. Hourly counts are N(rate, hourly_std) clipped at
+    zero, as in the original projector.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+
+    loc = _component_means(rates, hours)
+    scale = np.broadcast_to(np.asarray(hourly_std, dtype=float), (hours,))
+    n_components = len(loc)
+    sampler = qmc.Sobol(d=hours, scramble=True, seed=rng) if method == 'sobol' and hours > 0 else None
+
+    done = 0
+    while done < n_sims:
+        m = min(chunk_size, n_sims - done)
+        if method == 'antithetic':
+            m += m % 2  # keep pairs whole
+        elif method == 'sobol':
+            m = chunk_size  # Sobol points only balance in full power-of-2 blocks
+
+        if hours > 0:
+            z = _normal_draws(rng, sampler, method, m, hours)
+            # Antithetic partners share a component so the pairing cancels noise
+            pair = np.arange(m) % (m // 2) if method == 'antithetic' else np.arange(m)
+            comp = pair % n_components
+            yield np.maximum(loc[comp] + scale * z, 0)
+        else:
+            yield np.zeros((m, 0))
+        done += m
+
+
+def accumulate(acc, totals, width=BUCKET_WIDTH, floor=BUCKET_FLOOR, cap=BUCKET_CAP):
+    """
+    Add one chunk of simulated final totals to an accumulator. Totals are
+    rounded to whole counts (not truncated, which would bias every bucket,
+    percentile and the mean down by half a post).
+    """
+    m = len(totals)
+    totals = np.rint(totals).astype(np.int64)
+    counts = np.bincount(bucket_ids(totals, width, floor, cap), minlength=len(acc['bucket_counts']))
+    acc['bucket_counts'] += counts
+    acc['histogram'] += np.bincount(np.minimum(totals, MAX_COUNT), minlength=MAX_COUNT + 1)
+    probs = counts / m
+    acc['chunk_prob_sum'] += probs
+    acc['chunk_prob_sq'] += probs ** 2
+    acc['n_chunks'] += 1
+    acc['n_sims'] += m
+
+
+def simulate_chunks(rng, current_count, hours_remaining, rates, hourly_std, n_sims,
+                    chunk_size=CHUNK_SIZE, method='antithetic', tol=None,
+                    width=BUCKET_WIDTH, floor=BUCKET_FLOOR, cap=BUCKET_CAP):
+    """Run up to n_sims paths (see iter_hourly_chunks) and return the raw accumulator"""
+    n_buckets = (cap - floor) // width + 2
+    acc = new_accumulator(n_buckets)
+    hours = int(max(hours_remaining, 0))
+
+    for hourly in iter_hourly_chunks(rng, hours, rates, hourly_std, n_sims, chunk_size, method):
+        accumulate(acc, current_count + hourly.sum(axis=1), width, floor, cap)
+
+        if tol and acc['n_chunks'] >= MIN_CHUNKS and np.nanmax(batch_stderr(acc)) < tol:
+            acc['converged'] = True
+            break
+
+    return acc
+
+
+def histogram_percentile(histogram, q):
+    """Percentile (0-100) of the integer totals recorded in a unit histogram"""
+    cdf = np.cumsum(histogram)
+    return float(np.searchsorted(cdf, cdf[-1] * q / 100.0))
+
+
+def summarise(acc, runtime, width=BUCKET_WIDTH, floor=BUCKET_FLOOR, cap=BUCKET_CAP):
+    """Turn an accumulator into the result dict the projector renders"""
+    labels = bucket_labels(width, floor, cap)
+    n = max(acc['n_sims'], 1)
+    probs = acc['bucket_counts'] / n
+    stderr = batch_stderr(acc)
+    histogram = acc['histogram']
+    return {
+        'labels': labels,
+        'probabilities': dict(zip(labels, probs)),
+        'stderr': dict(zip(labels, stderr)),
+        'max_stderr': float(np.nanmax(stderr)) if acc['n_chunks'] >= 2 else float('nan'),
+        'p10': histogram_percentile(histogram, 10),
+        'p50': histogram_percentile(histogram, 50),
+        'p90': histogram_percentile(histogram, 90),
+        'mean': float(np.dot(np.arange(len(histogram)), histogram) / n),
+        'histogram': histogram,
+        'n_sims': acc['n_sims'],
+        'converged': acc['converged'],
+        'runtime': runtime
+    }
+
+
+def simulate_projection(current_count, hours_remaining, rates, hourly_std, n_sims=DEFAULT_SIMS,
+                        seed=None, method='antithetic', tol=None, chunk_size=CHUNK_SIZE):
+    """
+    Project the final count and its bucket probabilities.
+    n_sims is an upper bound when tol is set (stops once max stderr < tol).
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    acc = simulate_chunks(rng, current_count, hours_remaining, rates, hourly_std, n_sims,
+                          chunk_size=chunk_size, method=method, tol=tol)
+    return summarise(acc, time.perf_counter() - start)
+
+
+def simulate_joint(current_counts, hours_remaining, rates, hourly_std, n_sims=DEFAULT_SIMS,
+                   seed=None, method='antithetic', chunk_size=CHUNK_SIZE):
+    """
+    Project several markets that share one hourly future. Every path covers
+    the longest remaining window; market i reads its total at its own horizon
+    hours_remaining[i], so all markets come from the same correlated paths at
+    about the cost of the longest one. rates / hourly_std are as in
+    iter_hourly_chunks, over max(hours_remaining) hours starting now.
+    Returns (list of per-market result dicts, correlation matrix of totals).
+    """
+    start = time.perf_counter()
+    current = np.asarray(current_counts, dtype=float)
+    horizons = np.maximum(np.asarray(hours_remaining, dtype=np.int64), 0)
+    hours = int(horizons.max()) if len(horizons) else 0
+
+    rng = np.random.default_rng(seed)
+    n_buckets = len(bucket_labels())
+    accs = [new_accumulator(n_buckets) for _ in horizons]
+    sum_x = np.zeros(len(horizons))
+    sum_xx = np.zeros((len(horizons), len(horizons)))
+
+    for hourly in iter_hourly_chunks(rng, hours, rates, hourly_std, n_sims, chunk_size, method):
+        cum = np.zeros((len(hourly), hours + 1))
+        np.cumsum(hourly, axis=1, out=cum[:, 1:])
+        totals = current + cum[:, horizons]  # (paths, markets)
+        for acc, column in zip(accs, totals.T):
+            accumulate(acc, column)
+        sum_x += totals.sum(axis=0)
+        sum_xx += totals.T @ totals
+
+    runtime = time.perf_counter() - start
+    n = max(accs[0]['n_sims'], 1) if accs else 1
+    mean = sum_x / n
+    cov = sum_xx / n - np.outer(mean, mean)
+    sd = np.sqrt(np.maximum(np.diag(cov), 0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = cov / np.outer(sd, sd)
+    corr[~np.isfinite(corr)] = 0.0  # markets with no hours left do not vary
+    np.fill_diagonal(corr, 1.0)
+
+    return [summarise(acc, runtime) for acc in accs], corr
+
+
+class RollingProjection:
+    """
+    One simulated future, stored as a histogram of the remaining total for
+    every hour offset (the partial sums of each path from hour k to the end).
+    As hours elapse the earlier offsets are simply skipped and the observed
+    count is added, so the same paths serve every later rerun.
+    """
+
+    def __init__(self, hours, rates, hourly_std, n_sims=DEFAULT_SIMS, method='antithetic',
+                 seed=None, chunk_size=CHUNK_SIZE):
+        start = time.perf_counter()
+        self.hours = int(max(hours, 0))
+        bins = MAX_COUNT + 1
+        offsets = np.arange(self.hours + 1) * bins
+        hist = np.zeros((self.hours + 1) * bins, dtype=np.int64)
+
+        rng = np.random.default_rng(seed)
+        self.n_sims = 0
+        for hourly in iter_hourly_chunks(rng, self.hours, rates, hourly_std, n_sims, chunk_size, method):
+            # suffix[:, k] = simulated tweets from hour k to the end (column `hours` is 0)
+            suffix = np.zeros((len(hourly), self.hours + 1))
+            suffix[:, :self.hours] = np.cumsum(hourly[:, ::-1], axis=1)[:, ::-1]
+            ids = offsets + np.minimum(np.rint(suffix).astype(np.int64), MAX_COUNT)
+            hist += np.bincount(ids.ravel(), minlength=hist.size)
+            self.n_sims += len(hourly)
+
+        self.histograms = hist.reshape(self.hours + 1, bins)
+        self.build_time = time.perf_counter() - start
+
+    def project(self, current_count, hours_remaining):
+        """Result dict for the observed count with hours_remaining (<= self.hours) left"""
+        start = time.perf_counter()
+        k = self.hours - int(min(max(hours_remaining, 0), self.hours))
+        remaining = self.histograms[k]
+
+        # Shift the remaining-total histogram by the observed count
+        c = int(current_count)
+        histogram = np.zeros(MAX_COUNT + 1, dtype=np.int64)
+        if c <= MAX_COUNT:
+            histogram[c:] = remaining[:MAX_COUNT + 1 - c]
+            histogram[MAX_COUNT] += remaining[MAX_COUNT + 1 - c:].sum()
+        else:
+            histogram[MAX_COUNT] = self.n_sims
+
+        acc = new_accumulator(len(bucket_labels()))
+        acc['bucket_counts'] = np.bincount(bucket_ids(np.arange(MAX_COUNT + 1)), weights=histogram,
+                                           minlength=len(acc['bucket_counts'])).astype(np.int64)
+        acc['histogram'] = histogram
+        acc['n_sims'] = self.n_sims
+        result = summarise(acc, time.perf_counter() - start)
+
+        # Per-chunk spreads are not kept per offset; use the binomial error instead
+        p = acc['bucket_counts'] / self.n_sims
+        stderr = np.sqrt(p * (1 - p) / self.n_sims)
+        result['stderr'] = dict(zip(result['labels'], stderr))
+        result['max_stderr'] = float(stderr.max())
+        return result
+
+
+def quantize_rate(rate):
+    """Snap a rate to RATE_RESOLUTION so small drifts map to the same cached model"""
+    return round(round(rate / RATE_RESOLUTION) * RATE_RESOLUTION, 6)
+
+
+class ProjectionCache:
+    """
+    LRU of RollingProjections keyed on model parameters. A projection is only
+    re-simulated when its key changes (or more hours remain than it covers);
+    otherwise elapsed hours and the new observed count are applied to the
+    cached paths.
+    """
+
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def project(self, key, current_count, hours_remaining, rates, hourly_std,
+                n_sims=DEFAULT_SIMS, method='antithetic'):
+        with self._lock:
+            entry = self.entries.get(key)
+            reused = entry is not None and hours_remaining <= entry.hours
+            if reused:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            else:
+                self.misses += 1
+                entry = RollingProjection(hours_remaining, rates, hourly_std, n_sims, method)
+                self.entries[key] = entry
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+
+        result = entry.project(current_count, hours_remaining)
+        result['reused'] = reused
+        result['build_time'] = entry.build_time
+        return result
+
+
+def _simulate_worker(task):
+    """Process-pool entry point: run one worker's share and return its accumulator"""
+    seed_seq, current_count, hours_remaining, rates, hourly_std, n_sims, options = task
+    rng = np.random.default_rng(seed_seq)
+    return simulate_chunks(rng, current_count, hours_remaining, rates, hourly_std, n_sims, **options)
+
+
+_pool = None
+_pool_workers = 0
+
+
+def get_pool(workers):
+    """Long-lived process pool, reused across calls (recreated if the size changes)"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+
+
+def simulate_parallel(current_count, hours_remaining, rates, hourly_std, n_sims, workers=None,
+                      seed=None, method='antithetic', tol=None, chunk_size=CHUNK_SIZE):
+    """
+    simulate_projection split across a process pool.
+    Each worker gets an independent SeedSequence child stream, reduces its
+    paths locally to bucket counts and a unit histogram, and only those
+    small arrays are sent back and merged.
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if n_sims <= 0:
+        result = summarise(new_accumulator(len(bucket_labels())), time.perf_counter() - start)
+        result['workers'] = 0
+        return result
+
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [n_sims // workers + (1 if i < n_sims % workers else 0) for i in range(workers)]
+    # Each worker's estimate is sqrt(workers) noisier than the merged one
+    options = {
+        'chunk_size': chunk_size,
+        'method': method,
+        'tol': tol * np.sqrt(workers) if tol else None
+    }
+    tasks = [(seeds[i], current_count, hours_remaining, rates, hourly_std, shares[i], options)
+             for i in range(workers) if shares[i] > 0]
+
+    if workers == 1:
+        accs = [_simulate_worker(tasks[0])]
+    else:
+        accs = list(get_pool(workers).map(_simulate_worker, tasks))
+
+    result = summarise(merge_accumulators(accs), time.perf_counter() - start)
+    result['workers'] = workers
+    return result
+
+
+def benchmark(n_sims=2_000_000, worker_counts=(1, 2, 4, 8), hours=168):
+    """Wall-clock scaling of simulate_parallel for a full-week projection"""
+    print(f"Benchmark: {n_sims:,} paths x {hours} hours ({os.cpu_count()} CPUs available)")
+    baseline = None
+    for workers in worker_counts:
+        get_pool(workers)  # warm the pool so startup is not timed
+        result = simulate_parallel(0, hours, [2.6, 2.4], 2.5, n_sims, workers=workers, seed=42)
+        baseline = baseline or result['runtime']
+        print(f"  {workers} worker(s): {result['runtime']:6.2f}s  "
+              f"{n_sims / result['runtime']:>12,.0f} paths/s  speedup {baseline / result['runtime']:.2f}x  "
+              f"P(500+) = {result['probabilities']['500+']:.4%} ± {result['stderr']['500+']:.4%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Monte Carlo projection engine")
+    parser.add_argument('--benchmark', action='store_true', help="run the 1/2/4/8 worker scaling benchmark")
+    parser.add_argument('--sims', type=int, default=2_000_000, help="paths for the benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.sims)
+    else:
+        for method in METHODS:
+            result = simulate_projection(150, 96, [1.6, 1.4], 2.5, n_sims=200000, seed=42, method=method, tol=0.002)
+            top = sorted(result['probabilities'].items(), key=lambda x: x[1], reverse=True)[:3]
+            print(f"{method:>10}: {result['n_sims']:>7} sims in {result['runtime'] * 1000:6.1f} ms, "
+                  f"max stderr {result['max_stderr']:.4f}, P50 {result['p50']:.0f}, top {top[0][0]} ({top[0][1]:.1%})")
@@ -0,0 +1,253 @@
+"""
+Streaming Pace Statistics
+O(1)-per-tweet estimators of the live tweet pace, fed from the tweet store:
+  - windowed counts over the last N hours from a ring of hourly bins with a
+    running sum per registered window,
+  - EWMA rates (tweets/hr) at several half-lives,
+  - Welford mean / variance of the hourly counts over the last 365 days,
+    plus their histogram (the empirical per-hour PMF used by
+    exact_projection); hours leaving the window are taken back out.
+An optional SeasonalProfile receives every closed hour as well.
+Timestamps are epoch seconds.
+"""
+import math
+
+import numpy as np
+
+RING_HOURS = 720              # longest lookback window (matches the projector's max)
+STATS_HOURS = 365 * 24        # closed hours in the mean / std / PMF
+HALF_LIVES = (6, 24, 72)      # hours
+DEFAULT_HALF_LIFE = 24
+
+
+class PaceTracker:
+    def __init__(self, windows=(), half_lives=HALF_LIVES, ring_hours=RING_HOURS,
+                 stats_hours=STATS_HOURS, profile=None):
+        if stats_hours < ring_hours:
+            raise ValueError(f"stats_hours must cover the ring ({ring_hours} hours), got {stats_hours}")
+        self.ring_hours = ring_hours
+        self.stats_hours = stats_hours
+        self.profile = profile        # SeasonalProfile updated as hours close
+        self.bins = [0] * ring_hours  # tweets per hour, slot = hour % ring_hours
+        self.hour = None              # index of the current (open) hour
+        self.windows = {}             # width in hours -> tweets in the last `width` bins
+        self.total = 0
+        self.last_ts = None
+
+        # EWMA of the event rate: decays by exp(-ln2 * dt / half_life), +lambda per tweet
+        self.decay = {h: math.log(2) / h for h in half_lives}
+        self.ewma = dict.fromkeys(half_lives, 0.0)
+        self.ewma_time = None         # hours since epoch of the last EWMA update
+
+        # Welford over the closed hourly counts still in the stats window, and
+        # their histogram; closed[hour % stats_hours] remembers each count so
+        # it can be removed again when the hour expires
+        self.closed = [0] * stats_hours
+        self.first_closed = None      # first hour ever closed
+        self.n_hours = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.count_hist = [0]
+
+        for width in windows:
+            self.add_window(width)
+
+    @classmethod
+    def from_timestamps(cls, timestamps, **kwargs):
+        tracker = cls(**kwargs)
+        tracker.add_many(np.sort(np.asarray(timestamps, dtype=float)))
+        return tracker
+
+    # --- Welford over closed hours ---
+
+    def _add_count(self, value):
+        self.n_hours += 1
+        delta = value - self.mean
+        self.mean += delta / self.n_hours
+        self.m2 += delta * (value - self.mean)
+        if value >= len(self.count_hist):
+            self.count_hist.extend([0] * (value + 1 - len(self.count_hist)))
+        self.count_hist[value] += 1
+
+    def _remove_count(self, value):
+        """Reverse Welford step for an hour that left the stats window"""
+        n = self.n_hours - 1
+        if n == 0:
+            self.mean = self.m2 = 0.0
+        else:
+            old_mean = self.mean
+            self.mean = (self.n_hours * old_mean - value) / n
+            self.m2 = max(self.m2 - (value - old_mean) * (value - self.mean), 0.0)
+        self.n_hours = n
+        self.count_hist[value] -= 1
+
+    def _close_hour(self, hour, value):
+        """Record closed hour `hour` with `value` tweets; the hour stats_hours earlier expires"""
+        slot = hour % self.stats_hours
+        if self.first_closed is None:
+            self.first_closed = hour
+        elif hour - self.stats_hours >= self.first_closed:
+            self._remove_count(self.closed[slot])
+        self.closed[slot] = value
+        self._add_count(value)
+
+    def _close_empty_hours(self, hour, k):
+        """Record k empty closed hours starting at `hour`"""
+        if k < self.stats_hours:
+            for h in range(hour, hour + k):
+                self._close_hour(h, 0)
+            return
+        # The whole stats window is quiet
+        if self.first_closed is None:
+            self.first_closed = hour
+        self.closed = [0] * self.stats_hours
+        self.n_hours = self.stats_hours
+        self.mean = self.m2 = 0.0
+        self.count_hist = [self.stats_hours]
+
+    def _bump_closed_hour(self, value):
+        """A late tweet turned a closed hour's count from value to value + 1"""
+        shift = 1 / self.n_hours
+        old_dev = value - self.mean
+        self.mean += shift
+        self.m2 += (value + 1 - self.mean) ** 2 - old_dev ** 2 + 2 * shift * old_dev + (self.n_hours - 1) * shift ** 2
+        self.count_hist[value] -= 1
+        if value + 1 >= len(self.count_hist):
+            self.count_hist.append(0)
+        self.count_hist[value + 1] += 1
+
+    # --- Hourly ring ---
+
+    def _advance(self, hour):
+        """Close every hour before `hour`, dropping bins that leave each window"""
+        if self.hour is None:
+            self.hour = hour
+            return
+        gap = hour - self.hour
+        if gap <= 0:
+            return
+
+        ring = self.ring_hours
+        if gap > ring:
+            # Everything in the ring expires - close the open hour and the empty ones in bulk
+            self._close_hour(self.hour, self.bins[self.hour % ring])
+            self._close_empty_hours(self.hour + 1, gap - 1)
+            if self.profile is not None:
+                self.profile.close_hour(self.hour, self.bins[self.hour % ring])
+                self.profile.close_hours(self.hour + 1, np.zeros(gap - 1, dtype=np.int64))
+            self.bins = [0] * ring
+            self.windows = dict.fromkeys(self.windows, 0)
+            self.hour = hour
+            return
+
+        for _ in range(gap):
+            self._close_hour(self.hour, self.bins[self.hour % ring])
+            if self.profile is not None:
+                self.profile.close_hour(self.hour, self.bins[self.hour % ring])
+            self.hour += 1
+            for width in self.windows:
+                self.windows[width] -= self.bins[(self.hour - width) % ring]
+            self.bins[self.hour % ring] = 0
+
+    def add_window(self, width):
+        """Register a lookback window (hours); its count is then kept in O(1)"""
+        width = int(width)
+        if not 1 <= width <= self.ring_hours:
+            raise ValueError(f"window must be 1-{self.ring_hours} hours, got {width}")
+        if width not in self.windows:
+            if self.hour is None:
+                self.windows[width] = 0
+            else:
+                self.windows[width] = sum(self.bins[(self.hour - i) % self.ring_hours] for i in range(width))
+
+    # --- Updates ---
+
+    def add(self, ts):
+        """Record one tweet at epoch seconds ts"""
+        hour = int(ts // 3600)
+        if self.hour is None or hour >= self.hour:
+            self._advance(hour)
+            self.bins[hour % self.ring_hours] += 1
+            for width in self.windows:
+                self.windows[width] += 1
+        elif self.hour - hour < self.ring_hours:
+            # Late-indexed tweet for an hour before the open one. If that hour
+            # was closed (always inside the stats window, which covers the
+            # ring) its recorded count moves up; an hour from before the first
+            # tweet seen was never closed and only lands in the ring.
+            slot = hour % self.ring_hours
+            if self.first_closed is not None and hour >= self.first_closed:
+                self._bump_closed_hour(self.bins[slot])
+                self.closed[hour % self.stats_hours] += 1
+                if self.profile is not None:
+                    self.profile.bump_hour(hour, self.bins[slot])
+            self.bins[slot] += 1
+            for width in self.windows:
+                if self.hour - hour < width:
+                    self.windows[width] += 1
+
+        t = ts / 3600
+        if self.ewma_time is None:
+            self.ewma_time = t
+        if t >= self.ewma_time:
+            for h, lam in self.decay.items():
+                self.ewma[h] = self.ewma[h] * math.exp(-lam * (t - self.ewma_time)) + lam
+            self.ewma_time = t
+        else:
+            for h, lam in self.decay.items():
+                self.ewma[h] += lam * math.exp(-lam * (self.ewma_time - t))
+
+        self.total += 1
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+
+    def add_many(self, timestamps):
+        for ts in timestamps:
+            self.add(float(ts))
+
+    # --- Queries (all take the current time, which closes any quiet hours) ---
+
+    def window_rate(self, width, now_ts):
+        """Tweets/hr over the last `width` hours (the open hour counts by its elapsed part)"""
+        self._advance(int(now_ts // 3600))
+        self.add_window(width)
+        if self.hour is None:
+            return 0.0
+        elapsed = width - 1 + (now_ts / 3600 - self.hour)
+        return self.windows[int(width)] / elapsed if elapsed > 0 else 0.0
+
+    def ewma_rate(self, half_life, now_ts):
+        """Exponentially weighted tweets/hr at a registered half-life"""
+        if self.ewma_time is None:
+            return 0.0
+        lam = self.decay[half_life]
+        return self.ewma[half_life] * math.exp(-lam * max(now_ts / 3600 - self.ewma_time, 0))
+
+    @property
+    def hourly_mean(self):
+        return self.mean
+
+    @property
+    def hourly_std(self):
+        """Sample std of the closed hourly counts in the stats window (ddof=1, like pandas)"""
+        return math.sqrt(self.m2 / (self.n_hours - 1)) if self.n_hours > 1 else 0.0
+
+    def hourly_pmf(self):
+        """Empirical per-hour count PMF over the closed hours in the stats window"""
+        hist = np.trim_zeros(np.asarray(self.count_hist, dtype=float), 'b')
+        return hist / hist.sum() if hist.sum() > 0 else np.ones(1)
+
+    def snapshot(self, now_ts, windows=()):
+        """Plain-dict view of every estimator at now_ts"""
+        snapshot = {
+            'window_rates': {w: self.window_rate(w, now_ts) for w in windows},
+            'ewma_rates': {h: self.ewma_rate(h, now_ts) for h in self.decay},
+            'hourly_mean': self.hourly_mean,
+            'hourly_std': self.hourly_std,
+            'hourly_pmf': self.hourly_pmf(),
+            'n_hours': self.n_hours,
+            'total': self.total,
+            'last_ts': self.last_ts
+        }
+        if self.profile is not None:
+            snapshot['seasonal'] = self.profile.hist.copy()
+        return snapshot
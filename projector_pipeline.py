@@ -0,0 +1,242 @@
+"""
+Projector Pipeline
+The data -> statistics -> projection steps behind elontracker.py as one plain
+function, so the Streamlit script and the background worker
+(projector_worker.py) run exactly the same computation. The result is a dict
+of plain values and arrays that can be pickled and shared between processes.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pytz
+
+from chart_series import chart_series
+from exact_projection import discretized_normal_pmf, project_exact
+from hawkes import fit_hawkes, simulate_hawkes
+from montecarlo import DEFAULT_SIMS, quantize_rate, simulate_joint, simulate_parallel, simulate_projection
+from pace_stats import PaceTracker
+from seasonal_profile import SLOTS, SeasonalProfile, hour_slots
+
+EST = pytz.timezone("US/Eastern")
+UTC = pytz.utc
+
+HISTORY_DAYS = 365
+
+# Sidebar defaults - the worker precomputes exactly this configuration
+DEFAULT_LOOKBACK_A = 24
+DEFAULT_LOOKBACK_B = 72
+DEFAULT_METHOD = 'antithetic'
+DEFAULT_MODEL = 'normal'
+
+# Monte Carlo hourly models: i.i.d. normal hours, or self-exciting bursts
+MODELS = ('normal', 'hawkes')
+
+
+def default_market_window(now_et):
+    """
+    Current Monday-noon to Monday-noon ET market window, localized from the
+    calendar dates exactly as the sidebar does (so a week crossing DST keeps
+    the right offset at each end and params_key matches)
+    """
+    noon = lambda date: EST.localize(datetime.combine(date, time(12)))
+    start_date = now_et.date() - timedelta(days=now_et.weekday())
+    if noon(start_date) > now_et:
+        start_date -= timedelta(days=7)
+    return noon(start_date), noon(start_date + timedelta(days=7))
+
+
+def default_params(now_et):
+    """Pipeline parameters matching the untouched sidebar"""
+    market_start_et, market_end_et = default_market_window(now_et)
+    return {
+        'market_start_et': market_start_et,
+        'market_end_et': market_end_et,
+        'lookback_a': DEFAULT_LOOKBACK_A,
+        'lookback_b': DEFAULT_LOOKBACK_B,
+        'n_sims': DEFAULT_SIMS,
+        'mc_method': DEFAULT_METHOD,
+        'mc_workers': 1,
+        'mc_tol': 0.0,
+        'seasonal': True,
+        'model': DEFAULT_MODEL
+    }
+
+
+def params_key(params):
+    """Hashable identity of a parameter set (datetimes as ISO strings)"""
+    return tuple(
+        (k, v.isoformat() if hasattr(v, 'isoformat') else v)
+        for k, v in sorted(params.items())
+    )
+
+
+def load_history(store, now_et, days=HISTORY_DAYS):
+    """Last `days` of posts from a TweetStore, up to now"""
+    return store.load_frame(
+        since_utc=(now_et - timedelta(days=days)).astimezone(UTC),
+        until_utc=now_et.astimezone(UTC)
+    )
+
+
+def load_pace(store, now_et, lookback_a, lookback_b):
+    """Streaming pace stats for both model lookbacks"""
+    return store.pace_stats(now_et.astimezone(UTC), (lookback_a, lookback_b))
+
+
+def model_rates(pace, lookback_a, lookback_b):
+    """Model A/B rates, their average (momentum) and its blend with the long-run mean"""
+    rate_a = pace['window_rates'][lookback_a]
+    rate_b = pace['window_rates'][lookback_b]
+    rate_avg = (rate_a + rate_b) / 2
+    return rate_a, rate_b, rate_avg, (rate_avg + pace['hourly_mean']) / 2
+
+
+def run_pipeline(df, now_et, market_start_et, market_end_et, lookback_a, lookback_b,
+                 n_sims=DEFAULT_SIMS, mc_method=DEFAULT_METHOD, mc_workers=1, mc_tol=0.0,
+                 seasonal=True, model=DEFAULT_MODEL, projection_cache=None, pace=None):
+    """
+    df: posts with a tz-aware UTC 'createdAt' column (TweetStore.load_frame).
+    pace: PaceTracker snapshot with window_rates for both lookbacks and the
+    'seasonal' hour-of-week histogram (TweetStore.pace_stats); built from df
+    when not given.
+    seasonal: draw each future hour from its hour-of-week slot instead of one
+    flat rate and dispersion.
+    model: 'normal' (i.i.d. hours at the model rates) or 'hawkes' (bursts from
+    a self-exciting process fitted on recent history, hawkes.py); the exact
+    engines always use the normal / empirical hourly model.
+    Returns hourly stats, model rates, the Monte Carlo and both exact
+    projections, and the chart lines (chart_series).
+    """
+    created_et = df['createdAt'].dt.tz_convert(EST).dt.as_unit('ns').sort_values()
+
+    # --- Statistical Processing ---
+    if pace is None:
+        timestamps = created_et.astype('int64').to_numpy() / 1e9
+        tracker = PaceTracker.from_timestamps(timestamps)
+        pace = tracker.snapshot(now_et.timestamp(), (lookback_a, lookback_b))
+        pace['seasonal'] = SeasonalProfile.from_timestamps(timestamps, until_ts=now_et.timestamp()).hist
+    hourly_mean = pace['hourly_mean']
+    hourly_std = pace['hourly_std']
+    rate_a, rate_b, rate_avg, hybrid_rate = model_rates(pace, lookback_a, lookback_b)
+
+    market_times = created_et[(created_et >= market_start_et) & (created_et <= now_et)]
+    current_count = len(market_times)
+
+    hours_remaining = int((market_end_et - now_et).total_seconds() / 3600)
+    if hours_remaining < 0:
+        hours_remaining = 0
+
+    # --- Monte Carlo Simulation ---
+    # Half the sims use the momentum rate, half a blend with the 365d mean.
+    # With no time left the engine just returns the current count.
+
+    # Seasonal: hour j of the remaining window is N(rate x slot shape, slot std)
+    # for its ET hour-of-week slot; paths stay aligned to the market end time
+    profile = SeasonalProfile(pace['seasonal']) if seasonal else None
+    end_ts = market_end_et.timestamp()
+
+    def hourly_model(rates):
+        if profile is None:
+            return list(rates), hourly_std
+        return profile.hourly_model(rates, end_ts, hours_remaining)
+
+    if model == 'hawkes':
+        # Baseline follows the slot shape; the current excitation carries any
+        # burst in progress into the remaining window
+        timestamps = created_et.astype('int64').to_numpy() / 1e9
+        slot_shape = profile.shape() if profile is not None else None
+        shape_fn = (lambda hours: slot_shape[hour_slots(hours)]) if profile is not None else None
+        hawkes = fit_hawkes(timestamps, now_et.timestamp(), shape_fn)
+        mc = simulate_hawkes(
+            hawkes, current_count, hours_remaining, n_sims=n_sims, tol=mc_tol or None,
+            shape=slot_shape[profile.future_slots(end_ts, hours_remaining)] if profile is not None else None,
+            excitation=hawkes.excitation(timestamps, now_et.timestamp())
+        )
+    elif projection_cache is not None and mc_workers == 1 and not mc_tol:
+        # Paths are cached per model; later reruns only drop elapsed hours and
+        # add the observed count, so non-model widgets never resimulate
+        q_rates = [quantize_rate(rate_avg), quantize_rate(hybrid_rate)]
+        model_key = (market_end_et.isoformat(), lookback_a, lookback_b, *q_rates, round(hourly_std, 2),
+                     n_sims, mc_method, seasonal)
+        mc = projection_cache.project(
+            model_key, current_count, hours_remaining, *hourly_model(q_rates), n_sims=n_sims, method=mc_method
+        )
+    elif mc_workers > 1:
+        mc = simulate_parallel(
+            current_count, hours_remaining, *hourly_model([rate_avg, hybrid_rate]),
+            n_sims=n_sims, workers=mc_workers, method=mc_method, tol=mc_tol or None
+        )
+    else:
+        mc = simulate_projection(
+            current_count, hours_remaining, *hourly_model([rate_avg, hybrid_rate]),
+            n_sims=n_sims, method=mc_method, tol=mc_tol or None
+        )
+
+    # --- Exact Projection (convolution of the per-hour PMF) ---
+    if profile is None:
+        exact_normal = project_exact(
+            [discretized_normal_pmf(rate_avg, hourly_std), discretized_normal_pmf(hybrid_rate, hourly_std)],
+            hours_remaining, current_count
+        )
+        exact_empirical = project_exact([pace['hourly_pmf']], hours_remaining, current_count)
+    else:
+        # One PMF per slot, convolved as many times as the slot recurs
+        slot_hours = np.bincount(profile.future_slots(end_ts, hours_remaining), minlength=SLOTS)
+        shape = profile.shape()
+        _, slot_std = profile.slot_stats()
+        exact_normal = project_exact(
+            [[discretized_normal_pmf(rate * shape[s], slot_std[s]) if slot_hours[s] else np.ones(1)
+              for s in range(SLOTS)] for rate in (rate_avg, hybrid_rate)],
+            hours_remaining, current_count, slot_hours=slot_hours
+        )
+        exact_empirical = project_exact([profile.slot_pmfs()], hours_remaining, current_count, slot_hours=slot_hours)
+
+    proj_a = current_count + rate_a * hours_remaining
+    proj_b = current_count + rate_b * hours_remaining
+    proj_avg = current_count + rate_avg * hours_remaining
+
+    # --- Chart lines: reduced 'Actual' step line plus the projection lines ---
+    chart = chart_series(market_times, market_start_et, market_end_et, now_et, hourly_mean,
+                         {'proj_a': proj_a, 'proj_b': proj_b, 'proj_avg': proj_avg})
+
+    return {
+        'now_et': now_et,
+        'hourly_mean': hourly_mean,
+        'hourly_std': hourly_std,
+        'rate_a': rate_a,
+        'rate_b': rate_b,
+        'rate_avg': rate_avg,
+        'current_count': current_count,
+        'hours_remaining': hours_remaining,
+        'proj_a': proj_a,
+        'proj_b': proj_b,
+        'proj_avg': proj_avg,
+        'mc': mc,
+        'exact_normal': exact_normal,
+        'exact_empirical': exact_empirical,
+        'chart': chart
+    }
+
+
+def run_joint_projection(pace, markets, now_et, lookback_a, lookback_b,
+                         n_sims=DEFAULT_SIMS, mc_method=DEFAULT_METHOD, seasonal=True):
+    """
+    One Monte Carlo pass for every open market (MarketIndex.open_markets rows
+    with 'count' and 'end_ts'): the shared hourly future is simulated once
+    over the longest remaining window and each market reads its own total.
+    Returns (markets with 'hours_remaining' and 'projection', correlation matrix).
+    """
+    now_ts = now_et.timestamp()
+    hours = [max(int((m['end_ts'] - now_ts) / 3600), 0) for m in markets]
+    horizon = max(hours, default=0)
+    _, _, rate_avg, hybrid_rate = model_rates(pace, lookback_a, lookback_b)
+
+    if seasonal:
+        profile = SeasonalProfile(pace['seasonal'])
+        rates, scale = profile.hourly_model([rate_avg, hybrid_rate], now_ts + horizon * 3600, horizon)
+    else:
+        rates, scale = [rate_avg, hybrid_rate], pace['hourly_std']
+
+    results, corr = simulate_joint([m['count'] for m in markets], hours, rates, scale,
+                                   n_sims=n_sims, method=mc_method)
+    return [dict(m, hours_remaining=h, projection=r) for m, h, r in zip(markets, hours, results)], corr
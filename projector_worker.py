@@ -0,0 +1,98 @@
+"""
+Projector Background Worker
+Long-lived process that keeps the projector's heavy pipeline (tweet sync,
+hourly stats, Monte Carlo / exact projections) fresh on a schedule and
+publishes the result for the default sidebar configuration to a shared
+file. Every Streamlit session reads that file instead of recomputing, so ten
+viewers cost one computation.
+
+Usage:
+    python projector_worker.py               # refresh every 60s
+    python projector_worker.py --interval 30
+    python projector_worker.py --once        # single refresh, then exit
+"""
+import argparse
+import os
+import pickle
+import time
+from datetime import datetime
+
+from montecarlo import ProjectionCache
+from projector_pipeline import EST, default_params, load_history, load_pace, params_key, run_pipeline
+from tweet_store import TweetStore
+
+PUBLISH_PATH = 'projector_cache.pkl'
+REFRESH_INTERVAL = 60       # seconds between refreshes
+STALE_AFTER = 3 * REFRESH_INTERVAL  # readers ignore results older than this
+
+
+def publish(key, result, path=PUBLISH_PATH):
+    """Write atomically: readers see either the old file or the new one, never half"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'key': key, 'published_at': time.time(), 'result': result}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_published(path=PUBLISH_PATH, max_age=STALE_AFTER):
+    """Latest published payload, or None if missing, unreadable or stale"""
+    try:
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if time.time() - payload.get('published_at', 0) > max_age:
+        return None
+    return payload
+
+
+def refresh(store, projection_cache, path=PUBLISH_PATH):
+    """Sync new posts, rerun the default pipeline and publish it"""
+    try:
+        added = store.sync(force=True)
+    except Exception as e:
+        added = 0
+        print(f"⚠️  Sync failed, using local history: {e}")
+
+    now_et = datetime.now(EST)
+    df = load_history(store, now_et)
+    if df.empty:
+        print("❌ No tweet history available yet")
+        return None
+
+    params = default_params(now_et)
+    pace = load_pace(store, now_et, params['lookback_a'], params['lookback_b'])
+    result = run_pipeline(df, now_et, projection_cache=projection_cache, pace=pace, **params)
+    publish(params_key(params), result, path)
+    return added, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep the projector results fresh for all viewers')
+    parser.add_argument('--interval', type=float, default=REFRESH_INTERVAL, help='Seconds between refreshes')
+    parser.add_argument('--output', default=PUBLISH_PATH, help='Shared results file')
+    parser.add_argument('--once', action='store_true', help='Refresh once and exit')
+    args = parser.parse_args()
+
+    store = TweetStore()
+    projection_cache = ProjectionCache()
+    print(f"🚀 Projector worker publishing to {args.output} every {args.interval:.0f}s")
+
+    while True:
+        start = time.time()
+        try:
+            refreshed = refresh(store, projection_cache, args.output)
+            if refreshed:
+                added, result = refreshed
+                print(f"✅ {result['now_et']:%H:%M:%S} +{added} posts, count {result['current_count']}, "
+                      f"P50 {result['mc']['p50']:.0f} ({time.time() - start:.2f}s)")
+        except Exception as e:
+            print(f"❌ Refresh failed: {e}")
+
+        if args.once:
+            break
+        time.sleep(max(args.interval - (time.time() - start), 1))
+
+
+if __name__ == '__main__':
+    main()
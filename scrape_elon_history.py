@@ -7,6 +7,8 @@ from datetime import datetime
 import matplotlib.pyplot as plt
 import numpy as np
 
+from buckets import parse_bucket
+
 # Polymarket API endpoints
 EVENTS_API = 'https://gamma-api.polymarket.com/events'
 CLOB_API = 'https://clob.polymarket.com/markets'
@@ -135,16 +137,12 @@ def get_event_outcome(event):
 
 def parse_bucket_from_title(title):
     """Extract bucket range from outcome title (e.g., '200-219' from title)"""
-    import re
-    match = re.search(r'(\d+)-(\d+)', title)
-    if match:
-        return int(match.group(1)), int(match.group(2))
-    
-    # Handle 500+ case
-    if '500' in title or '500+' in title:
-        return 500, 999
-    
-    return None, None
+    bounds = parse_bucket(title)
+    if not bounds:
+        return None, None
+    low, upper = bounds
+    # Open-ended buckets (500+) keep the old 999 cap for the midpoint
+    return low, (upper - 1 if upper != float('inf') else 999)
 
 def analyze_historical_outcomes():
     """Main analysis function"""
@@ -8,6 +8,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime
 
+from buckets import bucket_sort_key
+
 # MANUALLY COMPILED HISTORICAL DATA FROM POLYMARKET
 # Based on resolved markets from June 2024 - December 2024
 # Source: Checking resolved Polymarket events
@@ -228,7 +230,7 @@ def create_visualizations(data, mean, std, allocations, total_alloc):
     plt.subplot(3, 2, 3)
     from collections import Counter
     bucket_counts = Counter([d['bucket'] for d in data])
-    buckets = sorted(bucket_counts.keys(), key=lambda x: int(x.split('-')[0]))
+    buckets = sorted(bucket_counts.keys(), key=bucket_sort_key)
     counts = [bucket_counts[b] for b in buckets]
     
     colors = ['#00ff88' if b == '200-219' else '#667eea' for b in buckets]
@@ -0,0 +1,139 @@
+"""
+Hour-of-Week Seasonal Profile
+Histogram of hourly tweet counts for each of the 168 hour-of-week slots
+(Monday 00:00 ET = slot 0). Built from raw timestamps with a few vectorised
+bincounts, then updated one closed hour at a time by PaceTracker. Gives the
+projection engines a per-slot mean, dispersion and empirical PMF so every
+future hour is drawn from its own slot instead of one flat rate.
+"""
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pytz
+
+EST = pytz.timezone("US/Eastern")
+SLOTS = 168
+MIN_SLOT_HOURS = 4  # slots seen fewer times fall back to the overall hourly stats
+
+
+def hour_slots(hours):
+    """ET hour-of-week slot of each epoch hour index (vectorised)"""
+    local = pd.to_datetime(np.asarray(hours, dtype=np.int64) * 3600, unit='s', utc=True).tz_convert(EST)
+    return np.asarray(local.dayofweek * 24 + local.hour, dtype=np.int64)
+
+
+@lru_cache(maxsize=4096)
+def hour_slot(hour):
+    """ET hour-of-week slot of one epoch hour index"""
+    local = EST.fromutc(datetime(1970, 1, 1) + timedelta(hours=int(hour)))
+    return local.weekday() * 24 + local.hour
+
+
+class SeasonalProfile:
+    def __init__(self, hist=None):
+        # hist[slot, k] = closed hours in that slot that saw k tweets
+        self.hist = np.zeros((SLOTS, 1), dtype=np.int64) if hist is None else np.asarray(hist, dtype=np.int64)
+
+    @classmethod
+    def from_timestamps(cls, timestamps, until_ts=None):
+        """
+        Profile of every complete hour from the first timestamp up to until_ts
+        (default: the hour of the last timestamp, which is left open).
+        """
+        ts = np.asarray(timestamps, dtype=float)
+        if len(ts) == 0:
+            return cls()
+        hours = (ts // 3600).astype(np.int64)
+        first = hours.min()
+        last = int((until_ts if until_ts is not None else ts.max()) // 3600)
+        counts = np.bincount(hours[hours < last] - first, minlength=max(last - first, 0))
+        profile = cls()
+        profile.close_hours(first, counts)
+        return profile
+
+    def _ensure_width(self, count):
+        if count >= self.hist.shape[1]:
+            grown = np.zeros((SLOTS, count + 1), dtype=np.int64)
+            grown[:, :self.hist.shape[1]] = self.hist
+            self.hist = grown
+
+    # --- Updates ---
+
+    def close_hour(self, hour, count):
+        """Record one complete hour (epoch hour index) with `count` tweets"""
+        self._ensure_width(count)
+        self.hist[hour_slot(hour), count] += 1
+
+    def close_hours(self, first_hour, counts):
+        """Record consecutive complete hours starting at first_hour"""
+        counts = np.asarray(counts, dtype=np.int64)
+        if len(counts) == 0:
+            return
+        self._ensure_width(int(counts.max()))
+        slots = hour_slots(first_hour + np.arange(len(counts)))
+        width = self.hist.shape[1]
+        self.hist += np.bincount(slots * width + counts, minlength=SLOTS * width).reshape(SLOTS, width)
+
+    def bump_hour(self, hour, old_count):
+        """A late tweet raised a closed hour from old_count to old_count + 1"""
+        self._ensure_width(old_count + 1)
+        slot = hour_slot(hour)
+        self.hist[slot, old_count] -= 1
+        self.hist[slot, old_count + 1] += 1
+
+    # --- Per-slot statistics ---
+
+    def slot_hours(self):
+        return self.hist.sum(axis=1)
+
+    def slot_stats(self):
+        """(mean, std) arrays per slot; sparse slots use the overall values"""
+        k = np.arange(self.hist.shape[1])
+        n = self.slot_hours()
+        total = max(n.sum(), 1)
+        overall_mean = (self.hist @ k).sum() / total
+        overall_var = (self.hist @ (k * k)).sum() / total - overall_mean ** 2
+
+        safe_n = np.maximum(n, 1)
+        mean = (self.hist @ k) / safe_n
+        var = (self.hist @ (k * k)) / safe_n - mean ** 2
+        sparse = n < MIN_SLOT_HOURS
+        mean[sparse] = overall_mean
+        var[sparse] = overall_var
+        return mean, np.sqrt(np.maximum(var, 0))
+
+    def shape(self):
+        """Slot mean relative to the overall hourly mean (1.0 = average hour)"""
+        mean, _ = self.slot_stats()
+        overall = mean @ self.slot_hours() / max(self.slot_hours().sum(), 1)
+        return mean / overall if overall > 0 else np.ones(SLOTS)
+
+    def slot_pmfs(self):
+        """Empirical hourly count PMF per slot, (SLOTS, K); sparse slots use the overall PMF"""
+        n = self.slot_hours()
+        overall = self.hist.sum(axis=0) / max(n.sum(), 1)
+        pmfs = self.hist / np.maximum(n, 1)[:, None]
+        pmfs[n < MIN_SLOT_HOURS] = overall
+        return pmfs
+
+    # --- Future hours ---
+
+    @staticmethod
+    def future_slots(end_ts, hours):
+        """Slots of the `hours` whole hours that end at end_ts"""
+        hours = int(max(hours, 0))
+        starts = end_ts - 3600 * np.arange(hours, 0, -1)
+        return hour_slots(np.floor(starts / 3600).astype(np.int64))
+
+    def hourly_model(self, rates, end_ts, hours):
+        """
+        Per-hour normal model for the remaining hours: each component rate is
+        spread over the week by the slot shape, and each hour's dispersion is
+        its slot's historical std. Returns (list of loc arrays, scale array).
+        """
+        slots = self.future_slots(end_ts, hours)
+        shape = self.shape()[slots]
+        _, std = self.slot_stats()
+        return [rate * shape for rate in rates], std[slots]
@@ -0,0 +1,54 @@
+"""PaceTracker against brute-force hourly counts, including out-of-order tweets"""
+import numpy as np
+
+from pace_stats import PaceTracker
+from seasonal_profile import SeasonalProfile
+
+
+def closed_counts(timestamps, first_hour, now_ts):
+    """Per-hour counts of the hours from first_hour up to (not including) the open one"""
+    hours = np.asarray(timestamps, dtype=float) // 3600
+    hours = hours[hours >= first_hour].astype(np.int64) - first_hour
+    return np.bincount(hours, minlength=int(now_ts // 3600) - first_hour)[:int(now_ts // 3600) - first_hour]
+
+
+def test_late_tweet_before_first_hour():
+    tracker = PaceTracker(windows=(3,))
+    tracker.add(7200)
+    tracker.add(3600)  # an hour that was never closed
+    assert tracker.n_hours == 0
+    assert tracker.windows[3] == 2
+
+    snapshot = tracker.snapshot(5 * 3600 + 1, (3,))
+    assert snapshot['n_hours'] == 3
+    assert np.isclose(snapshot['hourly_mean'], 1 / 3)
+    assert np.allclose(snapshot['hourly_pmf'], [2 / 3, 1 / 3])
+
+
+def test_late_tweet_before_first_hour_leaves_stats():
+    tracker = PaceTracker()
+    for ts in (7200, 7300, 3 * 3600, 4 * 3600):
+        tracker.add(ts)
+    before = (tracker.n_hours, tracker.mean, tracker.m2, list(tracker.count_hist))
+    tracker.add(100)
+    assert (tracker.n_hours, tracker.mean, tracker.m2, list(tracker.count_hist)) == before
+
+
+def test_out_of_order_matches_brute_force():
+    rng = np.random.default_rng(7)
+    ts = np.sort(rng.uniform(100 * 3600, 900 * 3600, 4000))
+    late = rng.choice(len(ts), 300, replace=False)
+    ts[late] -= rng.uniform(0, 200 * 3600, len(late))  # some land before the first hour
+
+    tracker = PaceTracker(stats_hours=720, profile=SeasonalProfile())
+    tracker.add_many(ts)
+    now = 1000 * 3600 + 60
+    snapshot = tracker.snapshot(now, (24, 720))
+
+    counts = closed_counts(ts, int(ts[0] // 3600), now)[-720:]
+    assert snapshot['n_hours'] == len(counts)
+    assert np.isclose(snapshot['hourly_mean'], counts.mean())
+    assert np.isclose(snapshot['hourly_std'], counts.std(ddof=1))
+    assert np.allclose(snapshot['hourly_pmf'], np.bincount(counts) / len(counts))
+    assert tracker.profile.hist.sum() == tracker.hour - tracker.first_closed
+    assert tracker.windows[720] == np.count_nonzero(ts // 3600 > tracker.hour - 720)
@@ -3,19 +3,21 @@ import json
 import time
 import sqlite3
 from datetime import datetime
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, jsonify, render_template_string, request
 from flask_cors import CORS
 import threading
 
+from buckets import bucket_sort_key, find_bucket, sort_buckets
+
 app = Flask(__name__)
 CORS(app)
 
 # Database setup
 DB_PATH = 'tracker_history.db'
 
-def init_db():
+def init_db(db_path=DB_PATH):
     """Initialize SQLite database"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     # Positions snapshot table
@@ -60,7 +62,33 @@ def init_db():
             FOREIGN KEY (snapshot_id) REFERENCES snapshots(id)
         )
     ''')
-    
+
+    # Raw trade fills imported from trade dumps (see import_trades.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            trade_ts INTEGER NOT NULL,
+            trade_dttm TEXT NOT NULL,
+            trader_id TEXT NOT NULL,
+            trader_name TEXT,
+            event_id TEXT NOT NULL,
+            market_title TEXT,
+            bucket TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            side TEXT NOT NULL,
+            amount REAL NOT NULL,
+            price REAL NOT NULL,
+            value REAL
+        )
+    ''')
+
+    # Natural key - re-importing an overlapping dump never duplicates fills.
+    # Leading with trade_ts keeps inserts cheap and doubles as the time index.
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_trades_natural_key
+        ON trades (trade_ts, trader_id, event_id, bucket, outcome, side, amount, price)
+    ''')
+
     conn.commit()
     conn.close()
     print("✅ Database initialized")
@@ -475,7 +503,14 @@ HTML_TEMPLATE = """
             try {
                 const response = await fetch('/api/timeline');
                 const data = await response.json();
-                if (data.timestamps) updateTimelineChart(data);
+                if (data.timestamps) {
+                    // Overlay real fills (imported trade dumps) on the exposure timeline
+                    const start = data.timestamps[0];
+                    const end = data.timestamps[data.timestamps.length - 1];
+                    const tradesResponse = await fetch(`/api/trades?start=${encodeURIComponent(start)}&end=${encodeURIComponent(end)}`);
+                    const tradesData = await tradesResponse.json();
+                    updateTimelineChart(data, tradesData.trades || []);
+                }
             } catch (error) {
                 console.error('Error:', error);
             }
@@ -510,8 +545,10 @@ HTML_TEMPLATE = """
         
         function updateButterflyChart(positions) {
             const bucketMap = {};
+            const bucketLower = {};
             positions.forEach(pos => {
-                const bucket = pos.title.match(/(\\d+-\\d+|\\d+\\+)/)?.[0] || pos.title;
+                const bucket = pos.bucket;
+                bucketLower[bucket] = pos.bucket_lower;
                 
                 let value = 0;
                 if (currentChartMode === 'shares') {
@@ -528,10 +565,7 @@ HTML_TEMPLATE = """
                 bucketMap[bucket] = (bucketMap[bucket] || 0) + value;
             });
             
-            const sorted = Object.entries(bucketMap).sort((a, b) => {
-                const getNum = str => parseInt(str.split('-')[0]) || 1000;
-                return getNum(a[0]) - getNum(b[0]);
-            });
+            const sorted = Object.entries(bucketMap).sort((a, b) => bucketLower[a[0]] - bucketLower[b[0]]);
             
             butterflyChart.data.labels = sorted.map(([bucket]) => bucket);
             butterflyChart.data.datasets[0].data = sorted.map(([, val]) => val);
@@ -542,13 +576,10 @@ HTML_TEMPLATE = """
             butterflyChart.update();
         }
         
-        function updateTimelineChart(data) {
+        function updateTimelineChart(data, fills = []) {
             if (!data.timestamps || data.timestamps.length === 0) return;
             
-            const allBuckets = Object.keys(data.buckets).sort((a, b) => {
-                const getNum = str => parseInt(str.split('-')[0]) || 1000;
-                return getNum(a) - getNum(b);
-            });
+            const allBuckets = data.bucket_order;  // sorted numerically by the server
             
             // Get existing visibility states
             const graphDiv = document.getElementById('timelineChart');
@@ -584,6 +615,28 @@ HTML_TEMPLATE = """
 
                 return trace;
             });
+
+            if (fills.length > 0) {
+                // Buy Yes / Sell No add exposure (up), the rest reduce it (down)
+                const isLong = f => (f.side === 'buy') === (f.outcome === 'Yes');
+                traces.push({
+                    x: fills.map(f => f.time),
+                    y: fills.map(f => isLong(f) ? f.amount : -f.amount),
+                    text: fills.map(f => `${f.side.toUpperCase()} ${f.outcome} ${f.bucket}<br>${f.amount.toFixed(0)} @ ${(f.price * 100).toFixed(1)}¢`),
+                    hoverinfo: 'text+x',
+                    name: 'Fills',
+                    type: 'scatter',
+                    mode: 'markers',
+                    yaxis: 'y2',
+                    marker: {
+                        size: 6,
+                        symbol: fills.map(f => isLong(f) ? 'triangle-up' : 'triangle-down'),
+                        color: fills.map(f => isLong(f) ? '#00ff88' : '#ff3860'),
+                        line: { color: '#fff', width: 0.5 }
+                    },
+                    visible: visibilityMap['Fills'] !== undefined ? visibilityMap['Fills'] : true
+                });
+            }
             
             const layout = {
                 paper_bgcolor: 'rgba(0,0,0,0)',
@@ -599,7 +652,14 @@ HTML_TEMPLATE = """
                     zerolinecolor: 'rgba(255,255,255,0.1)',
                     title: 'Exposure'
                 },
-                margin: { t: 10, l: 40, r: 20, b: 40 },
+                yaxis2: {
+                    overlaying: 'y',
+                    side: 'right',
+                    showgrid: false,
+                    zerolinecolor: 'rgba(255,255,255,0.1)',
+                    title: 'Fill Size'
+                },
+                margin: { t: 10, l: 40, r: 40, b: 40 },
                 showlegend: true,
                 legend: {
                     x: 1.02,
@@ -619,7 +679,7 @@ HTML_TEMPLATE = """
             list.innerHTML = '';
             
             positions.sort((a, b) => Math.abs(b.size) - Math.abs(a.size)).forEach(pos => {
-                const bucket = pos.title.match(/(\\d+-\\d+|\\d+\\+)/)?.[0] || pos.title;
+                const bucket = pos.bucket;
                 const isLong = pos.outcome === 'Yes';
                 const invested = pos.invested || 0;
                 
@@ -707,9 +767,7 @@ def process_positions(positions):
     for pos in positions:
         title = pos.get('title', '')
         # Extract bucket (e.g., "200-219")
-        import re
-        match = re.search(r'(\d+-\d+|\d+\+)', title)
-        bucket = match.group(1) if match else title
+        bucket = find_bucket(title) or title
         
         outcome = pos.get('outcome', 'Yes')
         size = pos.get('size', 0)
@@ -792,8 +850,12 @@ def get_current():
             avg_price = api_avg_price
             invested = size * avg_price
         
+        title = pos.get('title', '')
+        bucket = find_bucket(title) or title
         processed.append({
-            'title': pos.get('title', ''),
+            'title': title,
+            'bucket': bucket,
+            'bucket_lower': min(bucket_sort_key(bucket), 1000000),
             'outcome': pos.get('outcome', 'Yes'),
             'size': size,
             'avgPrice': avg_price,
@@ -825,15 +887,7 @@ def get_butterfly():
     latest = position_history[-1]
     
     # Sort buckets numerically
-    def get_sort_key(bucket):
-        if '+' in bucket:
-            return 1000
-        try:
-            return int(bucket.split('-')[0])
-        except:
-            return 0
-    
-    sorted_buckets = sorted(latest['buckets'].items(), key=lambda x: get_sort_key(x[0]))
+    sorted_buckets = sorted(latest['buckets'].items(), key=lambda x: bucket_sort_key(x[0]))
     
     return jsonify({
         'buckets': dict(sorted_buckets),
@@ -867,7 +921,8 @@ def get_timeline():
     # Build timeline data
     timeline = {
         'timestamps': [s['timestamp'] for s in data_to_send],
-        'buckets': {}
+        'buckets': {},
+        'bucket_order': sort_buckets(all_buckets)
     }
     
     for bucket in all_buckets:
@@ -893,6 +948,41 @@ def debug():
         'latest_snapshot': position_history[-1] if position_history else None
     })
 
+@app.route('/api/trades')
+def get_trades():
+    """Get imported fills for the tracked wallet, for overlaying on the timeline"""
+    start = request.args.get('start')
+    end = request.args.get('end')
+    limit = request.args.get('limit', 5000, type=int)
+    try:
+        # Snapshot timestamps are local time; trades are stored as UTC epoch seconds
+        start_ts = int(datetime.fromisoformat(start).timestamp()) if start else 0
+        end_ts = int(datetime.fromisoformat(end).timestamp()) if end else int(time.time())
+
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT trade_ts, bucket, outcome, side, amount, price
+            FROM trades
+            WHERE trader_id = ? AND trade_ts BETWEEN ? AND ?
+            ORDER BY trade_ts
+            LIMIT ?
+        ''', (USER_ADDRESS.lower(), start_ts, end_ts, limit))
+        rows = cursor.fetchall()
+        conn.close()
+
+        trades = [{
+            'time': datetime.fromtimestamp(ts).isoformat(),
+            'bucket': bucket,
+            'outcome': outcome,
+            'side': side,
+            'amount': amount,
+            'price': price
+        } for ts, bucket, outcome, side, amount, price in rows]
+        return jsonify({'trades': trades})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/db/stats')
 def db_stats():
     """Get database statistics"""
@@ -908,6 +998,9 @@ def db_stats():
         
         cursor.execute('SELECT COUNT(DISTINCT bucket) FROM bucket_history')
         unique_buckets = cursor.fetchone()[0]
+
+        cursor.execute('SELECT COUNT(*) FROM trades')
+        total_trades = cursor.fetchone()[0]
         
         conn.close()
         
@@ -916,6 +1009,7 @@ def db_stats():
             'first_snapshot': min_time,
             'last_snapshot': max_time,
             'unique_buckets': unique_buckets,
+            'total_trades': total_trades,
             'database_path': DB_PATH
         })
     except Exception as e:
@@ -0,0 +1,241 @@
+"""
+Local Tweet Store
+Persistent SQLite store of xTracker posts keyed by post id. Only posts newer
+than the latest stored createdAt are fetched from the API, so every Streamlit
+session / process shares one local copy and starts from disk. New rows also
+feed a streaming PaceTracker (pace_stats.py) for O(1) rate queries and its
+hour-of-week SeasonalProfile, and the per-market counts of a MarketIndex.
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytz
+import requests
+
+from market_index import MarketIndex
+from pace_stats import PaceTracker
+from seasonal_profile import SeasonalProfile
+
+TWEET_DB_PATH = 'tweet_history.db'
+XTRACKER_URL = "https://xtracker.polymarket.com/api/users/{handle}/posts"
+DEFAULT_HANDLE = 'elonmusk'
+
+FETCH_LIMIT = 10000               # xTracker max posts per request
+BACKFILL_DAYS = 365               # history to download into an empty store
+BACKFILL_WINDOW = timedelta(days=30)  # keep each backfill request under FETCH_LIMIT
+SYNC_OVERLAP = timedelta(hours=1)     # re-read the last hour to catch late-indexed posts
+SYNC_INTERVAL = 60                # seconds between API syncs in one process
+
+UTC = pytz.utc
+
+
+def fetch_posts(start_dt_utc, end_dt_utc, handle=DEFAULT_HANDLE):
+    """
+    Fetches posts from the Polymarket xTracker API.
+    Raises on HTTP / API errors so callers can decide how to surface them.
+    """
+    params = {
+        "startDate": start_dt_utc.isoformat(),
+        "endDate": end_dt_utc.isoformat(),
+        "limit": FETCH_LIMIT
+    }
+    response = requests.get(XTRACKER_URL.format(handle=handle), params=params, timeout=30)
+    response.raise_for_status()
+    data = response.json()
+    if not data.get("success"):
+        raise RuntimeError(f"xTracker error: {data.get('message', data)}")
+    return data.get("data", [])
+
+
+class TweetStore:
+    def __init__(self, db_path=TWEET_DB_PATH, handle=DEFAULT_HANDLE):
+        self.db_path = db_path
+        self.handle = handle
+        self.last_sync = 0
+        self._sync_lock = threading.Lock()
+        # In-memory copy of the table, topped up incrementally by rowid
+        self._frame = pd.DataFrame({'id': pd.Series(dtype=object), 'created_ms': pd.Series(dtype='int64')})
+        self._max_rowid = 0
+        self._frame_lock = threading.Lock()
+        # Streaming pace estimators, fed the same incremental rows
+        self.pace = PaceTracker(profile=SeasonalProfile())
+        # Per-market counts for every registered market window
+        self.markets = MarketIndex()
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        # WAL lets any number of sessions/processes read while one writes
+        conn.execute('PRAGMA journal_mode = WAL')
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS posts (
+                id TEXT PRIMARY KEY,
+                handle TEXT NOT NULL,
+                created_ms INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_posts_created ON posts (handle, created_ms)')
+        conn.commit()
+        conn.close()
+
+    def add_posts(self, posts):
+        """Insert API posts, skipping ids already stored. Returns the number added."""
+        rows = []
+        for post in posts:
+            created_at = post.get('createdAt')
+            if not created_at:
+                continue
+            created_ms = int(pd.Timestamp(created_at).timestamp() * 1000)
+            post_id = str(post.get('id') or f"{self.handle}:{created_ms}")
+            rows.append((post_id, self.handle, created_ms, created_at))
+
+        conn = self._connect()
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT OR IGNORE INTO posts (id, handle, created_ms, created_at) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            conn.commit()
+            return conn.total_changes - before
+        finally:
+            conn.close()
+
+    def latest_created_at(self):
+        """Timestamp (UTC) of the newest stored post, or None for an empty store"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT MAX(created_ms) FROM posts WHERE handle = ?', (self.handle,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row[0] is None:
+            return None
+        return datetime.fromtimestamp(row[0] / 1000, tz=UTC)
+
+    def sync(self, now_utc=None, backfill_days=BACKFILL_DAYS, force=False):
+        """
+        Fetch posts newer than the latest stored one (or backfill an empty store).
+        Throttled to one API sync per SYNC_INTERVAL per process unless force=True.
+        Returns the number of new posts stored.
+        """
+        if not force and time.time() - self.last_sync < SYNC_INTERVAL:
+            return 0
+
+        with self._sync_lock:
+            if not force and time.time() - self.last_sync < SYNC_INTERVAL:
+                return 0  # another session synced while we waited
+
+            now_utc = now_utc or datetime.now(UTC)
+            latest = self.latest_created_at()
+            if latest is None:
+                start = now_utc - timedelta(days=backfill_days)
+            else:
+                start = latest - SYNC_OVERLAP
+
+            added = 0
+            while start < now_utc:
+                end = min(start + BACKFILL_WINDOW, now_utc)
+                added += self.add_posts(fetch_posts(start, end, self.handle))
+                start = end
+
+            self.last_sync = time.time()
+            return added
+
+    def _refresh_frame(self):
+        """Append rows inserted since the last load (by any process) to the in-memory copy"""
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT rowid, id, created_ms FROM posts
+                WHERE handle = ? AND rowid > ?
+            ''', (self.handle, self._max_rowid)).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return
+
+        new = pd.DataFrame(rows, columns=['rowid', 'id', 'created_ms'])
+        self._max_rowid = int(new['rowid'].max())
+        new_ts = np.sort(new['created_ms'].to_numpy()) / 1000
+        self.pace.add_many(new_ts)
+        self.markets.add_tweets(new_ts)
+        frame = pd.concat([self._frame, new.drop(columns='rowid')], ignore_index=True)
+        self._frame = frame.sort_values('created_ms', kind='stable', ignore_index=True)
+
+    def load_frame(self, since_utc=None, until_utc=None):
+        """
+        Stored posts as a DataFrame sorted by time, with 'id' and a tz-aware UTC
+        'createdAt' column (the shape elontracker.py builds from the raw API).
+        Only rows added since the previous call are read from disk.
+        """
+        with self._frame_lock:
+            self._refresh_frame()
+            frame = self._frame
+
+        created_ms = frame['created_ms'].to_numpy()
+        lo = created_ms.searchsorted(int(since_utc.timestamp() * 1000)) if since_utc else 0
+        hi = created_ms.searchsorted(int(until_utc.timestamp() * 1000), side='right') if until_utc else len(frame)
+
+        window = frame.iloc[lo:hi]
+        return pd.DataFrame({
+            'id': window['id'].to_numpy(),
+            'createdAt': pd.to_datetime(window['created_ms'].to_numpy(), unit='ms', utc=True)
+        })
+
+    def pace_stats(self, now_utc, windows=()):
+        """
+        PaceTracker snapshot at now_utc (windowed rates for the given lookbacks,
+        EWMA rates, hourly mean/std/PMF) after picking up any new rows.
+        """
+        with self._frame_lock:
+            self._refresh_frame()
+            return self.pace.snapshot(now_utc.timestamp(), windows)
+
+    def register_markets(self, windows):
+        """
+        Track the given market windows (market_index.window_from_event). New
+        windows are seeded from the in-memory posts once; after that every
+        new post updates them incrementally. Returns the number added.
+        """
+        with self._frame_lock:
+            self._refresh_frame()
+            created_ms = self._frame['created_ms'].to_numpy()
+            added = 0
+            for window in windows:
+                seen = created_ms.searchsorted(window['end_ts'] * 1000) - created_ms.searchsorted(window['start_ts'] * 1000)
+                added += self.markets.add_market(window, int(seen))
+            return added
+
+    def market_counts(self, now_utc):
+        """Open registered markets with their current post counts"""
+        with self._frame_lock:
+            self._refresh_frame()
+            return self.markets.open_markets(now_utc.timestamp())
+
+    def count(self):
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM posts WHERE handle = ?', (self.handle,)).fetchone()[0]
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    store = TweetStore()
+    start = time.time()
+    added = store.sync(force=True)
+    print(f"✅ Synced {added} new posts in {time.time() - start:.1f}s ({store.count()} stored)")
+    start = time.time()
+    df = store.load_frame()
+    print(f"✅ Loaded {len(df)} posts from disk in {(time.time() - start) * 1000:.0f} ms")
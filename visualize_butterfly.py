@@ -3,6 +3,8 @@ import pandas as pd
 import seaborn as sns
 import numpy as np
 
+from buckets import bucket_sort_key
+
 # Data from the User's Resolution Report (Final Portfolio)
 data = [
     # --- The Body (Long Yes) ---
@@ -32,13 +34,7 @@ data = [
 
 df = pd.DataFrame(data)
 
-# Helper to sort buckets
-def get_sort_key(s):
-    if '500+' in s: return 500
-    try: return int(s.split('-')[0])
-    except: return 0
-
-df['sort_key'] = df['bucket'].apply(get_sort_key)
+df['sort_key'] = df['bucket'].apply(bucket_sort_key)
 df = df.sort_values('sort_key')
 
 # Calculate Net Exposure (Yes - No)
@@ -47,7 +43,7 @@ df['exposure'] = np.where(df['type'] == 'Yes', df['shares'], -df['shares'])
 
 # Aggregate by bucket
 net_exposure = df.groupby('bucket')['exposure'].sum().reset_index()
-net_exposure['sort_key'] = net_exposure['bucket'].apply(get_sort_key)
+net_exposure['sort_key'] = net_exposure['bucket'].apply(bucket_sort_key)
 net_exposure = net_exposure.sort_values('sort_key')
 
 # --- Visualization ---
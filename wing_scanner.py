@@ -0,0 +1,134 @@
+"""
+Wing Yield Scanner
+Return to resolution of every NO leg ("wing") across all open Elon tweet
+events. A NO share bought at q pays $1 unless its bucket hits, so with the
+model probability p of a hit:
+
+    expected return    (1 - p) / q - 1
+    annualised yield   expected return * 8760 / hours to resolution
+
+Legs live in one list kept sorted by annualised yield with bisect (as in
+market_index). Yields are scored on whole hours to resolution and rounded hit
+probabilities, so a refresh only re-inserts legs whose price, probability or
+hour changed - and the best wings across every event are always the head of
+the list.
+"""
+import bisect
+import json
+import threading
+import time
+
+import numpy as np
+
+from buckets import BucketScheme, find_bucket
+from market_index import window_from_event
+
+HOURS_PER_YEAR = 8760
+P_HIT_DECIMALS = 4
+
+
+def no_price(market):
+    """NO price of a gamma market (tokens, else outcomePrices), or None"""
+    tokens = market.get('tokens') or []
+    if len(tokens) > 1 and tokens[1].get('price') is not None:
+        return float(tokens[1]['price'])
+    prices = market.get('outcomePrices')
+    if isinstance(prices, str):
+        prices = json.loads(prices)
+    if prices and len(prices) > 1:
+        return float(prices[1])
+    return None
+
+
+class WingScanner:
+    def __init__(self, probability_fn):
+        """
+        probability_fn(window, count, scheme, now_ts) -> hit probability of
+        each bucket of the scheme for an event window with `count` posts so far
+        """
+        self.probability_fn = probability_fn
+        self.legs = {}       # (event id, bucket) -> leg
+        self.order = []      # (-annualised yield, key), best first
+        self.updated_at = None
+        self._lock = threading.Lock()
+
+    def _put(self, key, leg):
+        old = self.legs.get(key)
+        if old is not None:
+            if (old['no_price'], old['p_hit'], old['hours_left']) == (leg['no_price'], leg['p_hit'], leg['hours_left']):
+                return False
+            del self.order[bisect.bisect_left(self.order, (-old['annualised_yield'], key))]
+        self.legs[key] = leg
+        bisect.insort(self.order, (-leg['annualised_yield'], key))
+        return True
+
+    def _drop(self, key):
+        leg = self.legs.pop(key)
+        del self.order[bisect.bisect_left(self.order, (-leg['annualised_yield'], key))]
+
+    def event_legs(self, event, count, now_ts):
+        """NO legs of one gamma event, priced and scored"""
+        window = window_from_event(event)
+        if not window or window['end_ts'] <= now_ts:
+            return {}
+        markets = [m for m in event.get('markets', []) if not m.get('closed') and find_bucket(m.get('question', ''))]
+        scheme = BucketScheme.from_markets(markets)
+        if not len(scheme):
+            return {}
+        p_hit = np.clip(self.probability_fn(window, count, scheme, now_ts), 0.0, 1.0)
+        hours_left = max(int(np.ceil((window['end_ts'] - now_ts) / 3600)), 1)
+
+        legs = {}
+        for market in markets:
+            bucket = find_bucket(market['question'])
+            price = no_price(market)
+            if bucket not in scheme.index or price is None or not 0 < price < 1:
+                continue
+            p = round(float(p_hit[scheme.index[bucket]]), P_HIT_DECIMALS)
+            expected = (1 - p) / price - 1
+            legs[(window['id'], bucket)] = {
+                'event_id': window['id'],
+                'slug': window['slug'],
+                'title': window['title'],
+                'bucket': bucket,
+                'no_price': price,
+                'p_hit': p,
+                'count': count,
+                'hours_left': hours_left,
+                'max_return': 1 / price - 1,
+                'expected_return': expected,
+                'annualised_yield': expected * HOURS_PER_YEAR / hours_left
+            }
+        return legs
+
+    def update(self, events, counts, now_ts=None):
+        """
+        Refresh from the current list of open events (counts: event id ->
+        posts so far). Legs of events that closed are dropped. Returns the
+        number of legs re-indexed.
+        """
+        now_ts = now_ts if now_ts is not None else time.time()
+        fresh = {}
+        for event in events:
+            count = counts.get(str(event.get('id')))
+            if count is not None:
+                fresh.update(self.event_legs(event, count, now_ts))
+
+        with self._lock:
+            changed = sum(self._put(key, leg) for key, leg in fresh.items())
+            for key in [k for k in self.legs if k not in fresh]:
+                self._drop(key)
+            self.updated_at = now_ts
+        return changed
+
+    def top(self, n=20, slug=None, min_price=0.0):
+        """Best n wings by annualised yield, optionally for one event / above a NO price"""
+        with self._lock:
+            best = []
+            for _, key in self.order:
+                leg = self.legs[key]
+                if (slug is None or leg['slug'] == slug) and leg['no_price'] >= min_price:
+                    best.append(leg)
+                    if len(best) == n:
+                        break
+            return best